@@ -0,0 +1,89 @@
+"""Latency benchmark for the /dashboard fetch plan.
+
+Compares the old strictly sequential fetch order of ``/dashboard`` (profile,
+cycle, recovery, sleep: ~4 round trips) with the dependency-aware fetch plan
+(profile ∥ cycle, then recovery ∥ sleep: ~2 round trips), and times the full
+route through the ASGI app. The response cache is disabled so every run pays
+the mock API's per-request latency.
+
+Usage:
+    python benchmarks/bench_dashboard.py --iterations 30 --latency-ms 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_whoop_api import MockWhoopAPI  # noqa: E402
+
+os.environ["WHOOP_CACHE_ENABLED"] = "false"
+os.environ.setdefault("WHOOP_CLIENT_ID", "benchmark")
+os.environ.setdefault("WHOOP_CLIENT_SECRET", "benchmark")
+
+
+async def serial_fetch(simple):
+    """The pre-fetch-plan /dashboard order: four sequential round trips."""
+    token = simple.tokens["access_token"]
+    await simple.api_get(f"{simple.API_BASE}/user/profile/basic", token)
+    cycles = await simple.api_get(f"{simple.API_BASE}/cycle", token, params={"limit": "1"})
+    cycle_id = simple.latest_cycle_of(cycles)["id"]
+    await simple.api_get(f"{simple.API_BASE}/cycle/{cycle_id}/recovery", token)
+    await simple.api_get(f"{simple.API_BASE}/cycle/{cycle_id}/sleep", token)
+
+
+async def plan_fetch(simple):
+    """The /dashboard fetch plan on its own."""
+    await simple.run_fetch_plan({
+        "profile": ((), simple.fetch_step("/user/profile/basic")),
+        "cycles": ((), simple.fetch_step("/cycle", {"limit": "1"})),
+        "recovery": (("cycles",), simple.cycle_child_step("recovery")),
+        "sleep": (("cycles",), simple.cycle_child_step("sleep")),
+    })
+
+
+async def measure(label: str, run, iterations: int, latency_ms: float):
+    await run()  # warm-up (opens pooled connections)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    mean = statistics.mean(timings)
+    print(
+        f"{label:<22} mean {mean:7.2f} ms | p50 {timings[len(timings) // 2]:7.2f} ms | "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms | ~{mean / latency_ms:.1f} RTTs"
+    )
+
+
+async def main(args: argparse.Namespace):
+    api = MockWhoopAPI(latency_ms=args.latency_ms)
+    os.environ["WHOOP_API_BASE"] = await api.start()
+
+    import whoop_simple as simple
+
+    simple.tokens["access_token"] = "benchmark"
+    app_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=simple.app), base_url="http://dashboard")
+    try:
+        async with simple.lifespan():
+            await measure("serial (old order)", lambda: serial_fetch(simple), args.iterations, args.latency_ms)
+            await measure("fetch plan", lambda: plan_fetch(simple), args.iterations, args.latency_ms)
+            await measure("GET /dashboard", lambda: app_client.get("/dashboard"), args.iterations, args.latency_ms)
+    finally:
+        await app_client.aclose()
+        await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Before/after latency benchmark for the shared pooled WHOOP client.
+
+Simulates ``get_health_summary`` (profile, cycle, recovery and sleep fetched
+concurrently) against the local mock API, first with a fresh
+``httpx.AsyncClient`` per call (the old behaviour) and then through
+``whoop_client.api_get``. The mock charges ``--handshake-ms`` for every new
+connection, so the gap between the two runs is the handshake cost saved.
+
+Usage:
+    python benchmarks/bench_http_client.py --iterations 50 --latency-ms 20 --handshake-ms 60
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_whoop_api import MockWhoopAPI  # noqa: E402
+
+SUMMARY_CALLS = [
+    ("/developer/v2/user/profile/basic", None),
+    ("/developer/v2/cycle", {"limit": "1"}),
+    ("/developer/v2/recovery", {"limit": "1"}),
+    ("/developer/v2/activity/sleep", {"limit": "1"}),
+]
+
+
+async def summary_per_call_client(base_url: str):
+    """Old behaviour: every call opens and closes its own client."""
+    async def fetch(path, params):
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            return await client.get(path, params=params, headers={"Authorization": "Bearer bench"})
+
+    await asyncio.gather(*(fetch(path, params) for path, params in SUMMARY_CALLS))
+
+
+async def summary_shared_client():
+    """New behaviour: every call goes through the process-wide pooled client."""
+    import whoop_client
+
+    await asyncio.gather(*(whoop_client.api_get(path, "bench", params) for path, params in SUMMARY_CALLS))
+
+
+async def measure(label: str, api: MockWhoopAPI, run, iterations: int):
+    await run()  # warm-up
+    api.reset_counters()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(
+        f"{label:<24} mean {statistics.mean(timings):7.2f} ms | "
+        f"p50 {timings[len(timings) // 2]:7.2f} ms | "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms | "
+        f"new connections {api.connections}/{iterations} summaries"
+    )
+
+
+async def main(args: argparse.Namespace):
+    api = MockWhoopAPI(latency_ms=args.latency_ms, handshake_ms=args.handshake_ms)
+    base_url = await api.start()
+    os.environ["WHOOP_API_BASE"] = base_url
+
+    import whoop_client
+
+    try:
+        await measure("per-call AsyncClient", api, lambda: summary_per_call_client(base_url), args.iterations)
+        async with whoop_client.lifespan():
+            await measure("shared pooled client", api, summary_shared_client, args.iterations)
+    finally:
+        await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--handshake-ms", type=float, default=60.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""Prompt size (and optionally Ollama latency) benchmark for AI insights.
+
+Compares the old prompt, which pasted the raw ``repr`` of WHOOP responses,
+with the compact feature tables from ``whoop_insights`` at several history
+depths. Token counts use tiktoken when installed and a 4-characters-per-token
+estimate otherwise. With ``--ollama`` each prompt is also sent to a local
+Ollama model with ``max_tokens=1`` to time prompt prefill.
+
+Usage:
+    python benchmarks/bench_prompt.py --depths 3 7 14
+    python benchmarks/bench_prompt.py --depths 3 7 --ollama --model llama3.2
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import whoop_insights  # noqa: E402
+from mock_whoop_api import build_dataset  # noqa: E402
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "tiktoken cl100k_base"
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return len(text) // 4
+
+    TOKENIZER = "estimate (chars / 4)"
+
+
+def legacy_messages(dataset: dict, depth: int) -> list[dict[str, str]]:
+    """The pre-feature-table prompt: raw response dicts interpolated as text."""
+    cycles = {"records": dataset["cycles"][:depth], "next_token": "x"}
+    sleeps = {"records": dataset["sleeps"][:depth], "next_token": "x"}
+    workouts = {"records": dataset["workouts"][:5], "next_token": "x"}
+    data_summary = f"""
+WHOOP Data Summary:
+
+Recent Cycles (last {depth}):
+{cycles}
+
+Recent Sleep (last {depth}):
+{sleeps}
+
+Recent Workouts (last 5):
+{workouts}
+"""
+    return [
+        {"role": "system", "content": whoop_insights.SYSTEM_PROMPT},
+        {"role": "user", "content": f"Analyze my WHOOP data and provide insights:\n\n{data_summary}"},
+    ]
+
+
+def compact_messages(dataset: dict, depth: int) -> list[dict[str, str]]:
+    return whoop_insights.build_messages(
+        dataset["cycles"], dataset["recoveries"], dataset["sleeps"], dataset["workouts"], days=depth
+    )
+
+
+def prompt_tokens(messages: list[dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) for m in messages)
+
+
+async def prefill_ms(client, model: str, messages: list[dict[str, str]], repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await client.chat.completions.create(model=model, messages=messages, max_tokens=1, temperature=0)
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+async def main(args: argparse.Namespace):
+    dataset = build_dataset(max(args.depths) + 1)
+    client = None
+    if args.ollama:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(base_url=args.ollama_url, api_key="ollama")
+
+    print(f"Tokenizer: {TOKENIZER}")
+    for depth in args.depths:
+        line = f"depth {depth:>3}:"
+        for label, build in (("legacy", legacy_messages), ("compact", compact_messages)):
+            messages = build(dataset, depth)
+            line += f"  {label} {prompt_tokens(messages):>6} tokens"
+            if client is not None:
+                line += f" / {await prefill_ms(client, args.model, messages, args.repeats):8.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[3, 7, 14, 30])
+    parser.add_argument("--ollama", action="store_true", help="also time prefill against Ollama")
+    parser.add_argument("--ollama-url", default="http://localhost:11434/v1")
+    parser.add_argument("--model", default="llama3.2")
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,80 @@
+"""Render-time and response-size microbenchmark for the HTML views.
+
+Calls every HTML view's route handler directly (no ASGI/HTTP overhead)
+against the mock API with a warm response cache, so the upstream fetch is a
+cache hit and the time measured is almost entirely page rendering. Reports
+the median and p95 time per view and the page size, plus the size and
+Cache-Control of the shared stylesheet (fetched once per browser).
+
+Usage:
+    python benchmarks/bench_render.py --iterations 500
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_whoop_api import MockWhoopAPI  # noqa: E402
+
+os.environ.setdefault("WHOOP_CLIENT_ID", "benchmark")
+os.environ.setdefault("WHOOP_CLIENT_SECRET", "benchmark")
+
+VIEWS = [
+    "/",
+    "/dashboard",
+    "/cycles-view",
+    "/recovery-view",
+    "/workouts-view",
+    "/sleep-view",
+    "/ai-insights-view",
+]
+
+
+async def main(args: argparse.Namespace):
+    api = MockWhoopAPI(latency_ms=0)
+    os.environ["WHOOP_API_BASE"] = await api.start()
+    import whoop_simple as simple
+
+    simple.tokens["access_token"] = "benchmark-token"
+    simple.ai_client = simple.ai_client or object()  # the view only needs one configured
+    handlers = {route.path: route.endpoint for route in simple.app.routes if hasattr(route, "endpoint")}
+    transport = httpx.ASGITransport(app=simple.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'view':<20} {'median us':>10} {'p95 us':>10} {'bytes':>8}")
+        for view in VIEWS:
+            response = await client.get(view)  # warm the response cache
+            response.raise_for_status()
+            handler = handlers[view]
+            timings = []
+            with contextlib.redirect_stdout(io.StringIO()):  # the views log with print
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    result = handler()
+                    if asyncio.iscoroutine(result):
+                        await result
+                    timings.append((time.perf_counter() - started) * 1e6)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{view:<20} {statistics.median(timings):>10.0f} {p95:>10.0f} {len(response.content):>8}")
+
+        stylesheet = await client.get("/static/whoop.css")
+        if stylesheet.status_code == 200:
+            print(f"{'/static/whoop.css':<20} {'':>10} {'':>10} {len(stylesheet.content):>8}"
+                  f"  Cache-Control: {stylesheet.headers.get('cache-control')}")
+    await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300)
+    asyncio.run(main(parser.parse_args()))
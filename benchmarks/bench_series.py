@@ -0,0 +1,97 @@
+"""Memory and aggregation benchmark: record dicts vs columnar series.
+
+Builds a multi-year synthetic history (synthetic_whoop.py) and compares, for the daily metrics:
+
+* memory: the decoded record dicts (as the store returns them) measured with
+  tracemalloc, vs the ``whoop_series`` arrays (``Series.nbytes``);
+* aggregation: mean/median/std/p10/p90 of every daily metric over the whole
+  history and over the last 30 days, by walking the dicts with
+  ``statistics`` vs ``Series.window`` + ``aggregate_values``.
+
+Usage:
+    python benchmarks/bench_series.py --years 1 3 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthetic_whoop import generate_user  # noqa: E402
+from whoop_series import DAILY_METRICS, daily_series  # noqa: E402
+
+AGGREGATES = ["mean", "median", "std", "p10", "p90"]
+
+
+def dict_aggregates(records: dict[str, list[dict]], since: float | None) -> dict:
+    """The pre-columnar way: join by cycle id and reduce with ``statistics``."""
+    by_cycle = {
+        resource: {r.get("cycle_id"): r for r in records[resource] if not r.get("nap")}
+        for resource in ("recoveries", "sleeps")
+    }
+    result = {}
+    for name, (resource, _, extract) in DAILY_METRICS.items():
+        values = []
+        for cycle in records["cycles"]:
+            if since is not None and cycle["start"] < since:
+                continue
+            record = cycle if resource == "cycles" else by_cycle[resource].get(cycle["id"], {})
+            value = extract(record)
+            if value is not None:
+                values.append(value)
+        deciles = statistics.quantiles(values, n=10, method="inclusive")
+        result[name] = [statistics.fmean(values), statistics.median(values), statistics.pstdev(values),
+                        deciles[0], deciles[-1]]
+    return result
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1e3)
+    return min(timings)
+
+
+def main(args: argparse.Namespace):
+    print(f"{'years':>5} {'days':>6} {'dicts KB':>9} {'series KB':>10} "
+          f"{'all: dicts ms':>14} {'series ms':>10} {'30d: dicts ms':>14} {'series ms':>10}")
+    for years in args.years:
+        days = int(365 * years)
+        dataset = generate_user(days=days)
+        raw = {r: json.dumps(dataset[r]) for r in ("cycles", "recoveries", "sleeps")}
+
+        tracemalloc.start()
+        records = {r: json.loads(text) for r, text in raw.items()}
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        series = daily_series(records["cycles"], records["recoveries"], records["sleeps"])
+        since_ts = int(series.ts[-30])
+        since_iso = next(c["start"] for c in records["cycles"] if c["id"] == series.ids[-30])
+
+        def columnar(start=None):
+            window = series.window(start)
+            return {name: window.aggregate(name, AGGREGATES) for name in DAILY_METRICS}
+
+        timings = [
+            best_of(lambda: dict_aggregates(records, None), args.repeat),
+            best_of(columnar, args.repeat),
+            best_of(lambda: dict_aggregates(records, since_iso), args.repeat),
+            best_of(lambda: columnar(since_ts), args.repeat),
+        ]
+        print(f"{years:>5} {days:>6} {dict_bytes / 1024:>9.0f} {series.nbytes / 1024:>10.1f} "
+              f"{timings[0]:>14.2f} {timings[1]:>10.2f} {timings[2]:>14.2f} {timings[3]:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,258 @@
+"""End-to-end latency and throughput of every MCP tool and FastAPI route.
+
+Runs both servers in-process against ``mock_whoop_api.py``, serving a
+synthetic history (``synthetic_whoop.py``), and drives each
+MCP tool (through ``call_tool``) and each GET route (through the ASGI app)
+at every requested concurrency level, reporting p50/p95/p99 latency,
+throughput, errors and the upstream requests each target caused.
+
+By default the response cache and store are warm after one unmeasured call,
+so the numbers are the local serving path. ``--cold`` disables the response
+cache and makes the store re-sync on every call, so every call pays for its
+upstream requests. The client-side rate limiters are raised out of the way
+unless set in the environment.
+
+Each run is saved as JSON in ``benchmarks/results/`` (settings, git commit
+and one row per target and concurrency); ``--compare`` prints the change
+against an earlier run.
+
+Usage:
+    python benchmarks/bench_suite.py --concurrency 1 8 32 --requests 200
+    python benchmarks/bench_suite.py --cold --latency-ms 40 --jitter-ms 20 --error-rate 0.02
+    python benchmarks/bench_suite.py --only mcp --compare benchmarks/results/<earlier run>.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+sys.path.insert(0, str(ROOT))
+
+from mock_whoop_api import MAX_PAGE_SIZE, MockWhoopAPI  # noqa: E402
+from synthetic_whoop import generate_user  # noqa: E402
+
+# Tool arguments; tools not listed here are called without arguments
+MCP_ARGUMENTS = {
+    "get_recovery_score": {"days_ago": 1},
+    "get_recent_cycles": {"limit": 7},
+    "get_recent_workouts": {"limit": 10},
+    "get_metric_history": {"metric": ["hrv", "rhr", "strain"]},
+}
+# Routes that leave the mock: the OAuth flow and the AI model
+SKIPPED_ROUTES = {"/login", "/callback", "/ai-insights", "/ai-insights/stream"}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def mcp_targets(mcp, tools) -> dict[str, Callable[[], Awaitable[bool]]]:
+    def call(name: str):
+        async def run() -> bool:
+            text = (await mcp.call_tool(name, dict(MCP_ARGUMENTS.get(name, {}))))[0].text
+            result = json.loads(text)
+            return not (isinstance(result, dict) and "error" in result)
+        return run
+
+    return {f"mcp {tool.name}": call(tool.name) for tool in tools}
+
+
+def http_targets(app, client: httpx.AsyncClient) -> dict[str, Callable[[], Awaitable[bool]]]:
+    from fastapi.routing import APIRoute
+
+    def call(path: str):
+        async def run() -> bool:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                return False
+            if response.headers.get("content-type", "").startswith("application/json"):
+                body = response.json()
+                return not (isinstance(body, dict) and "error" in body)
+            return True
+        return run
+
+    paths = [
+        route.path for route in app.routes
+        if isinstance(route, APIRoute) and "GET" in route.methods
+        and "{" not in route.path and route.path not in SKIPPED_ROUTES
+    ]
+    return {f"GET {path}": call(path) for path in paths}
+
+
+async def measure(run: Callable[[], Awaitable[bool]], api: MockWhoopAPI, requests: int,
+                  concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                ok = await run()
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    upstream_before, injected_before = api.requests, api.errors
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_rps": round(requests / wall, 1),
+        "upstream_calls": api.requests - upstream_before,
+        "upstream_errors": api.errors - injected_before,
+    }
+
+
+def print_row(row: dict[str, Any], previous: dict[str, Any] | None):
+    line = (f"{row['target']:<34} {row['concurrency']:>4} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+            f"{row['p99_ms']:>9.2f} {row['throughput_rps']:>9.1f} {row['upstream_calls']:>9} {row['errors']:>6}")
+    if previous:
+        changes = [
+            f"{key[:-3]} {(row[key] - previous[key]) / previous[key] * 100:+.0f}%"
+            for key in ("p50_ms", "p95_ms") if previous.get(key)
+        ]
+        line += "   vs previous: " + ", ".join(changes)
+    print(line, flush=True)
+
+
+async def main(args: argparse.Namespace):
+    scratch = Path(tempfile.mkdtemp())
+    os.environ["WHOOP_STORE_PATH"] = str(scratch / "bench_store.sqlite3")
+    os.environ.setdefault("WHOOP_RATE_LIMIT_PER_MINUTE", "1000000")
+    os.environ.setdefault("WHOOP_RATE_LIMIT_PER_DAY", "1000000000")
+    os.environ.setdefault("WHOOP_CLIENT_ID", "benchmark")
+    os.environ.setdefault("WHOOP_CLIENT_SECRET", "benchmark")
+    os.environ["WHOOP_PREFETCH"] = "false"
+    if args.cold:
+        os.environ["WHOOP_CACHE_ENABLED"] = "false"
+        os.environ["WHOOP_STORE_MAX_AGE"] = "0"
+
+    api = MockWhoopAPI(
+        generate_user(days=args.days, seed=args.seed), latency_ms=args.latency_ms, handshake_ms=args.handshake_ms,
+        jitter_ms=args.jitter_ms, page_size=args.page_size, error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    os.environ["WHOOP_API_BASE"] = await api.start()
+
+    import whoop_client
+
+    targets: dict[str, Callable[[], Awaitable[bool]]] = {}
+    app_client = None
+    if args.only in (None, "mcp"):
+        import whoop_mcp_server as mcp
+
+        # Read the token from the scratch directory, never the repo's token cache
+        mcp.TOKEN_CACHE_FILE = mcp.token_provider.path = scratch / "token_cache.json"
+        mcp.TOKEN_CACHE_FILE.write_text(json.dumps({"access_token": "benchmark-token"}))
+        targets.update(mcp_targets(mcp, await mcp.list_tools()))
+    if args.only in (None, "http"):
+        import whoop_simple as simple
+
+        simple.tokens["access_token"] = "benchmark-token"
+        app_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=simple.app), base_url="http://bench")
+        targets.update(http_targets(simple.app, app_client))
+    if args.targets:
+        targets = {name: run for name, run in targets.items() if any(t in name for t in args.targets)}
+
+    previous = {}
+    if args.compare:
+        earlier = json.loads(Path(args.compare).read_text())
+        previous = {(row["target"], row["concurrency"]): row for row in earlier["rows"]}
+
+    print(f"{'target':<34} {'conc':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>9} {'upstream':>9} {'errors':>6}")
+    rows = []
+    # Server logs go to the terminal once per request; keep them out of the table
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    try:
+        async with whoop_client.lifespan():
+            for name, run in targets.items():
+                with contextlib.redirect_stdout(quiet or sys.stdout), contextlib.redirect_stderr(quiet or sys.stderr):
+                    await run()  # warm-up: opens connections, fills the store and caches
+                for concurrency in args.concurrency:
+                    with contextlib.redirect_stdout(quiet or sys.stdout), \
+                            contextlib.redirect_stderr(quiet or sys.stderr):
+                        row = {"target": name, **await measure(run, api, args.requests, concurrency)}
+                    rows.append(row)
+                    print_row(row, previous.get((name, concurrency)))
+    finally:
+        if quiet:
+            quiet.close()
+        if app_client is not None:
+            await app_client.aclose()
+        await api.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{stamp}{'-' + args.label if args.label else ''}.json"
+        settings = {k: v for k, v in vars(args).items() if k not in ("compare", "no_save", "verbose")}
+        path.write_text(json.dumps({
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": settings,
+            "rows": rows,
+        }, indent=2) + "\n")
+        print(f"\nSaved {path.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="calls per target and concurrency level")
+    parser.add_argument("--only", choices=["mcp", "http"], help="drive only the MCP tools or the HTTP routes")
+    parser.add_argument("--targets", nargs="+", help="only targets whose name contains one of these")
+    parser.add_argument("--cold", action="store_true", help="no response cache; the store re-syncs every call")
+    parser.add_argument("--days", type=int, default=90, help="days of synthetic history")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic history")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--label", help="suffix for the results file name")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    asyncio.run(main(parser.parse_args()))
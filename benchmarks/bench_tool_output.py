@@ -0,0 +1,100 @@
+"""MCP tool output size: indented JSON vs compact JSON vs compact + ``fields``.
+
+Calls every MCP tool through ``call_tool`` against the mock API and reports
+the bytes and estimated tokens the model would ingest for each output mode,
+plus serialization time for the largest result. Token counts use tiktoken
+when installed and a 4-characters-per-token estimate otherwise.
+
+Usage:
+    python benchmarks/bench_tool_output.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_whoop_api import MockWhoopAPI  # noqa: E402
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return len(text) // 4
+
+# tool -> (arguments, a typical projection)
+CALLS = {
+    "get_user_profile": ({}, ["first_name"]),
+    "get_recovery_score": ({}, ["score.recovery_score", "score.hrv_rmssd_milli", "score.resting_heart_rate"]),
+    "get_current_strain": ({}, ["strain", "kilojoules"]),
+    "get_recent_cycles": ({"limit": 14}, ["start", "strain", "recovery.recovery_score"]),
+    "get_latest_sleep": ({}, ["start", "end", "score.sleep_performance_percentage"]),
+    "get_recent_workouts": ({"limit": 10}, ["start", "sport_name", "score.strain"]),
+    "get_body_measurements": ({}, ["weight_kilogram"]),
+    "get_health_summary": ({}, ["first_name", "strain", "recovery_score", "sleep_performance_percentage"]),
+    "get_metric_history": ({"metric": ["hrv", "rhr", "strain"]}, ["mean", "p90"]),
+}
+
+
+async def main(args: argparse.Namespace):
+    os.environ["WHOOP_STORE_PATH"] = str(Path(tempfile.mkdtemp()) / "bench_store.sqlite3")
+    api = MockWhoopAPI(latency_ms=0)
+    os.environ["WHOOP_API_BASE"] = await api.start()
+    import whoop_mcp_server as mcp
+
+    mcp.debug_log = lambda message: None
+    token_file = mcp.TOKEN_CACHE_FILE
+    had_token = token_file.exists()
+    if not had_token:
+        token_file.write_text(json.dumps({"access_token": "benchmark-token"}))
+    try:
+        print(f"{'tool':<24} {'indent B':>9} {'compact B':>10} {'fields B':>9} "
+              f"{'indent tok':>11} {'compact tok':>12} {'fields tok':>11}")
+        totals = [0] * 6
+        largest = None
+        for name, (arguments, fields) in CALLS.items():
+            mcp.PRETTY_OUTPUT = True
+            pretty = (await mcp.call_tool(name, dict(arguments)))[0].text
+            mcp.PRETTY_OUTPUT = False
+            compact = (await mcp.call_tool(name, dict(arguments)))[0].text
+            projected = (await mcp.call_tool(name, {**arguments, "fields": fields}))[0].text
+            row = [len(t.encode()) for t in (pretty, compact, projected)] + \
+                  [count_tokens(t) for t in (pretty, compact, projected)]
+            totals = [a + b for a, b in zip(totals, row)]
+            if largest is None or row[0] > largest[1]:
+                largest = (name, row[0], json.loads(compact))
+            print(f"{name:<24} {row[0]:>9} {row[1]:>10} {row[2]:>9} {row[3]:>11} {row[4]:>12} {row[5]:>11}")
+        print(f"{'total':<24} {totals[0]:>9} {totals[1]:>10} {totals[2]:>9} "
+              f"{totals[3]:>11} {totals[4]:>12} {totals[5]:>11}")
+
+        name, _, result = largest
+        for label, serialize in (
+            ("json indent=2", lambda: json.dumps(result, indent=2)),
+            ("compact (dump)", lambda: mcp.dump(result)),
+        ):
+            started = time.perf_counter()
+            for _ in range(args.iterations):
+                serialize()
+            elapsed = (time.perf_counter() - started) / args.iterations * 1e6
+            print(f"serialize {name} with {label}: {elapsed:.1f} us")
+        print(f"orjson: {'yes' if mcp.orjson is not None else 'no (stdlib json fallback)'}")
+    finally:
+        if not had_token:
+            token_file.unlink()
+        await api.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
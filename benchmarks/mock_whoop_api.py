@@ -0,0 +1,295 @@
+"""Local stub of the WHOOP developer API for offline benchmarks.
+
+Serves v1 and v2 style endpoints (profile, body, cycles, recoveries, sleeps,
+workouts) over plain HTTP/1.1 with keep-alive from an in-memory dataset.
+Every new connection can be delayed by ``handshake_ms`` to stand in for the
+TCP+TLS setup cost of the real API, and every request by ``latency_ms`` plus
+a random ``jitter_ms``. Collections are paged at ``page_size`` records, and
+a fraction ``error_rate`` of requests fails with ``error_status`` (503 by
+default; 429 responses carry ``Retry-After: 0``). ``users`` maps bearer
+tokens to datasets for multi-user runs (see synthetic_whoop.py); other
+tokens get ``dataset``, or a 401 when only ``users`` is given.
+
+Run standalone:
+    python benchmarks/mock_whoop_api.py --port 8090 --latency-ms 40 --handshake-ms 60
+    python benchmarks/mock_whoop_api.py --days 1095 --jitter-ms 30 --error-rate 0.02
+
+Then point either server at it with WHOOP_API_BASE=http://127.0.0.1:8090
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+MAX_PAGE_SIZE = 25
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def build_dataset(days: int = 30, user_id: int = 10129) -> dict[str, Any]:
+    """Build a small deterministic dataset covering the last ``days`` days.
+
+    Every night runs from 23:00 to 07:00 UTC. As in WHOOP, each cycle starts
+    at sleep onset (the evening before its day) and ends at the next one.
+    """
+    now = datetime.now(timezone.utc)
+    # The latest wake-up that has already happened
+    wake = now.replace(hour=7, minute=0, second=0, microsecond=0)
+    if wake > now:
+        wake -= timedelta(days=1)
+    cycles, recoveries, sleeps, workouts = [], [], [], []
+    for i in range(days):
+        start = wake - timedelta(days=i, hours=8)
+        end = None if i == 0 else start + timedelta(days=1)
+        cycle_id = 100000 + days - i
+        sleep_id = str(uuid.UUID(int=cycle_id))
+        cycles.append({
+            "id": cycle_id, "user_id": user_id,
+            "created_at": _iso(start), "updated_at": _iso(end or now),
+            "start": _iso(start), "end": _iso(end) if end else None,
+            "timezone_offset": "+00:00", "score_state": "SCORED",
+            "score": {"strain": 8.0 + (i % 9), "kilojoule": 8000.0 + 100 * i,
+                      "average_heart_rate": 60 + i % 10, "max_heart_rate": 150 + i % 30},
+        })
+        sleep_end = start + timedelta(hours=8)
+        sleeps.append({
+            "id": sleep_id, "cycle_id": cycle_id, "user_id": user_id,
+            "created_at": _iso(sleep_end), "updated_at": _iso(sleep_end),
+            "start": _iso(start), "end": _iso(sleep_end),
+            "timezone_offset": "+00:00", "nap": False, "score_state": "SCORED",
+            "score": {
+                "stage_summary": {"total_in_bed_time_milli": 28800000, "total_awake_time_milli": 1800000,
+                                  "total_light_sleep_time_milli": 14400000, "total_slow_wave_sleep_time_milli": 6300000,
+                                  "total_rem_sleep_time_milli": 6300000, "sleep_cycle_count": 4, "disturbance_count": 8},
+                "respiratory_rate": 15.5, "sleep_performance_percentage": 70 + i % 25,
+                "sleep_consistency_percentage": 80, "sleep_efficiency_percentage": 90.0,
+            },
+        })
+        recoveries.append({
+            "cycle_id": cycle_id, "sleep_id": sleep_id, "user_id": user_id,
+            "created_at": _iso(sleep_end), "updated_at": _iso(sleep_end), "score_state": "SCORED",
+            "score": {"user_calibrating": False, "recovery_score": 30 + (i * 7) % 70,
+                      "resting_heart_rate": 50 + i % 8, "hrv_rmssd_milli": 40.0 + i % 30,
+                      "spo2_percentage": 96.0, "skin_temp_celsius": 33.5},
+        })
+        if i % 2 == 0:
+            workout_start = sleep_end + timedelta(hours=10)
+            workouts.append({
+                "id": str(uuid.UUID(int=cycle_id * 10)), "user_id": user_id,
+                "created_at": _iso(workout_start), "updated_at": _iso(workout_start),
+                "start": _iso(workout_start), "end": _iso(workout_start + timedelta(hours=1)),
+                "timezone_offset": "+00:00", "sport_id": 0, "sport_name": "running",
+                "score_state": "SCORED",
+                "score": {"strain": 10.0 + i % 6, "average_heart_rate": 140, "max_heart_rate": 175,
+                          "kilojoule": 2500.0, "percent_recorded": 100.0},
+            })
+    return {
+        "profile": {"user_id": user_id, "email": "athlete@example.com", "first_name": "Test", "last_name": "Athlete"},
+        "body": {"height_meter": 1.8, "weight_kilogram": 75.0, "max_heart_rate": 195},
+        "cycles": cycles, "recoveries": recoveries, "sleeps": sleeps, "workouts": workouts,
+    }
+
+
+class MockWhoopAPI:
+    """In-process WHOOP API stub with connection, request and error counters."""
+
+    def __init__(self, dataset: dict[str, Any] | None = None, latency_ms: float = 0.0,
+                 handshake_ms: float = 0.0, jitter_ms: float = 0.0, page_size: int = MAX_PAGE_SIZE,
+                 error_rate: float = 0.0, error_status: int = 503, seed: int = 0,
+                 users: dict[str, dict[str, Any]] | None = None):
+        self.dataset = dataset or (None if users else build_dataset())
+        # Bearer token -> dataset; other tokens get ``dataset``
+        self.users = users or {}
+        self.latency_ms = latency_ms
+        self.handshake_ms = handshake_ms
+        self.jitter_ms = jitter_ms
+        self.page_size = page_size
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Seeded so jitter and injected errors repeat between runs
+        self.random = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.calls: Counter[str] = Counter()
+        self._server: asyncio.AbstractServer | None = None
+        self._handlers: set[asyncio.Task] = set()
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start listening and return the base URL."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}"
+
+    async def close(self):
+        """Stop listening and end open keep-alive connections.
+
+        Closing each connection lets its handler see EOF and return, instead of
+        being cancelled mid-read when the event loop shuts down.
+        """
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def reset_counters(self):
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.calls.clear()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        self._writers.add(writer)
+        try:
+            if self.handshake_ms:
+                await asyncio.sleep(self.handshake_ms / 1000)
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if length:
+                    await reader.readexactly(length)
+
+                self.requests += 1
+                delay = self.latency_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+                if delay:
+                    await asyncio.sleep(delay / 1000)
+                extra_headers = ""
+                if self.error_rate and self.random.random() < self.error_rate:
+                    self.errors += 1
+                    status, payload = self.error_status, {"error": "injected failure"}
+                    if status == 429:
+                        extra_headers = "Retry-After: 0\r\n"
+                else:
+                    token = headers.get("authorization", "").removeprefix("Bearer ")
+                    status, payload = self.route(method, target, token)
+                body = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n{extra_headers}"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            self._writers.discard(writer)
+            self._handlers.discard(task)
+
+    def route(self, method: str, target: str, token: str | None = None) -> tuple[int, Any]:
+        """Resolve a request target to (status, JSON payload) from the token's dataset."""
+        url = urlsplit(target)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+        for prefix in ("/developer/v1", "/developer/v2"):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        self.calls[path] += 1
+        data = self.users.get(token, self.dataset)
+        if data is None:
+            return 401, {"error": "Unknown token"}
+        parts = [p for p in path.split("/") if p]
+
+        if method != "GET":
+            return 405, {"error": "method not allowed"}
+        if path == "/user/profile/basic":
+            return 200, data["profile"]
+        if path in ("/user/measurement/body", "/user/body_measurement"):
+            return 200, data["body"]
+        if path == "/cycle":
+            return 200, self._page(data["cycles"], query)
+        if path == "/recovery":
+            return 200, self._page(data["recoveries"], query, time_key="created_at")
+        if path == "/activity/sleep":
+            return 200, self._page(data["sleeps"], query)
+        if path in ("/activity/workout", "/workout"):
+            return 200, self._page(data["workouts"], query)
+        if len(parts) >= 2 and parts[0] == "cycle":
+            cycle_id = int(parts[1])
+            if len(parts) == 2:
+                return self._find(data["cycles"], "id", cycle_id)
+            if parts[2] == "recovery":
+                return self._find(data["recoveries"], "cycle_id", cycle_id)
+            if parts[2] == "sleep":
+                return self._find(data["sleeps"], "cycle_id", cycle_id)
+        if len(parts) == 3 and parts[0] == "activity":
+            records = data["sleeps"] if parts[1] == "sleep" else data["workouts"]
+            return self._find(records, "id", parts[2])
+        return 404, {"error": f"Unknown endpoint {path}"}
+
+    @staticmethod
+    def _find(records: list[dict], key: str, value: Any) -> tuple[int, Any]:
+        for record in records:
+            if record.get(key) == value:
+                return 200, record
+        return 404, {"error": "Not found"}
+
+    def _page(self, records: list[dict], query: dict[str, str], time_key: str = "start") -> dict[str, Any]:
+        """Filter by start/end and return one page with a next_token cursor."""
+        start, end = query.get("start"), query.get("end")
+        if start or end:
+            records = [
+                r for r in records
+                if (not start or r[time_key] >= start) and (not end or r[time_key] < end)
+            ]
+        limit = min(int(query.get("limit", 10)), self.page_size)
+        offset = int(query.get("nextToken") or 0)
+        page = records[offset:offset + limit]
+        more = offset + limit < len(records)
+        return {"records": page, "next_token": str(offset + limit) if more else None}
+
+
+async def _serve(args: argparse.Namespace):
+    api = MockWhoopAPI(build_dataset(args.days), latency_ms=args.latency_ms, handshake_ms=args.handshake_ms,
+                       jitter_ms=args.jitter_ms, page_size=args.page_size, error_rate=args.error_rate,
+                       error_status=args.error_status)
+    base_url = await api.start(args.host, args.port)
+    print(f"Mock WHOOP API listening on {base_url} ({args.days} days of data)")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--handshake-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
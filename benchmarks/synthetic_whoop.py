@@ -0,0 +1,525 @@
+"""Synthetic multi-year, multi-user WHOOP datasets for scale testing.
+
+``generate_user`` builds a dataset with the same shape as
+``mock_whoop_api.build_dataset``, so the mock can serve it: a profile, body
+measurements and v2-style cycles, recoveries, sleeps and workouts (newest
+first). Unlike ``build_dataset`` the values follow simple physiology instead
+of fixed patterns. Each user has their own baselines (HRV, resting heart
+rate, sleep need, wake time, timezone, fitness and favourite sports), and
+each day follows from the previous one:
+
+* sleep: time in bed follows the sleep need, the sleep debt, the previous
+  day's strain and the weekend; light/SWS/REM/awake stages add up to the
+  time in bed, and the performance is sleep time over need. Some days have
+  an afternoon nap.
+* recovery: HRV and RHR drift around the baselines (AR(1)), go down after
+  high strain and up after good sleep; the recovery score follows from them.
+  The first days are calibrating.
+* workouts: chosen from the user's sports, harder on well-recovered days,
+  with heart-rate zones that add up to the duration.
+* cycle: as in WHOOP, starts at the main sleep's onset and ends at the
+  next one (the latest cycle is still open); day strain combines the background activity and the workouts.
+
+Ids are unique across users, and the data is deterministic for a given
+seed and end time. ``load_into_store`` writes a dataset into a
+``WhoopStore`` and marks it synced, so the servers answer from it directly.
+
+Usage:
+    python benchmarks/synthetic_whoop.py --users 3 --years 5 --out /tmp/whoop-synthetic
+    python benchmarks/synthetic_whoop.py --years 3 --store /tmp/whoop-3y.sqlite3
+    python benchmarks/synthetic_whoop.py --users 3 --store /tmp/whoop-{user_id}.sqlite3
+    python benchmarks/synthetic_whoop.py --users 10 --years 2 --serve --port 8090
+    python benchmarks/synthetic_whoop.py --users 10 --check
+
+Each user gets their own store (``--store`` path with the user id added).
+When serving several users, the bearer token ``user-<user_id>`` selects one
+and any other token is refused; a single user answers any token.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mock_whoop_api import MockWhoopAPI  # noqa: E402
+
+FIRST_USER_ID = 10001
+TIMEZONES = ["-08:00", "-07:00", "-06:00", "-05:00", "-03:00", "+00:00", "+01:00", "+02:00", "+05:30", "+08:00",
+             "+10:00"]
+# (sport_id, sport_name, typical minutes, speed in m/min or None)
+SPORTS = [
+    (0, "running", 45, 170),
+    (1, "cycling", 75, 430),
+    (33, "swimming", 40, 45),
+    (44, "yoga", 60, None),
+    (45, "weightlifting", 55, None),
+    (48, "functional-fitness", 50, None),
+    (52, "hiking/rucking", 120, 70),
+    (63, "walking", 50, 85),
+    (71, "other", 45, None),
+]
+HOUR_MS = 3_600_000
+STRAIN_MAX = 21.0
+# Least time between a nap or workout and the next sleep or workout
+AWAKE_GAP = timedelta(minutes=30)
+
+
+def _iso(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _tz(offset: str) -> timezone:
+    sign = -1 if offset.startswith("-") else 1
+    hours, _, minutes = offset.lstrip("+-").partition(":")
+    return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+
+
+def _clip(value: float, low: float, high: float) -> float:
+    return min(high, max(low, value))
+
+
+def _strain(load: float) -> float:
+    """WHOOP strain is logarithmic: loads add up, strain saturates at 21."""
+    return STRAIN_MAX * (1 - math.exp(-load))
+
+
+def _load(strain: float) -> float:
+    return -math.log(1 - strain / STRAIN_MAX)
+
+
+class _User:
+    """Baselines and day-to-day state of one synthetic member."""
+
+    def __init__(self, user_id: int, rng: random.Random):
+        self.user_id = user_id
+        self.rng = rng
+        self.offset = rng.choice(TIMEZONES)
+        self.tz = _tz(self.offset)
+        self.age = rng.randint(20, 62)
+        self.fitness = rng.betavariate(2, 2)
+        self.max_hr = round(208 - 0.7 * self.age + rng.gauss(0, 5))
+        self.rhr_base = _clip(66 - 18 * self.fitness + rng.gauss(0, 3), 40, 75)
+        self.hrv_base = _clip(rng.lognormvariate(math.log(60), 0.3) * (1.2 - self.age / 100), 18, 160)
+        self.rr_base = rng.uniform(13.5, 17.5)
+        self.skin_base = rng.uniform(33.0, 35.0)
+        self.sleep_need = rng.uniform(7.0, 9.0)
+        self.wake_hour = rng.uniform(5.5, 8.5)
+        self.workouts_per_week = 1 + 6 * self.fitness
+        self.sports = rng.sample(SPORTS, rng.randint(1, 3))
+        self.weight = _clip(rng.gauss(75, 12), 48, 120)
+        self.height = _clip(rng.gauss(1.74, 0.09), 1.5, 2.05)
+        self.first_name, self.last_name = f"Synthetic{user_id}", "Athlete"
+        # Day-to-day state
+        self.hrv_drift = 0.0
+        self.sleep_debt = 0.0
+        self.prev_strain = 10.0
+        self.usual_strain = 10.0
+        self.recent_nap_h = 0.0
+
+    def wake(self, day: datetime) -> datetime:
+        weekend = day.weekday() >= 5
+        hours = self.wake_hour + (0.8 if weekend else 0.0) + self.rng.gauss(0, 0.35)
+        return day + timedelta(hours=hours)
+
+    def sleep(self, wake: datetime, weekend: bool, earliest: datetime | None) -> tuple[datetime, dict[str, Any], float]:
+        """Main sleep ending at ``wake`` and starting no sooner than ``earliest``: start, score, hours asleep."""
+        rng = self.rng
+        need_debt = 0.5 * self.sleep_debt
+        need_strain = max(0.0, (self.prev_strain - 10) * 0.08)
+        need_nap = -self.recent_nap_h
+        need = self.sleep_need + need_debt + need_strain + need_nap
+        # Habit sets the time in bed; extra need is only partly slept off
+        in_bed = self.sleep_need * rng.uniform(0.85, 1.0) + 0.4 * (need - self.sleep_need)
+        in_bed = _clip(in_bed + (0.5 if weekend else 0.0) + rng.gauss(0, 0.5), 4.0, 11.0)
+        if earliest is not None:
+            in_bed = min(in_bed, (wake - earliest).total_seconds() / 3600)
+        efficiency = _clip(rng.gauss(0.9, 0.035), 0.7, 0.98)
+        asleep = in_bed * efficiency
+        self.sleep_debt = max(0.0, self.sleep_debt + self.sleep_need - asleep) * 0.7
+        self.recent_nap_h = 0.0
+        score = self._sleep_score(in_bed, asleep, need, deep_share=_clip(0.26 - self.age / 400, 0.1, 0.25))
+        score["sleep_needed"] = {
+            "baseline_milli": round(self.sleep_need * HOUR_MS),
+            "need_from_sleep_debt_milli": round(need_debt * HOUR_MS),
+            "need_from_recent_strain_milli": round(need_strain * HOUR_MS),
+            "need_from_recent_nap_milli": round(need_nap * HOUR_MS),
+        }
+        score["sleep_consistency_percentage"] = round(_clip(rng.gauss(82, 8), 35, 99))
+        return wake - timedelta(hours=in_bed), score, asleep
+
+    def _sleep_score(self, in_bed: float, asleep: float, need: float, deep_share: float) -> dict[str, Any]:
+        rng = self.rng
+        deep = asleep * _clip(rng.gauss(deep_share, 0.03), 0.05, 0.35)
+        rem = asleep * _clip(rng.gauss(0.22, 0.03), 0.08, 0.35)
+        light = asleep - deep - rem
+        return {
+            "stage_summary": {
+                "total_in_bed_time_milli": round(in_bed * HOUR_MS),
+                "total_awake_time_milli": round((in_bed - asleep) * HOUR_MS),
+                "total_no_data_time_milli": 0,
+                "total_light_sleep_time_milli": round(light * HOUR_MS),
+                "total_slow_wave_sleep_time_milli": round(deep * HOUR_MS),
+                "total_rem_sleep_time_milli": round(rem * HOUR_MS),
+                "sleep_cycle_count": max(0, round(asleep / 1.5)),
+                "disturbance_count": max(0, round(rng.gauss(asleep * 1.3, 3))),
+            },
+            "respiratory_rate": round(self.rr_base + rng.gauss(0, 0.3), 1),
+            "sleep_performance_percentage": round(min(100.0, asleep / need * 100)),
+            "sleep_efficiency_percentage": round(asleep / in_bed * 100, 1),
+        }
+
+    def nap(self, wake: datetime) -> tuple[datetime, datetime, float, dict[str, Any]] | None:
+        """An occasional afternoon nap: start, end, hours asleep and score."""
+        if self.rng.random() >= 0.06:
+            return None
+        start = wake + timedelta(hours=self.rng.uniform(6, 9))
+        in_bed = self.rng.uniform(0.3, 1.5)
+        asleep = in_bed * _clip(self.rng.gauss(0.8, 0.08), 0.5, 0.95)
+        score = self._sleep_score(in_bed, asleep, in_bed, deep_share=0.12)
+        return start, start + timedelta(hours=in_bed), asleep, score
+
+    def recovery(self, performance: float, calibrating: bool) -> dict[str, Any]:
+        rng = self.rng
+        # Strain above the user's usual level costs recovery, not strain itself
+        extra_strain = self.prev_strain - self.usual_strain
+        self.hrv_drift = (0.65 * self.hrv_drift + rng.gauss(0, 0.1)
+                          - 0.012 * extra_strain + 0.004 * (performance - 80))
+        hrv = self.hrv_base * math.exp(self.hrv_drift)
+        rhr = self.rhr_base + rng.gauss(0, 1.5) + 0.25 * extra_strain - 0.04 * (performance - 80)
+        score = 55 + 110 * math.log(hrv / self.hrv_base) - 2.5 * (rhr - self.rhr_base) + 0.3 * (performance - 80)
+        return {
+            "user_calibrating": calibrating,
+            "recovery_score": round(_clip(score + rng.gauss(0, 5), 1, 99)),
+            "resting_heart_rate": round(_clip(rhr, 35, 100)),
+            "hrv_rmssd_milli": round(hrv, 3),
+            "spo2_percentage": round(_clip(rng.gauss(96.5, 0.8), 92, 100), 1),
+            "skin_temp_celsius": round(self.skin_base + rng.gauss(0, 0.25), 2),
+        }
+
+    def workouts(self, wake: datetime, day_end: datetime, recovery: int) -> list[dict[str, Any]]:
+        """0-2 workouts between waking and the next bedtime."""
+        rng = self.rng
+        chance = self.workouts_per_week / 7
+        count = (rng.random() < chance) + (rng.random() < chance * 0.15)
+        result = []
+        earliest = wake + AWAKE_GAP
+        for _ in range(count):
+            sport_id, sport, minutes, speed = rng.choice(self.sports)
+            duration = _clip(rng.gauss(minutes, minutes * 0.3), 15, 300)
+            intensity = _clip(rng.gauss(0.5 + 0.25 * self.fitness + 0.15 * (recovery - 50) / 50, 0.12), 0.2, 1.0)
+            latest = day_end - timedelta(minutes=duration + 60)
+            if latest <= earliest:
+                break
+            start = earliest + (latest - earliest) * rng.random()
+            earliest = start + timedelta(minutes=duration) + AWAKE_GAP
+            result.append(self._workout(sport_id, sport, speed, start, duration, intensity))
+        return result
+
+    def _workout(self, sport_id: int, sport: str, speed: float | None, start: datetime, duration: float,
+                 intensity: float) -> dict[str, Any]:
+        rng = self.rng
+        reserve = self.max_hr - self.rhr_base
+        average_hr = round(self.rhr_base + reserve * (0.35 + 0.45 * intensity))
+        max_hr = min(self.max_hr, round(average_hr + rng.uniform(10, 30)))
+        # Share of time per heart-rate zone, centred on the intensity
+        weights = [math.exp(-((zone - intensity * 5) ** 2) / 2) for zone in range(6)]
+        total_ms = round(duration * 60_000)
+        zones = [round(total_ms * w / sum(weights)) for w in weights]
+        zones[0] += total_ms - sum(zones)
+        score: dict[str, Any] = {
+            "strain": round(_strain(0.03 * duration * intensity ** 2), 4),
+            "average_heart_rate": average_hr,
+            "max_heart_rate": max_hr,
+            "kilojoule": round(duration * (8 + 40 * intensity) * self.weight / 75, 1),
+            "percent_recorded": 100.0 if rng.random() > 0.03 else round(rng.uniform(60, 99), 1),
+            "zone_durations": {f"zone_{name}_milli": ms for name, ms in
+                               zip(("zero", "one", "two", "three", "four", "five"), zones)},
+        }
+        if speed:
+            score["distance_meter"] = round(duration * speed * (0.7 + 0.5 * intensity), 1)
+            score["altitude_gain_meter"] = round(rng.uniform(0, duration * 2), 1)
+            score["altitude_change_meter"] = round(rng.gauss(0, 5), 1)
+        end = start + timedelta(minutes=duration)
+        return {
+            "start": start, "end": end, "sport_id": sport_id, "sport_name": sport,
+            # A few recordings cannot be scored
+            "score": score if rng.random() > 0.005 else None,
+        }
+
+
+def generate_user(
+    user_id: int = FIRST_USER_ID,
+    years: float = 1.0,
+    days: int | None = None,
+    seed: int = 0,
+    now: datetime | None = None,
+) -> dict[str, Any]:
+    """Generate ``days`` (default ``years`` * 365) days of history for one user, ending now."""
+    days = days if days is not None else max(1, round(365.25 * years))
+    now = now or datetime.now(timezone.utc)
+    rng = random.Random(f"{seed}:{user_id}")
+    user = _User(user_id, rng)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    # Local midnights, oldest first, ending with the latest wake-up that has already happened
+    today = now.astimezone(user.tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    midnights = [today - timedelta(days=days - i) for i in range(days + 1)]
+    wakes = [user.wake(day) for day in midnights]
+    if wakes[-1] > now:
+        midnights, wakes = midnights[:-1], wakes[:-1]
+    else:
+        midnights, wakes = midnights[1:], wakes[1:]
+
+    cycles, recoveries, sleeps, workouts = [], [], [], []
+    # End of the previous day's last nap or workout; the next sleep starts after it
+    active_until = None
+    for i in range(days):
+        wake, next_wake = wakes[i], wakes[i + 1] if i + 1 < days else None
+        weekend = midnights[i].weekday() >= 5
+        cycle_id = user_id * 100_000 + i
+
+        sleep_start, sleep_score, asleep = user.sleep(wake, weekend, active_until and active_until + AWAKE_GAP)
+        active_until = None
+        sleep_id = new_id()
+        sleeps.append({
+            "id": sleep_id, "cycle_id": cycle_id, "v1_id": cycle_id, "user_id": user_id,
+            "created_at": _iso(wake + timedelta(minutes=3)), "updated_at": _iso(wake + timedelta(minutes=8)),
+            "start": _iso(sleep_start), "end": _iso(wake), "timezone_offset": user.offset,
+            "nap": False, "score_state": "SCORED", "score": sleep_score,
+        })
+        recovery = user.recovery(sleep_score["sleep_performance_percentage"], calibrating=i < 4)
+        recoveries.append({
+            "cycle_id": cycle_id, "sleep_id": sleep_id, "user_id": user_id,
+            "created_at": _iso(wake + timedelta(minutes=5)), "updated_at": _iso(wake + timedelta(minutes=8)),
+            "score_state": "SCORED", "score": recovery,
+        })
+
+        # The waking day runs until the next main sleep begins (or now)
+        day_end = next_wake - timedelta(hours=user.sleep_need) if next_wake else now
+        day_workouts = user.workouts(wake, day_end, recovery["recovery_score"])
+        nap = user.nap(wake)
+        if nap and nap[1] < day_end and not any(
+            nap[0] < workout["end"] + AWAKE_GAP and workout["start"] < nap[1] + AWAKE_GAP for workout in day_workouts
+        ):
+            nap_start, nap_end, user.recent_nap_h, nap_score = nap
+            active_until = nap_end
+            sleeps.append({
+                "id": new_id(), "cycle_id": cycle_id, "v1_id": None, "user_id": user_id,
+                "created_at": _iso(nap_end + timedelta(minutes=3)), "updated_at": _iso(nap_end + timedelta(minutes=8)),
+                "start": _iso(nap_start), "end": _iso(nap_end), "timezone_offset": user.offset,
+                "nap": True, "score_state": "SCORED", "score": nap_score,
+            })
+
+        load = _load(_clip(rng.gauss(4 + 4 * user.fitness, 1.5), 0.5, 9))
+        kilojoule = 95 * user.weight * ((next_wake or now) - wake).total_seconds() / 86400 + rng.gauss(0, 300)
+        max_hr = round(user.rhr_base + rng.uniform(45, 70))
+        for workout in day_workouts:
+            score = workout["score"]
+            active_until = max(active_until or workout["end"], workout["end"])
+            if score:
+                load += _load(score["strain"])
+                kilojoule += score["kilojoule"]
+                max_hr = max(max_hr, score["max_heart_rate"])
+            workouts.append({
+                "id": new_id(), "v1_id": None, "user_id": user_id,
+                "created_at": _iso(workout["end"] + timedelta(minutes=2)),
+                "updated_at": _iso(workout["end"] + timedelta(minutes=6)),
+                "start": _iso(workout["start"]), "end": _iso(workout["end"]), "timezone_offset": user.offset,
+                "sport_id": workout["sport_id"], "sport_name": workout["sport_name"],
+                "score_state": "SCORED" if score else "UNSCORABLE", "score": score,
+            })
+
+        strain = _strain(load)
+        user.prev_strain = strain
+        user.usual_strain += (strain - user.usual_strain) / 14
+        cycles.append({
+            "id": cycle_id, "user_id": user_id,
+            "created_at": _iso(sleep_start), "updated_at": _iso(now),
+            "start": _iso(sleep_start), "end": None,
+            "timezone_offset": user.offset, "score_state": "SCORED",
+            "score": {
+                "strain": round(strain, 4),
+                "kilojoule": round(max(kilojoule, 1000.0), 1),
+                "average_heart_rate": round(user.rhr_base + 8 + 0.8 * strain + rng.gauss(0, 2)),
+                "max_heart_rate": max_hr,
+            },
+        })
+
+    # Each cycle ends where the next one starts, at the next sleep onset
+    for cycle, following in zip(cycles, cycles[1:]):
+        cycle["end"] = cycle["updated_at"] = following["start"]
+    for i, sleep in enumerate(s for s in sleeps if s["nap"]):
+        sleep["v1_id"] = user_id * 100_000 + days + i
+    newest_first = lambda records: sorted(records, key=lambda r: r.get("start") or r["created_at"], reverse=True)
+    return {
+        "profile": {"user_id": user_id, "email": f"user{user_id}@example.com",
+                    "first_name": user.first_name, "last_name": user.last_name},
+        "body": {"height_meter": round(user.height, 2), "weight_kilogram": round(user.weight, 1),
+                 "max_heart_rate": user.max_hr},
+        "cycles": newest_first(cycles),
+        "recoveries": sorted(recoveries, key=lambda r: r["created_at"], reverse=True),
+        "sleeps": newest_first(sleeps),
+        "workouts": newest_first(workouts),
+    }
+
+
+def generate_users(users: int = 1, years: float = 1.0, seed: int = 0,
+                   now: datetime | None = None) -> dict[int, dict[str, Any]]:
+    """Datasets for ``users`` users, keyed by user id, all ending at the same moment."""
+    now = now or datetime.now(timezone.utc)
+    return {
+        user_id: generate_user(user_id, years, seed=seed, now=now)
+        for user_id in range(FIRST_USER_ID, FIRST_USER_ID + users)
+    }
+
+
+def load_into_store(store, dataset: dict[str, Any]) -> dict[str, int]:
+    """Write a dataset into a ``WhoopStore`` as fully synced history; returns records per resource."""
+    from whoop_store import RESOURCES
+
+    store.set_document("profile", dataset["profile"])
+    store.set_document("body", dataset["body"])
+    # RESOURCES lists cycles first, so recoveries and sleeps find their cycle's day
+    return {resource: store.load(resource, dataset[resource]) for resource in RESOURCES}
+
+
+def check_days(store, dataset: dict[str, Any]) -> tuple[int, list[str]]:
+    """Check the day index of a loaded dataset against the data itself.
+
+    Every cycle must be filed under the local day its main sleep ends on,
+    and its recovery and sleeps (naps included) under the cycle's day.
+    Returns how many nights began before local midnight and the problems.
+    """
+    from whoop_time import local_day
+
+    filed = {(resource, record_id): day
+             for resource, record_id, day in store.db.execute("SELECT resource, id, local_day FROM records")}
+    cycle_days = {cycle["id"]: filed[("cycles", str(cycle["id"]))] for cycle in dataset["cycles"]}
+    problems = []
+    pre_midnight = 0
+    for sleep in dataset["sleeps"]:
+        day = filed[("sleeps", sleep["id"])]
+        if day != cycle_days[sleep["cycle_id"]]:
+            problems.append(f"sleep {sleep['id']} on {day}, its cycle on {cycle_days[sleep['cycle_id']]}")
+        if not sleep["nap"]:
+            start, end = (local_day(sleep[k], sleep["timezone_offset"]) for k in ("start", "end"))
+            pre_midnight += start != end
+            if day != end:
+                problems.append(f"night {sleep['id']} ending on {end} filed on {day}")
+    for recovery in dataset["recoveries"]:
+        day = filed[("recoveries", str(recovery["cycle_id"]))]
+        if day != cycle_days[recovery["cycle_id"]]:
+            problems.append(f"recovery of cycle {recovery['cycle_id']} on {day}, "
+                            f"its cycle on {cycle_days[recovery['cycle_id']]}")
+    return pre_midnight, problems
+
+
+def token_for(user_id: int) -> str:
+    """Bearer token that selects ``user_id`` on the mock API."""
+    return f"user-{user_id}"
+
+
+def _summary(datasets: dict[int, dict[str, Any]]) -> str:
+    counts = {r: sum(len(d[r]) for d in datasets.values()) for r in ("cycles", "recoveries", "sleeps", "workouts")}
+    return ", ".join(f"{count} {resource}" for resource, count in counts.items())
+
+
+def store_path(path: str, user_id: int, users: int) -> Path:
+    """Store path of one user: ``{user_id}`` in ``path`` is replaced, and with
+    several users and no placeholder the id is added before the suffix."""
+    if "{user_id}" in path:
+        return Path(path.format(user_id=user_id))
+    path = Path(path)
+    return path if users == 1 else path.with_name(f"{path.stem}-{user_id}{path.suffix}")
+
+
+async def _serve(datasets: dict[int, dict[str, Any]], args: argparse.Namespace):
+    # A single user answers any token; with several, the token must pick one
+    only = next(iter(datasets.values())) if len(datasets) == 1 else None
+    api = MockWhoopAPI(only, latency_ms=args.latency_ms,
+                       users={token_for(user_id): dataset for user_id, dataset in datasets.items()})
+    base_url = await api.start(args.host, args.port)
+    if only:
+        print(f"Mock WHOOP API listening on {base_url}")
+    else:
+        print(f"Mock WHOOP API listening on {base_url}; bearer tokens {token_for(min(datasets))}.."
+              f"{token_for(max(datasets))} select a user, others get 401")
+    await asyncio.Event().wait()
+
+
+def main(args: argparse.Namespace):
+    started = time.perf_counter()
+    datasets = generate_users(args.users, args.years, args.seed)
+    print(f"Generated {args.users} user(s) x {args.years} year(s) in {time.perf_counter() - started:.1f}s: "
+          f"{_summary(datasets)}")
+
+    if args.out:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for user_id, dataset in datasets.items():
+            path = out / f"user-{user_id}.json.gz"
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                json.dump(dataset, f, separators=(",", ":"))
+            print(f"  {path} ({path.stat().st_size / 1024:.0f} KB)")
+    if args.store:
+        from whoop_store import WhoopStore
+
+        for user_id, dataset in datasets.items():
+            path = store_path(args.store, user_id, len(datasets))
+            store = WhoopStore(path=path)
+            started = time.perf_counter()
+            counts = load_into_store(store, dataset)
+            store.close()
+            print(f"Loaded user {user_id} into {path} in {time.perf_counter() - started:.1f}s: {counts}")
+    if args.check:
+        from whoop_store import WhoopStore
+
+        failed = False
+        with tempfile.TemporaryDirectory() as tmp:
+            for user_id, dataset in datasets.items():
+                store = WhoopStore(path=Path(tmp) / f"user-{user_id}.sqlite3")
+                load_into_store(store, dataset)
+                pre_midnight, problems = check_days(store, dataset)
+                store.close()
+                print(f"  user {user_id} ({dataset['cycles'][0]['timezone_offset']}): {pre_midnight} night(s) "
+                      f"began before local midnight, {len(problems)} day index problem(s)")
+                for problem in problems[:10]:
+                    print(f"    {problem}")
+                failed = failed or bool(problems)
+        if failed:
+            sys.exit(1)
+    if args.serve:
+        try:
+            asyncio.run(_serve(datasets, args))
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write one user-<id>.json.gz per user to this directory")
+    parser.add_argument("--store", help="load each user into a WhoopStore database at this path "
+                                        "({user_id} is replaced; otherwise several users get -<id> added)")
+    parser.add_argument("--check", action="store_true",
+                        help="load each user into a temporary store and check its day index")
+    parser.add_argument("--serve", action="store_true", help="serve the datasets with the mock API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""Replay sample WHOOP webhook events against a local server.
+
+Each sample in ``tools/webhook_samples`` is signed the way WHOOP signs
+deliveries (HMAC-SHA256 of timestamp + body with the app's client secret)
+and POSTed to ``/webhooks/whoop``. Point the FastAPI server at the mock API
+(``benchmarks/mock_whoop_api.py``, ``WHOOP_API_BASE=http://127.0.0.1:8090``)
+to exercise the whole path offline.
+
+Usage:
+    python tools/replay_webhook.py workout_updated recovery_updated
+    python tools/replay_webhook.py sleep_updated --id <sleep-uuid>
+    python tools/replay_webhook.py --type workout.deleted --id <workout-uuid>
+    python tools/replay_webhook.py workout_updated --tamper   # expect 401
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from whoop_webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign  # noqa: E402
+
+SAMPLES_DIR = Path(__file__).resolve().parent / "webhook_samples"
+
+
+def load_event(name: str | None, args: argparse.Namespace) -> dict:
+    event = json.loads((SAMPLES_DIR / f"{name}.json").read_text()) if name else {"user_id": 0}
+    if args.type:
+        event["type"] = args.type
+    if args.id:
+        event["id"] = args.id
+    event["trace_id"] = str(uuid.uuid4())
+    return event
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("samples", nargs="*", help=f"sample names from {SAMPLES_DIR.name}/")
+    parser.add_argument("--url", default="http://localhost:3000/webhooks/whoop")
+    parser.add_argument("--secret", default=os.getenv("WHOOP_CLIENT_SECRET", ""))
+    parser.add_argument("--type", help="override the event type, e.g. sleep.updated")
+    parser.add_argument("--id", help="override the record id")
+    parser.add_argument("--tamper", action="store_true", help="alter the body after signing")
+    parser.add_argument("--list", action="store_true", help="list the available samples")
+    args = parser.parse_args()
+
+    if args.list:
+        for path in sorted(SAMPLES_DIR.glob("*.json")):
+            print(path.stem)
+        return
+    if not args.samples and not (args.type and args.id):
+        parser.error("give sample names, or --type and --id")
+    if not args.secret:
+        parser.error("set WHOOP_CLIENT_SECRET or pass --secret")
+
+    for name in args.samples or [None]:
+        body = json.dumps(load_event(name, args)).encode()
+        timestamp = str(int(time.time() * 1000))
+        signature = sign(args.secret, timestamp, body)
+        if args.tamper:
+            body = body.replace(b'"type"', b'"type" ')
+        response = httpx.post(
+            args.url,
+            content=body,
+            headers={"Content-Type": "application/json", SIGNATURE_HEADER: signature, TIMESTAMP_HEADER: timestamp},
+        )
+        print(f"{name or args.type}: {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""In-memory TTL + LRU cache for WHOOP API responses.
+
+``whoop_client.api_get`` consults the process-wide ``response_cache`` before
+going upstream, so repeated calls within a conversation or across dashboard
+views are answered from memory. Entries are keyed by the normalized request
+(path plus sorted query parameters), expire after a per-resource TTL, and are
+evicted least-recently-used once the entry or byte budget is exceeded.
+
+Records that can no longer change (scored and, where applicable, ended; see
+``is_final``) make a response permanent: it stays cached until evicted or
+explicitly invalidated instead of expiring.
+
+Configuration:
+    WHOOP_CACHE_MAX_ENTRIES  Maximum cached responses (default 512)
+    WHOOP_CACHE_MAX_BYTES    Maximum total body size in bytes (default 8 MiB)
+    WHOOP_CACHE_ENABLED      Set to false to disable caching (default true)
+"""
+
+import json
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+# (pattern, ttl seconds) matched in order against the unversioned request key.
+# A TTL of 0 means "do not cache".
+DEFAULT_POLICIES: list[tuple[str, float]] = [
+    (r"^/user/profile/basic", 24 * 3600),
+    (r"^/user/(measurement/body|body_measurement)", 24 * 3600),
+    # Latest cycle: the active cycle's strain keeps changing during the day
+    (r"^/cycle\?(?!.*start=).*limit=1(&|$)", 60),
+    (r"^/cycle/[^/?]+/(recovery|sleep)", 300),
+    (r"^/cycle", 120),
+    (r"^/(recovery|activity/sleep|activity/workout|workout)", 300),
+]
+DEFAULT_TTL = 60.0
+
+_VERSION_PREFIX = re.compile(r"^/developer/v\d+")
+
+# Score states WHOOP never revisits
+FINAL_SCORE_STATES = {"SCORED", "UNSCORABLE"}
+
+
+def is_final(record: dict[str, Any]) -> bool:
+    """Return True if a WHOOP record will not change any more.
+
+    A record is final once its score_state is SCORED (or UNSCORABLE) and, for
+    records with a time span (cycles, sleeps, workouts), once ``end`` is set;
+    the active cycle has ``end`` = None until the next wake-up.
+    """
+    if record.get("score_state") not in FINAL_SCORE_STATES:
+        return False
+    return "end" not in record or record["end"] is not None
+
+
+def is_immutable_response(key: str, payload: Any) -> bool:
+    """Return True if a cached payload can never go stale.
+
+    Single records qualify when final. Collection pages qualify only for a
+    closed range (an ``end`` parameter) in which every record is final, since
+    an open-ended "latest" query can gain new records at any time.
+    """
+    if not isinstance(payload, dict):
+        return False
+    if "records" in payload:
+        records = payload["records"]
+        return "end=" in key.partition("?")[2] and bool(records) and all(is_final(r) for r in records)
+    return "score_state" in payload and is_final(payload)
+
+
+def normalize_key(path: str, params: dict[str, Any] | None = None) -> str:
+    """Build a cache key from a path (which may carry a query) and params."""
+    path, _, query = path.partition("?")
+    items = parse_qsl(query)
+    if params:
+        items.extend((k, str(v)) for k, v in params.items() if v is not None)
+    items.sort()
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+def resource_key(key: str) -> str:
+    """Strip the /developer/vN prefix so policies apply to both API versions."""
+    return _VERSION_PREFIX.sub("", key)
+
+
+class ResponseCache:
+    """Bounded cache of successful ``httpx.Response`` objects."""
+
+    def __init__(
+        self,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        policies: list[tuple[str, float]] | None = None,
+        default_ttl: float = DEFAULT_TTL,
+    ):
+        self.max_entries = max_entries or int(os.getenv("WHOOP_CACHE_MAX_ENTRIES", 512))
+        self.max_bytes = max_bytes or int(os.getenv("WHOOP_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+        self.enabled = os.getenv("WHOOP_CACHE_ENABLED", "true").lower() == "true"
+        self.policies = [(re.compile(p), ttl) for p, ttl in (policies or DEFAULT_POLICIES)]
+        self.default_ttl = default_ttl
+        # key -> (expires_at, size, response)
+        self._entries: OrderedDict[str, tuple[float, int, httpx.Response]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.permanent = 0
+
+    def ttl_for(self, key: str) -> float:
+        """Return the TTL policy that applies to a normalized key."""
+        resource = resource_key(key)
+        for pattern, ttl in self.policies:
+            if pattern.search(resource):
+                return ttl
+        return self.default_ttl
+
+    def get(self, key: str) -> httpx.Response | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, _, response = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: httpx.Response, ttl: float | None = None):
+        """Cache a response for ``ttl`` seconds (default: the key's policy).
+
+        Payloads that only hold final records never expire, whatever the
+        TTL (see ``is_immutable_response``).
+        """
+        if ttl is None:
+            ttl = self.ttl_for(key)
+        size = len(response.content)
+        if not self.enabled or ttl <= 0 or size > self.max_bytes:
+            return
+        if self._is_immutable(key, response):
+            ttl = math.inf
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, response)
+        self._bytes += size
+        if ttl == math.inf:
+            self.permanent += 1
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def is_permanent(self, key: str) -> bool:
+        """Whether ``key`` is cached for good (its records can no longer change)."""
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] == math.inf
+
+    def invalidate(self, prefix: str | None = None) -> int:
+        """Drop entries whose unversioned key starts with ``prefix`` (all if None)."""
+        if prefix is None:
+            keys = list(self._entries)
+        else:
+            keys = [k for k in self._entries if resource_key(k).startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "permanent": self.permanent,
+        }
+
+    @staticmethod
+    def _is_immutable(key: str, response: httpx.Response) -> bool:
+        try:
+            return is_immutable_response(key, json.loads(response.content))
+        except ValueError:
+            return False
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+# Process-wide cache used by whoop_client.api_get
+response_cache = ResponseCache()
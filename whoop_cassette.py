@@ -0,0 +1,221 @@
+"""Record/replay of WHOOP API responses for network-free runs.
+
+The shared client (whoop_client.py) sends every request through a
+``CassetteTransport`` when a cassette mode is set:
+
+* ``record``: requests go upstream as usual, and each API GET response
+  (status, content type, body and how long it took) is saved to a gzip'd
+  JSON cassette when the client closes. New recordings are merged into an
+  existing cassette.
+* ``replay``: nothing leaves the process. Each request is answered from the
+  cassette, optionally after a simulated latency; a request that is not in
+  it fails with ``CassetteMiss`` instead of reaching the network.
+
+Interactions are keyed by path and sorted query, not by token, so any
+session replays them. Syncs put the current time in ``start``/``end``
+parameters; when no exact match exists, replay falls back to the latest
+recording of the same request with those two parameters ignored, so a
+cassette keeps working on later days.
+
+Only ``/developer/...`` GETs are recorded. OAuth token exchanges and any
+other request pass through in record mode and are refused in replay mode,
+so credentials never end up in a cassette. Cassettes do contain personal
+health data; the default path is git-ignored.
+
+For exact repeats, replay into an empty store (``WHOOP_STORE_PATH``):
+records already stored are not requested again.
+
+Configuration:
+    WHOOP_CASSETTE_MODE     off (default), record or replay
+    WHOOP_CASSETTE_PATH     Cassette file (default .whoop_cassette.json.gz)
+    WHOOP_CASSETTE_LATENCY  Replay delay per request in ms, or "recorded" to reuse
+                            each response's recorded time (default 0)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from whoop_cache import normalize_key
+
+DEFAULT_CASSETTE_PATH = Path(__file__).parent / ".whoop_cassette.json.gz"
+CASSETTE_VERSION = 1
+# Query parameters that carry the current time
+TIME_PARAMS = frozenset({"start", "end"})
+# Transient failures are not worth replaying
+UNRECORDED_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Response headers that describe the wire encoding of the original body
+_WIRE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def debug_log(message: str):
+    """Log cassette messages to stderr."""
+    print(f"[WHOOP-CASSETTE] {message}", file=sys.stderr, flush=True)
+
+
+class CassetteMiss(httpx.RequestError):
+    """A replayed request that the cassette has no response for."""
+
+
+def _key(request: httpx.Request) -> str | None:
+    """Cassette key of a recordable request, or None."""
+    if request.method != "GET" or not request.url.path.startswith("/developer/"):
+        return None
+    return normalize_key(f"{request.url.path}?{request.url.query.decode()}")
+
+
+def _loose_key(key: str) -> str:
+    path, _, query = key.partition("?")
+    items = [(k, v) for k, v in parse_qsl(query) if k not in TIME_PARAMS]
+    return f"{path}?{urlencode(items)}" if items else path
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records API responses to, or replays them from, a cassette."""
+
+    def __init__(
+        self,
+        mode: str,
+        path: str | Path,
+        inner: httpx.AsyncBaseTransport | None = None,
+        latency: float | str = 0.0,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+        if mode == "record" and inner is None:
+            raise ValueError("Recording needs a transport to send requests with")
+        self.mode = mode
+        self.path = Path(path)
+        self.inner = inner
+        self.latency = latency
+        self.interactions: dict[str, dict[str, Any]] = self._load()
+        self._loose: dict[str, str] = {}
+        for key in self.interactions:
+            self._loose[_loose_key(key)] = key
+        self.recorded = 0
+        self.hits = 0
+        self.loose_hits = 0
+        self.misses = 0
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not self.path.exists():
+            if self.mode == "replay":
+                debug_log(f"No cassette at {self.path}; every request will miss")
+            return {}
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            cassette = json.load(f)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {self.path}: {cassette.get('version')}")
+        debug_log(f"Loaded {len(cassette['interactions'])} interactions from {self.path}")
+        return cassette["interactions"]
+
+    def save(self):
+        """Write the cassette (atomically) if anything was recorded."""
+        if not self.recorded:
+            return
+        payload = {
+            "version": CASSETTE_VERSION,
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "interactions": self.interactions,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp, self.path)
+        debug_log(f"Saved {len(self.interactions)} interactions ({self.recorded} new) to {self.path}")
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = _key(request)
+        if self.mode == "replay":
+            return await self._replay(request, key)
+
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        if key is None or response.status_code in UNRECORDED_STATUSES:
+            return response
+        # Read (and decode) the body so it can be stored and handed on
+        body = await response.aread()
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        content_type = response.headers.get("content-type", "")
+        entry: dict[str, Any] = {"status": response.status_code, "content_type": content_type,
+                                 "elapsed_ms": elapsed_ms}
+        try:
+            entry["json"] = json.loads(body) if "json" in content_type else None
+        except ValueError:
+            entry["json"] = None
+        if entry["json"] is None:
+            entry["text"] = body.decode("utf-8", errors="replace")
+        # Re-insert so the latest recording also comes last after a reload
+        self.interactions.pop(key, None)
+        self.interactions[key] = entry
+        self._loose[_loose_key(key)] = key
+        self.recorded += 1
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _WIRE_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=body,
+                              extensions=response.extensions, request=request)
+
+    async def _replay(self, request: httpx.Request, key: str | None) -> httpx.Response:
+        entry = self.interactions.get(key) if key else None
+        if entry is None and key is not None:
+            loose = self._loose.get(_loose_key(key))
+            entry = self.interactions.get(loose) if loose else None
+            if entry is not None:
+                self.loose_hits += 1
+        if entry is None:
+            self.misses += 1
+            debug_log(f"Miss: {request.method} {request.url.path}?{request.url.query.decode()}")
+            raise CassetteMiss(f"{request.method} {request.url.path} is not in the cassette", request=request)
+        self.hits += 1
+
+        delay = entry["elapsed_ms"] if self.latency == "recorded" else float(self.latency)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if entry.get("json") is not None:
+            content = json.dumps(entry["json"], separators=(",", ":"), ensure_ascii=False).encode()
+        else:
+            content = entry.get("text", "").encode()
+        return httpx.Response(entry["status"], headers={"content-type": entry["content_type"]},
+                              content=content, request=request)
+
+    async def aclose(self):
+        if self.mode == "record":
+            self.save()
+        if self.inner is not None:
+            await self.inner.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "interactions": len(self.interactions),
+            "recorded": self.recorded,
+            "hits": self.hits,
+            "loose_hits": self.loose_hits,
+            "misses": self.misses,
+        }
+
+
+def cassette_transport(**transport_options: Any) -> CassetteTransport | None:
+    """Build the transport for WHOOP_CASSETTE_MODE, or None when cassettes are off.
+
+    ``transport_options`` (http2, limits, ...) configure the real transport
+    used for recording.
+    """
+    mode = os.getenv("WHOOP_CASSETTE_MODE", "off").lower()
+    if mode in ("", "off"):
+        return None
+    path = os.getenv("WHOOP_CASSETTE_PATH") or DEFAULT_CASSETTE_PATH
+    latency = os.getenv("WHOOP_CASSETTE_LATENCY", "0")
+    latency = latency if latency == "recorded" else float(latency)
+    inner = httpx.AsyncHTTPTransport(**transport_options) if mode == "record" else None
+    debug_log(f"{mode.capitalize()}ing {path}")
+    return CassetteTransport(mode, path, inner, latency)
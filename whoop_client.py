@@ -0,0 +1,511 @@
+"""Shared WHOOP API client.
+
+Both servers (whoop_simple.py and whoop_mcp_server.py) send every WHOOP call
+through one long-lived, pooled ``httpx.AsyncClient`` per process instead of
+opening a new client per request. Connections are kept alive between calls
+and, when the ``h2`` package is installed, multiplexed over HTTP/2, so after
+warm-up a request costs no new TCP/TLS handshake.
+
+Configuration (read when the client is first created):
+    WHOOP_API_BASE          API host (default https://api.prod.whoop.com)
+    WHOOP_HTTP2             Use HTTP/2 when available (default true)
+    WHOOP_MAX_CONNECTIONS   Maximum open connections in the pool (default 20)
+    WHOOP_MAX_KEEPALIVE     Maximum idle keep-alive connections (default 10)
+    WHOOP_KEEPALIVE_EXPIRY  Seconds an idle connection stays open (default 60)
+    WHOOP_HTTP_TIMEOUT      Request timeout in seconds (default 10)
+    WHOOP_TOKEN_CHECK_INTERVAL  Seconds between token file change checks (default 1)
+    WHOOP_RATE_LIMIT_PER_MINUTE Upstream requests allowed per minute (default 100)
+    WHOOP_RATE_LIMIT_PER_DAY    Upstream requests allowed per day (default 10000)
+    WHOOP_RETRY_ATTEMPTS        Attempts per GET on 429/5xx/transport errors (default 4)
+    WHOOP_RETRY_MAX_WAIT        Longest wait before a retry, in seconds (default 60)
+    WHOOP_CASSETTE_MODE         Record API responses to, or replay them from, a cassette
+                                (default off; see whoop_cassette.py)
+
+Successful GET responses are cached in ``whoop_cache.response_cache``, and
+identical GETs that are in flight at the same time share one upstream call.
+
+Upstream GETs pass through token-bucket limiters matched to WHOOP's per-app
+quotas (100/minute, 10,000/day), so bulk syncs queue locally instead of
+tripping 429s. Rate-limited and transient 5xx/transport failures are retried
+with jittered exponential backoff; a ``Retry-After`` (or
+``X-RateLimit-Reset``) header sets the wait instead and pauses every other
+request too. The limiters are per process: when both servers run, lower the
+limits so their sum stays within the quota.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+from aiolimiter import AsyncLimiter
+from dotenv import load_dotenv
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+# Shared modules read their settings at import time, before the servers'
+# own load_dotenv() call runs
+load_dotenv()
+
+from whoop_cache import normalize_key, response_cache  # noqa: E402
+from whoop_cassette import cassette_transport  # noqa: E402
+from whoop_metrics import endpoint_label, upstream_latency  # noqa: E402
+
+try:
+    import h2  # noqa: F401  (only needed so httpx can negotiate HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_API_BASE = "https://api.prod.whoop.com"
+# Largest page size the WHOOP collection endpoints accept
+MAX_PAGE_SIZE = 25
+# Statuses worth retrying for an idempotent GET
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_client: httpx.AsyncClient | None = None
+
+# (normalized request, token) -> upstream task shared by concurrent callers
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+# normalized request -> number of calls that joined an in-flight request
+coalesced_calls: Counter[str] = Counter()
+# retry reason (status code or exception name) -> number of retries
+retry_counts: Counter[str] = Counter()
+# Monotonic time before which no request is sent (set by Retry-After)
+_paused_until = 0.0
+
+
+def debug_log(message: str):
+    """Log client messages to stderr (stdout is reserved for MCP)."""
+    print(f"[WHOOP-CLIENT] {message}", file=sys.stderr, flush=True)
+
+
+class WhoopAPIError(Exception):
+    """Non-200 response from the WHOOP API while paging through records."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"API error {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+_minute_limiter = AsyncLimiter(_env_int("WHOOP_RATE_LIMIT_PER_MINUTE", 100), 60)
+_day_limiter = AsyncLimiter(_env_int("WHOOP_RATE_LIMIT_PER_DAY", 10000), 24 * 3600)
+
+
+class _RetryableStatus(Exception):
+    """Raised inside the retry loop for a response worth retrying."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    """Seconds the server asked us to wait, from Retry-After or X-RateLimit-Reset."""
+    # X-RateLimit-Reset is sent on every response; it only means "wait" on a 429
+    headers = ("Retry-After", "X-RateLimit-Reset") if response.status_code == 429 else ("Retry-After",)
+    for header in headers:
+        value = response.headers.get(header)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            continue
+        return max(0.0, moment.timestamp() - time.time())
+    return None
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Create the pooled client from the current environment."""
+    http2 = os.getenv("WHOOP_HTTP2", "true").lower() == "true" and HTTP2_AVAILABLE
+    limits = httpx.Limits(
+        max_connections=_env_int("WHOOP_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=_env_int("WHOOP_MAX_KEEPALIVE", 10),
+        keepalive_expiry=_env_float("WHOOP_KEEPALIVE_EXPIRY", 60.0),
+    )
+    base_url = os.getenv("WHOOP_API_BASE", DEFAULT_API_BASE)
+    debug_log(f"Opening pooled client for {base_url} (http2={http2}, limits={limits})")
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=http2,
+        limits=limits,
+        timeout=_env_float("WHOOP_HTTP_TIMEOUT", 10.0),
+        # None unless WHOOP_CASSETTE_MODE is set; then it wraps the pooled transport
+        transport=cassette_transport(http2=http2, limits=limits),
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_client():
+    """Close the process-wide client and release its pooled connections."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        debug_log("Pooled client closed")
+    _client = None
+
+
+class TokenProvider:
+    """Process-wide holder for the cached OAuth access token.
+
+    The token file is parsed once and served from memory. At most every
+    ``check_interval`` seconds a single ``stat`` call compares the file's
+    inode, mtime and size with the last load, so a re-authentication written
+    by the FastAPI server is picked up without re-reading JSON per request.
+    """
+
+    def __init__(self, path: Path, check_interval: float | None = None):
+        self.path = Path(path)
+        if check_interval is None:
+            check_interval = _env_float("WHOOP_TOKEN_CHECK_INTERVAL", 1.0)
+        self.check_interval = check_interval
+        self._token: str | None = None
+        self._signature: tuple[int, int, int] | None = None
+        self._checked_at: float | None = None
+        self._listeners: list[Callable[[str | None], None]] = []
+
+    def get(self) -> str | None:
+        """Return the current token, reloading only if the file changed."""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._refresh()
+        return self._token
+
+    def add_listener(self, callback: Callable[[str | None], None]):
+        """Call ``callback(new_token)`` whenever the token changes."""
+        self._listeners.append(callback)
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._signature = None
+            if self._token is not None:
+                debug_log(f"Token file removed: {self.path}")
+                self._set_token(None)
+            return
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        try:
+            with open(self.path, "r") as f:
+                token = json.load(f).get("access_token")
+        except (OSError, ValueError) as e:
+            # Partially written file; retry on the next check
+            debug_log(f"ERROR loading token: {e}")
+            self._signature = None
+            return
+
+        if not token:
+            debug_log("ERROR: No access_token field in token file")
+        elif token != self._token:
+            debug_log(f"Token loaded from {self.path} (length: {len(token)})")
+        self._set_token(token or None)
+
+    def _set_token(self, token: str | None):
+        if token == self._token:
+            return
+        self._token = token
+        for callback in self._listeners:
+            callback(token)
+
+
+@asynccontextmanager
+async def lifespan(app: Any = None):
+    """Open the shared client for the lifetime of a server.
+
+    Usable directly as a FastAPI ``lifespan`` or as a plain async context
+    manager (``async with lifespan(): ...``) around the MCP stdio loop.
+    """
+    get_client()
+    try:
+        yield
+    finally:
+        await close_client()
+
+
+async def api_get(
+    path: str,
+    token: str,
+    params: dict[str, Any] | None = None,
+    cache: bool = True,
+    refresh: bool = False,
+    ttl: float | None = None,
+) -> httpx.Response:
+    """Send an authenticated GET to the WHOOP API over the shared client.
+
+    Args:
+        path: API path relative to WHOOP_API_BASE (e.g. "/developer/v2/cycle")
+        token: OAuth access token
+        params: Optional query parameters
+        cache: Serve from / store into the response cache (200s only)
+        refresh: Refetch even if cached (unless cached for good) and store the result
+        ttl: Cache lifetime for the new response instead of the key's policy
+
+    The response is returned as-is; callers decide how to treat status codes.
+    """
+    key = normalize_key(path, params)
+    if cache and (not refresh or response_cache.is_permanent(key)):
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Single-flight: concurrent identical requests await the same upstream call.
+    # Callers are shielded so one caller's cancellation does not fail the others.
+    flight_key = (key, token)
+    task = _inflight.get(flight_key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch(path, token, params, key if cache else None, ttl))
+        _inflight[flight_key] = task
+        task.add_done_callback(lambda t: _end_flight(flight_key, t))
+    else:
+        coalesced_calls[key] += 1
+    return await asyncio.shield(task)
+
+
+async def _fetch(
+    path: str,
+    token: str,
+    params: dict[str, Any] | None,
+    cache_key: str | None,
+    ttl: float | None = None,
+) -> httpx.Response:
+    max_wait = _env_float("WHOOP_RETRY_MAX_WAIT", 60.0)
+    backoff = wait_random_exponential(multiplier=0.5, max=max_wait)
+
+    def wait(retry_state) -> float:
+        error = retry_state.outcome.exception()
+        if isinstance(error, _RetryableStatus):
+            delay = _retry_after(error.response)
+            if delay is not None:
+                return delay
+        return backoff(retry_state)
+
+    def asked_to_wait_too_long(retry_state) -> bool:
+        error = retry_state.outcome.exception()
+        if not isinstance(error, _RetryableStatus):
+            return False
+        delay = _retry_after(error.response)
+        return delay is not None and delay > max_wait
+
+    def before_sleep(retry_state):
+        global _paused_until
+        error = retry_state.outcome.exception()
+        if isinstance(error, _RetryableStatus):
+            reason = str(error.response.status_code)
+            if _retry_after(error.response) is not None:
+                # The quota is shared, so hold back every request, not just this one
+                _paused_until = max(_paused_until, time.monotonic() + retry_state.upcoming_sleep)
+        else:
+            reason = type(error).__name__
+        retry_counts[reason] += 1
+        debug_log(
+            f"Retrying GET {path} after {reason} "
+            f"(attempt {retry_state.attempt_number}, waiting {retry_state.upcoming_sleep:.1f}s)"
+        )
+
+    try:
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(_env_int("WHOOP_RETRY_ATTEMPTS", 4)) | asked_to_wait_too_long,
+            wait=wait,
+            retry=retry_if_exception_type((_RetryableStatus, httpx.TransportError)),
+            before_sleep=before_sleep,
+            reraise=True,
+        ):
+            with attempt:
+                response = await _send(path, token, params)
+    except _RetryableStatus as e:
+        # Out of attempts: hand the last response to the caller as usual
+        response = e.response
+
+    if cache_key is not None and response.status_code == 200:
+        response_cache.put(cache_key, response, ttl)
+    return response
+
+
+async def _send(path: str, token: str, params: dict[str, Any] | None) -> httpx.Response:
+    """One rate-limited upstream GET; raises _RetryableStatus for retryable statuses.
+
+    Each attempt is timed into ``whoop_metrics.upstream_latency``, excluding
+    time spent waiting for a pause or the rate limiters.
+    """
+    pause = _paused_until - time.monotonic()
+    if pause > 0:
+        await asyncio.sleep(pause)
+    async with _minute_limiter, _day_limiter:
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await get_client().get(
+                path,
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            status = response.status_code
+        except httpx.TransportError as e:
+            status = type(e).__name__
+            raise
+        finally:
+            upstream_latency.observe(time.perf_counter() - started, endpoint_label(path), status)
+    if response.status_code in RETRY_STATUSES:
+        raise _RetryableStatus(response)
+    return response
+
+
+def _end_flight(flight_key: tuple[str, str], task: asyncio.Task):
+    if _inflight.get(flight_key) is task:
+        del _inflight[flight_key]
+    if not task.cancelled():
+        task.exception()  # retrieved here in case every caller was cancelled
+
+
+async def run_fetch_plan(
+    plan: dict[str, tuple[tuple[str, ...], Callable[..., Awaitable[Any]]]],
+) -> dict[str, Any]:
+    """Run a dependency-aware fetch plan and return every step's result.
+
+    ``plan`` maps a step name to ``(dependency names, async function)``. A
+    step starts as soon as all of its dependencies have finished and receives
+    their results as keyword arguments, so independent steps run concurrently:
+
+        await run_fetch_plan({
+            "profile": ((), fetch_profile),
+            "cycles": ((), fetch_cycles),
+            "recovery": (("cycles",), fetch_recovery),  # fetch_recovery(cycles=...)
+        })
+    """
+    tasks: dict[str, asyncio.Future] = {}
+
+    def schedule(name: str) -> asyncio.Future:
+        if name not in tasks:
+            deps, fn = plan[name]
+
+            async def run():
+                results = await asyncio.gather(*(schedule(dep) for dep in deps))
+                return await fn(**dict(zip(deps, results)))
+
+            tasks[name] = asyncio.ensure_future(run())
+        return tasks[name]
+
+    try:
+        results = await asyncio.gather(*(schedule(name) for name in plan))
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    return dict(zip(plan, results))
+
+
+def flight_stats() -> dict[str, Any]:
+    """Return single-flight metrics: calls coalesced per request and in total."""
+    return {
+        "in_flight": len(_inflight),
+        "coalesced_total": sum(coalesced_calls.values()),
+        "coalesced_by_request": dict(coalesced_calls.most_common()),
+    }
+
+
+def retry_stats() -> dict[str, Any]:
+    """Return upstream retry metrics: retries in total and per reason."""
+    return {
+        "retries_total": sum(retry_counts.values()),
+        "retries_by_reason": dict(retry_counts.most_common()),
+        "paused_for_s": round(max(0.0, _paused_until - time.monotonic()), 3),
+    }
+
+
+async def iter_pages(
+    path: str,
+    token: str,
+    params: dict[str, Any] | None = None,
+    limit: int | None = None,
+    page_size: int = MAX_PAGE_SIZE,
+    cache: bool = True,
+) -> AsyncIterator[list[dict[str, Any]]]:
+    """Yield pages of records from a WHOOP collection endpoint.
+
+    Follows ``next_token`` until the collection (or ``limit`` records) is
+    exhausted. The request for the next page is started before the current
+    page is handed to the caller, so fetching overlaps with consumption while
+    at most two pages are held in memory. With ``cache=False`` every page
+    comes from upstream and bypasses the response cache (see ``api_get``).
+
+    Raises:
+        WhoopAPIError: if any page comes back with a non-200 status
+    """
+    base_params = dict(params or {})
+    fetched = 0
+
+    async def fetch(next_token: str | None, size: int) -> dict[str, Any]:
+        page_params = {**base_params, "limit": size}
+        if next_token:
+            page_params["nextToken"] = next_token
+        response = await api_get(path, token, page_params, cache=cache)
+        if response.status_code != 200:
+            raise WhoopAPIError(response.status_code, response.text)
+        return response.json()
+
+    def page_size_for(already: int) -> int:
+        return min(page_size, limit - already) if limit else page_size
+
+    pending: asyncio.Future | None = asyncio.ensure_future(fetch(None, page_size_for(0)))
+    try:
+        while pending is not None:
+            data = await pending
+            records = data.get("records", [])
+            if limit:
+                records = records[:limit - fetched]
+            fetched += len(records)
+            next_token = data.get("next_token")
+            more = next_token and records and (not limit or fetched < limit)
+            pending = asyncio.ensure_future(fetch(next_token, page_size_for(fetched))) if more else None
+            yield records
+    finally:
+        if pending is not None:
+            if not pending.done():
+                pending.cancel()
+            elif not pending.cancelled():
+                pending.exception()  # mark a failed prefetch as retrieved
+
+
+async def iter_records(
+    path: str,
+    token: str,
+    params: dict[str, Any] | None = None,
+    limit: int | None = None,
+    cache: bool = True,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yield individual records across pages (see ``iter_pages``)."""
+    async for page in iter_pages(path, token, params, limit=limit, cache=cache):
+        for record in page:
+            yield record
@@ -0,0 +1,327 @@
+"""Conditional GET and compression for the FastAPI server's responses.
+
+Two small ASGI middlewares plus helpers for routes:
+
+* ``record_etag`` derives a strong ETag from the versions (id + updated_at)
+  of the WHOOP records a response is built from, and ``conditional_json``
+  answers ``If-None-Match`` with 304 before the body is even serialized.
+* ``ConditionalGetMiddleware`` gives every other complete 200 HTML/JSON
+  response a content-hash ETag and turns matching requests into 304s.
+* ``CompressionMiddleware`` compresses HTML/JSON/CSS bodies above a size
+  threshold with brotli (when the ``brotli`` package is installed and the
+  client accepts it) or gzip. Streamed bodies are compressed chunk by chunk;
+  server-sent events are never buffered or compressed. Every compressible
+  response varies on Accept-Encoding, and a 304 repeats the encoded ETag
+  (``-br``/``-gzip``) of the 200 the client revalidates.
+
+Configuration:
+    WHOOP_COMPRESS_MIN_SIZE  Smallest body compressed, in bytes (default 500)
+    WHOOP_GZIP_LEVEL         gzip level (default 6)
+    WHOOP_BROTLI_QUALITY     brotli quality (default 5)
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json", "text/html", "text/css", "text/plain", "text/javascript", "application/javascript",
+})
+# Clients may keep the ETag but must revalidate before reusing the body
+REVALIDATE = "private, no-cache"
+# Appended to an ETag when the body is compressed, so each encoding has its own
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def _media_type(headers: Headers) -> str:
+    return headers.get("content-type", "").partition(";")[0].strip().lower()
+
+
+def record_version(record: dict[str, Any] | None) -> str:
+    """Version of one WHOOP record: its id and updated_at, or a content hash."""
+    if record is None:
+        return "-"
+    updated_at = record.get("updated_at")
+    if updated_at is None:
+        return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+    record_id = record.get("id", record.get("cycle_id"))
+    return f"{record_id}@{updated_at}"
+
+
+def record_etag(*records: dict[str, Any] | None) -> str:
+    """Strong ETag for a response built from exactly these records, in order."""
+    digest = hashlib.sha256("\n".join(record_version(r) for r in records).encode())
+    return f'"{digest.hexdigest()[:24]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        candidate = candidate.removeprefix("W/")
+        for suffix in ENCODING_SUFFIXES:
+            if candidate.endswith(f'{suffix}"'):
+                candidate = candidate[:-len(suffix) - 1] + '"'
+                break
+        if candidate == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+def _presented(if_none_match: str | None, etag: str) -> bool:
+    """Whether ``etag`` is literally one of the If-None-Match candidates."""
+    candidates = (c.strip().removeprefix("W/") for c in (if_none_match or "").split(","))
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def conditional_json(request: Request, payload: Any, etag: str) -> Response:
+    """JSON response tagged with ``etag``, or a bodyless 304 if the client has it."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return JSONResponse(payload, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+class ConditionalGetMiddleware:
+    """Content-hash ETags and If-None-Match → 304 for complete GET responses.
+
+    Responses that already carry an ETag are only checked against the
+    request. Streamed responses (no Content-Length) without an ETag are
+    passed through untouched, as hashing them would mean buffering them.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Message = {}
+        body = bytearray()
+        mode = "pass"
+
+        async def send_conditional(message: Message):
+            nonlocal start, mode
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                etag = headers.get("etag")
+                if message["status"] != 200:
+                    mode = "pass"
+                elif etag:
+                    mode = "discard" if etag_matches(if_none_match, etag) else "pass"
+                elif (
+                    scope["method"] == "GET"
+                    and "content-length" in headers
+                    and _media_type(headers) in COMPRESSIBLE_TYPES
+                ):
+                    mode = "buffer"
+                if mode == "discard":
+                    await send(not_modified_start(etag))
+                elif mode == "pass":
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if message["type"] != "http.response.body" or mode == "pass":
+                await send(message)
+                return
+            more_body = message.get("more_body", False)
+            if mode == "discard":
+                if not more_body:
+                    await send({"type": "http.response.body", "body": b""})
+                return
+
+            body.extend(message.get("body", b""))
+            if more_body:
+                return
+            etag = f'"{hashlib.sha256(body).hexdigest()[:24]}"'
+            if etag_matches(if_none_match, etag):
+                await send(not_modified_start(etag))
+                await send({"type": "http.response.body", "body": b""})
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = REVALIDATE
+            await send(start)
+            await send({"type": "http.response.body", "body": bytes(body)})
+
+        await self.app(scope, receive, send_conditional)
+
+
+def not_modified_start(etag: str) -> Message:
+    headers = MutableHeaders()
+    headers["ETag"] = etag
+    headers["Cache-Control"] = REVALIDATE
+    headers["Vary"] = "Accept-Encoding"
+    return {"type": "http.response.start", "status": 304, "headers": headers.raw}
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Best encoding the client accepts: "br" (if available), "gzip" or None."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip())
+    if BROTLI_AVAILABLE and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental compressor producing a valid stream after every flush."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """brotli/gzip compression for text responses above ``minimum_size`` bytes."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int | None = None,
+        gzip_level: int | None = None,
+        brotli_quality: int | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(os.getenv("WHOOP_COMPRESS_MIN_SIZE", 500))
+        self.gzip_level = gzip_level if gzip_level is not None else int(os.getenv("WHOOP_GZIP_LEVEL", 6))
+        self.brotli_quality = brotli_quality if brotli_quality is not None else int(os.getenv("WHOOP_BROTLI_QUALITY", 5))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+
+        start: Message = {}
+        body = bytearray()
+        mode = "pass"
+        compressor: _Compressor | None = None
+
+        def compressed_headers(length: int | None) -> list[tuple[bytes, bytes]]:
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(length)
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            return headers.raw
+
+        async def send_compressed(message: Message):
+            nonlocal start, mode, compressor
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] == 304:
+                    # Same ETag as the 200 the client holds, which was suffixed if it was compressed
+                    mode = "pass"
+                    headers = MutableHeaders(raw=message["headers"])
+                    if "accept-encoding" not in headers.get("vary", "").lower():
+                        headers.add_vary_header("Accept-Encoding")
+                    etag = headers.get("etag")
+                    if encoding and etag and etag.endswith('"'):
+                        encoded = f'{etag[:-1]}-{encoding}"'
+                        if _presented(request_headers.get("if-none-match"), encoded):
+                            headers["ETag"] = encoded
+                    await send(message)
+                elif (
+                    message["status"] == 200
+                    and "content-encoding" not in headers
+                    and _media_type(headers) in COMPRESSIBLE_TYPES
+                ):
+                    if encoding is None:
+                        # Shared caches must not hand this body to clients that accept compression
+                        mode = "pass"
+                        MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                        await send(message)
+                    else:
+                        mode = "buffer" if "content-length" in headers else "stream"
+                        start = message
+                else:
+                    mode = "pass"
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body" or mode == "pass":
+                await send(message)
+                return
+            data = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if mode == "buffer":
+                body.extend(data)
+                if more_body:
+                    return
+                if len(body) < self.minimum_size:
+                    MutableHeaders(raw=start["headers"]).add_vary_header("Accept-Encoding")
+                    await send(start)
+                    await send({"type": "http.response.body", "body": bytes(body)})
+                    return
+                compressed = _Compressor(encoding, self.gzip_level, self.brotli_quality).finish(bytes(body))
+                start["headers"] = compressed_headers(len(compressed))
+                await send(start)
+                await send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streamed body: compress and flush each chunk as it is produced
+            if compressor is None:
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                start["headers"] = compressed_headers(None)
+                await send(start)
+            chunk = compressor.chunk(data) if more_body else compressor.finish(data)
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
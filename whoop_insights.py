@@ -0,0 +1,272 @@
+"""Compact prompt builder for AI health insights.
+
+Instead of pasting raw WHOOP response dicts into the prompt, only the fields
+a coach needs are extracted and laid out as small fixed-column tables (one
+row per day, plus one row per workout). This keeps prompt tokens, and so the
+prefill time of local models, roughly proportional to the history depth
+rather than to the size of WHOOP's JSON.
+
+Generated insights are cached on disk by a hash of the prompt messages (the
+normalized feature tables), the model name and ``PROMPT_VERSION``, so the
+model only runs again once the data it would see actually changes.
+
+Configuration:
+    AI_HISTORY_DAYS               Days of history included in the prompt (default 7)
+    AI_INSIGHTS_CACHE_ENABLED     Cache generated insights on disk (default true)
+    AI_INSIGHTS_CACHE_DIR         Cache directory (default .insights_cache)
+    AI_INSIGHTS_CACHE_MAX_ENTRIES Cached results kept, oldest pruned first (default 200)
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+from whoop_time import asleep_milli, cycle_day, local_day, parse_time
+
+# The insight cache reads its settings at import time
+load_dotenv()
+
+# Bump when the prompt layout or instructions change
+PROMPT_VERSION = 2
+
+SYSTEM_PROMPT = """You are a professional health and fitness coach analyzing WHOOP biometric data.
+Provide personalized, actionable insights based on the user's recovery, sleep, and workout data.
+Focus on:
+1. Current recovery status and what it means
+2. Sleep quality and patterns
+3. Workout recommendations (should they train hard, take it easy, or rest?)
+4. Trends and patterns over the last few days
+5. Specific actionable advice
+
+Be concise, encouraging, and data-driven. Use bullet points for clarity."""
+
+DAY_COLUMNS = [
+    "day", "recovery%", "hrv_ms", "rhr", "strain", "kJ",
+    "sleep%", "sleep_h", "light_h", "sws_h", "rem_h", "awake_h", "resp_rate",
+]
+WORKOUT_COLUMNS = ["day", "sport", "strain", "avg_hr", "max_hr", "min"]
+
+MS_PER_HOUR = 3600 * 1000
+
+
+def history_days() -> int:
+    return int(os.getenv("AI_HISTORY_DAYS", 7))
+
+
+def _fmt(value: Any, digits: int = 1) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+
+def _hours(milli: float | None) -> float | None:
+    return milli / MS_PER_HOUR if milli is not None else None
+
+
+def extract_day_rows(
+    cycles: list[dict[str, Any]],
+    recoveries: list[dict[str, Any]],
+    sleeps: list[dict[str, Any]],
+    days: int,
+) -> list[list[str]]:
+    """One row per cycle day (newest first) with recovery, strain and sleep features."""
+    recovery_by_cycle = {r.get("cycle_id"): r.get("score") or {} for r in recoveries}
+    sleep_by_cycle: dict[Any, dict[str, Any]] = {}
+    sleep_by_day: dict[str, dict[str, Any]] = {}
+    for s in sleeps:
+        if s.get("nap"):
+            continue
+        if s.get("cycle_id") is not None:
+            sleep_by_cycle.setdefault(s["cycle_id"], s)
+        # v1 sleeps have no cycle id; a night's sleep ends on its cycle's day
+        day = local_day(s.get("end"), s.get("timezone_offset"))
+        if day and day not in sleep_by_day:
+            sleep_by_day[day] = s
+
+    rows = []
+    for c in cycles[:days]:
+        day = cycle_day(c.get("start"), c.get("timezone_offset"))
+        score = c.get("score") or {}
+        recovery = recovery_by_cycle.get(c.get("id"), {})
+        sleep_record = sleep_by_cycle.get(c.get("id")) or sleep_by_day.get(day, {})
+        sleep = sleep_record.get("score") or {}
+        stages = sleep.get("stage_summary") or {}
+        rows.append([
+            day or "-",
+            _fmt(recovery.get("recovery_score"), 0),
+            _fmt(recovery.get("hrv_rmssd_milli")),
+            _fmt(recovery.get("resting_heart_rate"), 0),
+            _fmt(score.get("strain")),
+            _fmt(score.get("kilojoule"), 0),
+            _fmt(sleep.get("sleep_performance_percentage"), 0),
+            _fmt(_hours(asleep_milli(sleep_record))),
+            _fmt(_hours(stages.get("total_light_sleep_time_milli"))),
+            _fmt(_hours(stages.get("total_slow_wave_sleep_time_milli"))),
+            _fmt(_hours(stages.get("total_rem_sleep_time_milli"))),
+            _fmt(_hours(stages.get("total_awake_time_milli"))),
+            _fmt(sleep.get("respiratory_rate")),
+        ])
+    return rows
+
+
+def extract_workout_rows(workouts: list[dict[str, Any]], since_day: str | None) -> list[list[str]]:
+    """One row per workout on or after ``since_day`` (newest first)."""
+    rows = []
+    for w in workouts:
+        day = local_day(w.get("start"), w.get("timezone_offset"))
+        if since_day and day and day < since_day:
+            continue
+        score = w.get("score") or {}
+        minutes = None
+        if w.get("start") and w.get("end"):
+            minutes = (parse_time(w["end"]) - parse_time(w["start"])) / 60
+        rows.append([
+            day or "-",
+            str(w.get("sport_name") or w.get("sport_id", "-")),
+            _fmt(score.get("strain")),
+            _fmt(score.get("average_heart_rate"), 0),
+            _fmt(score.get("max_heart_rate"), 0),
+            _fmt(minutes, 0),
+        ])
+    return rows
+
+
+def format_table(columns: list[str], rows: list[list[str]]) -> str:
+    lines = ["|".join(columns)]
+    lines.extend("|".join(row) for row in rows)
+    return "\n".join(lines)
+
+
+def build_data_summary(
+    cycles: list[dict[str, Any]],
+    recoveries: list[dict[str, Any]],
+    sleeps: list[dict[str, Any]],
+    workouts: list[dict[str, Any]],
+    days: int | None = None,
+) -> str:
+    """Render the compact feature tables used as the user prompt's data."""
+    days = days or history_days()
+    day_rows = extract_day_rows(cycles, recoveries, sleeps, days)
+    oldest_day = day_rows[-1][0] if day_rows and day_rows[-1][0] != "-" else None
+    workout_rows = extract_workout_rows(workouts, oldest_day)
+    return (
+        f"Daily metrics (newest first, last {len(day_rows)} days; '-' = not available):\n"
+        f"{format_table(DAY_COLUMNS, day_rows)}\n\n"
+        f"Workouts ({len(workout_rows)}):\n"
+        f"{format_table(WORKOUT_COLUMNS, workout_rows) if workout_rows else 'none'}"
+    )
+
+
+def build_messages(
+    cycles: list[dict[str, Any]],
+    recoveries: list[dict[str, Any]],
+    sleeps: list[dict[str, Any]],
+    workouts: list[dict[str, Any]],
+    days: int | None = None,
+) -> list[dict[str, str]]:
+    """Chat messages asking the model for insights on the given records."""
+    data_summary = build_data_summary(cycles, recoveries, sleeps, workouts, days)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Analyze my WHOOP data and provide insights:\n\n{data_summary}"},
+    ]
+
+
+def debug_log(message: str):
+    """Log insight messages to stderr."""
+    print(f"[WHOOP-INSIGHTS] {message}", file=sys.stderr, flush=True)
+
+
+def insight_key(model: str, messages: list[dict[str, str]]) -> str:
+    """Content address of an insight: prompt version, model and exact prompt."""
+    payload = json.dumps(
+        {"version": PROMPT_VERSION, "model": model, "messages": messages},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class InsightCache:
+    """Content-addressed store of generated insights, one JSON file per key.
+
+    Files are written atomically (temp file + rename), so concurrent servers
+    sharing the directory never read a partial result. Once more than
+    ``max_entries`` results are stored the least recently written are removed.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        max_entries: int | None = None,
+        enabled: bool | None = None,
+    ):
+        self.directory = Path(directory or os.getenv("AI_INSIGHTS_CACHE_DIR", ".insights_cache"))
+        self.max_entries = max_entries or int(os.getenv("AI_INSIGHTS_CACHE_MAX_ENTRIES", 200))
+        if enabled is None:
+            enabled = os.getenv("AI_INSIGHTS_CACHE_ENABLED", "true").lower() == "true"
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached result for ``key``, or None."""
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, model: str, insights: str, data_summary: dict[str, Any]):
+        """Store a generated result under ``key``."""
+        if not self.enabled:
+            return
+        entry = {
+            "insights": insights,
+            "data_summary": data_summary,
+            "model": model,
+            "prompt_version": PROMPT_VERSION,
+            "generated_at": time.time(),
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+            self._prune()
+        except OSError as e:
+            debug_log(f"ERROR writing insight cache: {e}")
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+        }
+
+
+insight_cache = InsightCache()
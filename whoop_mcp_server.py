@@ -3,29 +3,68 @@
 This server wraps the existing WHOOP API integration and exposes it as
 Model Context Protocol tools that can be used by AI assistants like Claude.
 
+Tool results are serialized as compact JSON (with orjson when installed),
+and every tool accepts a ``fields`` projection so callers can ask for just
+the values they need instead of full WHOOP records.
+
 Run with: python whoop_mcp_server.py
+
+Configuration:
+    WHOOP_MCP_OUTPUT     Tool result JSON: "compact" (default) or "pretty" (indented)
+    WHOOP_MCP_PREFETCH   Keep the store warm in the background (default false)
 """
 
 import asyncio
 import json
+import os
 import sys
+import time
 from pathlib import Path
+from datetime import date, datetime, timedelta, timezone
 from typing import Any
 import httpx
 from dotenv import load_dotenv
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from whoop_cache import response_cache
+from whoop_client import TokenProvider, WhoopAPIError, api_get, flight_stats, lifespan, retry_stats
+from whoop_metrics import PROCESS_START, tool_latency, upstream_latency
+from whoop_scheduler import PrefetchResult, PrefetchScheduler
+from whoop_series import (
+    AGGREGATES, DAILY_METRICS, DEFAULT_AGGREGATES, METRICS, WORKOUT_METRICS,
+    daily_series, is_percentile, workout_series,
+)
+from whoop_store import RESOURCES, WhoopStore
+from whoop_time import parse_datetime
+
 # Load environment variables
 load_dotenv()
 
 # Initialize MCP server
 server = Server("whoop-fitness")
 
-# WHOOP API configuration
-API_BASE = "https://api.prod.whoop.com/developer/v2"
+# WHOOP API configuration (relative to WHOOP_API_BASE, see whoop_client.py)
+API_BASE = "/developer/v2"
 # Use absolute path so it works regardless of working directory
 TOKEN_CACHE_FILE = Path(__file__).parent / ".token_cache.json"
+# Token is loaded once and re-read only when the cache file changes
+token_provider = TokenProvider(TOKEN_CACHE_FILE)
+# Responses cached for the previous token must not leak into a new session
+token_provider.add_listener(lambda token: response_cache.clear())
+# Local history store; tools answer from it and only sync the freshness gap
+store = WhoopStore(api_base=API_BASE)
+# Profile and body measurements rarely change
+DOCUMENT_MAX_AGE = 24 * 3600
+# Optionally keep the store warm in the background (see whoop_scheduler.py)
+PREFETCH_ENABLED = os.getenv("WHOOP_MCP_PREFETCH", "false").lower() == "true"
+# Indented output is easier to read when debugging but costs the model tokens
+PRETTY_OUTPUT = os.getenv("WHOOP_MCP_OUTPUT", "compact").lower() == "pretty"
 
 # Log to stderr for debugging (stdout is used for MCP protocol)
 def debug_log(message: str):
@@ -34,58 +73,264 @@ def debug_log(message: str):
 
 
 def load_token() -> str | None:
-    """Load cached OAuth token from file."""
-    token_file = TOKEN_CACHE_FILE
-    debug_log(f"Looking for token at: {token_file}")
-    debug_log(f"Token file exists: {token_file.exists()}")
-    
-    if token_file.exists():
-        try:
-            with open(token_file, 'r') as f:
-                data = json.load(f)
-                token = data.get('access_token')
-                if token:
-                    debug_log(f"Token loaded successfully (length: {len(token)})")
-                    return token
-                else:
-                    debug_log("ERROR: No access_token field in token file")
-        except Exception as e:
-            debug_log(f"ERROR loading token: {e}")
-    else:
-        debug_log(f"ERROR: Token file not found at {token_file}")
-    return None
+    """Return the cached OAuth token (served from memory by token_provider)."""
+    return token_provider.get()
 
 
 async def make_api_request(endpoint: str) -> dict[str, Any]:
     """Make authenticated request to WHOOP API."""
     token = load_token()
     if not token:
-        debug_log("ERROR: No access token available")
+        debug_log(f"ERROR: No access token available (looked in {TOKEN_CACHE_FILE})")
         return {"error": "No access token found. Please authenticate via the FastAPI server first."}
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"{API_BASE}{endpoint}",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                return {"message": "Data not available yet. This data may still be syncing or not yet calculated by WHOOP.", "status": 404}
-            else:
-                return {"error": f"API error {e.response.status_code}: {e.response.text}"}
-        except httpx.HTTPError as e:
+    try:
+        response = await api_get(f"{API_BASE}{endpoint}", token)
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            return {"message": "Data not available yet. This data may still be syncing or not yet calculated by WHOOP.", "status": 404}
+        else:
+            return {"error": f"API error {e.response.status_code}: {e.response.text}"}
+    except httpx.HTTPError as e:
+        return {"error": f"API request failed: {str(e)}"}
+
+
+async def sync_store(resource: str, start: float | None = None, count: int | None = None) -> dict[str, Any] | None:
+    """Bring the local store up to date for one resource.
+    
+    Args:
+        resource: Store resource ("cycles", "recoveries", "sleeps", "workouts")
+        start: Also backfill history from this epoch time onwards
+        count: Also backfill until at least this many records are stored
+    
+    Returns an error dict if the resource cannot be served, otherwise None.
+    If upstream fails but records are already stored, they are served as-is.
+    """
+    token = load_token()
+    if not token:
+        debug_log(f"ERROR: No access token available (looked in {TOKEN_CACHE_FILE})")
+        return {"error": "No access token found. Please authenticate via the FastAPI server first."}
+    
+    try:
+        if start is not None:
+            await store.ensure_range(resource, token, start)
+        elif count is not None:
+            await store.ensure_count(resource, token, count)
+        else:
+            await store.ensure_fresh(resource, token)
+    except (WhoopAPIError, httpx.HTTPError) as e:
+        if store.count(resource) == 0:
             return {"error": f"API request failed: {str(e)}"}
+        debug_log(f"WARNING: Serving stored {resource} after sync failure: {e}")
+    return None
+
+
+async def get_document(name: str, endpoint: str) -> dict[str, Any]:
+    """Serve a profile/body document from the store, refreshing it once a day."""
+    document = store.get_document(name, max_age=DOCUMENT_MAX_AGE)
+    if document is not None:
+        return document
+    
+    data = await make_api_request(endpoint)
+    if "error" not in data and "message" not in data:
+        store.set_document(name, data)
+    return data
+
+
+async def prefetch_hot_data() -> PrefetchResult | None:
+    """Prefetch job: delta-sync every resource so tools answer from a warm store.
+
+    Resources kept current by webhooks only re-sync on their own schedule.
+    """
+    token = load_token()
+    if not token:
+        return None
+    await asyncio.gather(
+        *(store.ensure_fresh(resource, token, max_age=None if store.pushed(resource) else 0)
+          for resource in RESOURCES),
+        get_document("profile", "/user/profile/basic"),
+    )
+    latest_cycle = store.latest("cycles", 1)
+    recovery = store.get("recoveries", latest_cycle[0]["id"]) if latest_cycle else None
+    return PrefetchResult(
+        store.latest("sleeps", 7),
+        recovery is not None and recovery.get("score_state") == "SCORED",
+    )
+
+
+prefetcher = PrefetchScheduler(prefetch_hot_data, name="mcp")
+
+
+def day_window(days_ago: int) -> tuple[float, float]:
+    """Return the UTC [start, end) epoch window for the day N days ago."""
+    target_date = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = start_date + timedelta(days=1)
+    return start_date.timestamp(), end_date.timestamp()
+
+
+# Most days one batched lookup may ask for
+MAX_BATCH_DAYS = 90
+
+
+def is_day_offset(value: Any) -> bool:
+    """Whether ``value`` is a single days-ago offset (an int, but not a bool)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_days(days_ago: int | list[int] | str) -> list[int]:
+    """Normalize a day selection (N, [N, M, ...] or "A-B") to sorted unique offsets."""
+    if isinstance(days_ago, str):
+        first, sep, last = days_ago.partition("-")
+        if not (sep and first.isdigit() and last.isdigit()):
+            raise ValueError(f"Invalid day range: {days_ago!r} (expected e.g. \"0-13\")")
+        first, last = sorted((int(first), int(last)))
+        days = range(first, last + 1)
+    elif is_day_offset(days_ago):
+        days = [days_ago]
+    elif isinstance(days_ago, list) and all(is_day_offset(d) for d in days_ago):
+        days = days_ago
+    else:
+        raise ValueError(f"Invalid days_ago: {days_ago!r} (expected N, a list [N, M, ...] or a range \"A-B\")")
+    days = sorted(set(days))
+    if not days:
+        raise ValueError("days_ago must select at least one day")
+    if days[0] < 0:
+        raise ValueError("days_ago must be non-negative")
+    if len(days) > MAX_BATCH_DAYS:
+        raise ValueError(f"At most {MAX_BATCH_DAYS} days per call; use get_metric_history for longer ranges")
+    return days
+
+
+def check_limit(limit: Any) -> dict[str, Any] | None:
+    """Error result for a record count that is not a positive integer, otherwise None."""
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        return {"error": f"Invalid limit: {limit!r} (expected a positive integer)"}
+    return None
+
+
+def local_date(days_ago: int) -> str:
+    """The user-local calendar date (YYYY-MM-DD) N days ago."""
+    return (date.fromisoformat(store.local_today()) - timedelta(days=days_ago)).isoformat()
+
+
+async def sync_days(resource: str, days: list[int]) -> dict[str, Any] | None:
+    """Make sure the store covers ``days`` (days ago, ascending) of ``resource``.
+    
+    One paginated backfill covers the whole window; recoveries and sleeps
+    also need their cycles, which decide the day they belong to.
+    """
+    # A day of margin covers any timezone offset
+    start = day_window(days[-1])[0] - 86400
+    resources = ["cycles", resource] if resource in ("recoveries", "sleeps") else [resource]
+    for error in await asyncio.gather(*(sync_store(r, start=start) for r in resources)):
+        if error:
+            return error
+    return None
+
+
+def main_record(records: list[dict[str, Any]]) -> dict[str, Any] | None:
+    """The newest record of a day, preferring a night's sleep over naps."""
+    records = sorted(records, key=lambda r: bool(r.get("nap")))
+    return records[0] if records else None
+
+
+async def batch_by_day(resource: str, key: str, days: list[int]) -> dict[str, Any]:
+    """Tool result for several days: one entry per local day with its record (or null)."""
+    error = await sync_days(resource, days)
+    if error:
+        return error
+    dates = [local_date(day) for day in days]
+    by_date = store.on_days(resource, dates)
+    entries = [
+        {"days_ago": day, "date": date, key: main_record(by_date[date])}
+        for day, date in zip(days, dates)
+    ]
+    return {
+        "count": sum(1 for entry in entries if entry[key] is not None),
+        "days": entries
+    }
+
+
+HISTORY_DEFAULT_DAYS = 30
+
+
+def parse_day(value: str) -> date:
+    """Parse YYYY-MM-DD (or a full ISO timestamp) as a calendar day."""
+    return parse_datetime(value).date()
+
+
+FIELDS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "Only return these fields of each record, as dotted paths (e.g. [\"start\", \"score.strain\"]). Omit for full records."
+}
+
+
+def project(value: Any, fields: list[str]) -> Any:
+    """Keep only ``fields`` (dotted paths) of the records in a tool result.
+    
+    The projection applies at the first level of each branch where one of
+    the fields matches a key, so wrappers such as {"count", "workouts": [...]}
+    keep their own keys and each record inside is projected.
+    """
+    if isinstance(value, list):
+        return [project(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    nested: dict[str, list[str]] = {}
+    for path in fields:
+        head, _, rest = path.partition(".")
+        nested.setdefault(head, []).append(rest)
+    if not nested.keys() & value.keys():
+        return {key: project(item, fields) for key, item in value.items()}
+    projected = {}
+    for head, rests in nested.items():
+        if head in value:
+            # "score" keeps the whole value; "score.strain" narrows it
+            projected[head] = value[head] if "" in rests else project(value[head], rests)
+    return projected
+
+
+def dump(result: Any) -> str:
+    """Serialize a tool result (compact unless WHOOP_MCP_OUTPUT=pretty)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if PRETTY_OUTPUT else 0)
+        return orjson.dumps(result, option=option).decode()
+    if PRETTY_OUTPUT:
+        return json.dumps(result, indent=2)
+    return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+
+# Per-tool output size: calls, total bytes, largest result
+output_stats: dict[str, dict[str, int]] = {}
+
+
+def record_output_size(name: str, text: str) -> int:
+    size = len(text.encode())
+    stats = output_stats.setdefault(name, {"calls": 0, "bytes": 0, "max_bytes": 0})
+    stats["calls"] += 1
+    stats["bytes"] += size
+    stats["max_bytes"] = max(stats["max_bytes"], size)
+    return size
+
+
+def output_size_report() -> dict[str, dict[str, int]]:
+    """Per-tool result sizes, with a ~4 bytes/token estimate of model input."""
+    report = {}
+    for name, stats in output_stats.items():
+        average = stats["bytes"] // stats["calls"]
+        report[name] = {**stats, "avg_bytes": average, "avg_tokens_est": average // 4}
+    return report
 
 
 # Register tools
 @server.list_tools()
 async def list_tools() -> list[Tool]:
     """List available tools."""
-    return [
+    tools = [
         Tool(
             name="get_user_profile",
             description="Get WHOOP user profile information including user ID, email, and basic profile data",
@@ -97,7 +342,15 @@ async def list_tools() -> list[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "days_ago": {"type": "integer", "description": "Get recovery from N days ago (e.g., 1 for yesterday, 2 for day before)", "default": 0}
+                    "days_ago": {
+                        "anyOf": [
+                            {"type": "integer"},
+                            {"type": "array", "items": {"type": "integer"}},
+                            {"type": "string", "pattern": "^\\d+-\\d+$"}
+                        ],
+                        "description": "Get recovery from N days ago (e.g., 1 for yesterday), or several days at once as a list ([0, 1, 7]) or an inclusive range (\"0-13\" for the last 14 days)",
+                        "default": 0
+                    }
                 }
             }
         ),
@@ -122,7 +375,15 @@ async def list_tools() -> list[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "days_ago": {"type": "integer", "description": "Get sleep from N days ago (e.g., 1 for yesterday, 2 for day before)", "default": 0}
+                    "days_ago": {
+                        "anyOf": [
+                            {"type": "integer"},
+                            {"type": "array", "items": {"type": "integer"}},
+                            {"type": "string", "pattern": "^\\d+-\\d+$"}
+                        ],
+                        "description": "Get sleep from N days ago (e.g., 1 for yesterday), or several days at once as a list ([0, 1, 7]) or an inclusive range (\"0-13\" for the last 14 days)",
+                        "default": 0
+                    }
                 }
             }
         ),
@@ -145,26 +406,81 @@ async def list_tools() -> list[Tool]:
             name="get_health_summary",
             description="Get comprehensive health summary with latest strain, recovery, and sleep",
             inputSchema={"type": "object", "properties": {}}
+        ),
+        Tool(
+            name="get_metric_history",
+            description="Summary statistics (mean, median, min, max, std, percentiles) of one or more metrics over a date range, e.g. a month of HRV. Prefer this over calling day-by-day tools repeatedly.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "metric": {
+                        "anyOf": [
+                            {"type": "string", "enum": list(METRICS)},
+                            {"type": "array", "items": {"type": "string", "enum": list(METRICS)}}
+                        ],
+                        "description": "Metric name, or a list of metric names"
+                    },
+                    "start": {"type": "string", "description": f"First day in the user's timezone, YYYY-MM-DD (default {HISTORY_DEFAULT_DAYS} days before end)"},
+                    "end": {"type": "string", "description": "Last day (inclusive) in the user's timezone, YYYY-MM-DD (default today)"},
+                    "aggregate": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Statistics to compute: count, mean, median, min, max, std, sum, or pN for a percentile (e.g. p10, p90)",
+                        "default": DEFAULT_AGGREGATES
+                    }
+                },
+                "required": ["metric"]
+            }
+        ),
+        Tool(
+            name="get_server_stats",
+            description="Diagnostics for this MCP server: per-tool and per-WHOOP-endpoint latency (p50/p95/p99), cache hit ratio, retries, local store size and tool output sizes",
+            inputSchema={"type": "object", "properties": {}}
         )
     ]
+    for tool in tools:
+        tool.inputSchema.setdefault("properties", {})["fields"] = FIELDS_SCHEMA
+    return tools
 
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls."""
+    started = time.perf_counter()
+    outcome = "exception"
+    fields = arguments.get("fields")
+    if isinstance(fields, str):
+        fields = [fields]
+    try:
+        if fields is None or (isinstance(fields, list) and all(isinstance(f, str) for f in fields)):
+            result = await dispatch_tool(name, arguments)
+        else:
+            result = {"error": "fields must be a list of dotted paths, e.g. [\"start\", \"score.strain\"]"}
+        outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+    finally:
+        tool_latency.observe(time.perf_counter() - started, name, outcome)
+    
+    if fields and isinstance(result, dict) and "error" not in result and "message" not in result:
+        result = project(result, fields)
+    text = dump(result)
+    size = record_output_size(name, text)
+    debug_log(f"{name}: {size} bytes (~{size // 4} tokens) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return [TextContent(type="text", text=text)]
+
+
+async def dispatch_tool(name: str, arguments: dict) -> Any:
+    """Run one tool and return its unserialized result."""
     if name == "get_user_profile":
         result = await get_user_profile()
     elif name == "get_recovery_score":
-        days_ago = arguments.get("days_ago", 0)
-        result = await get_recovery_score(days_ago)
+        result = await get_recovery_score(arguments.get("days_ago", 0))
     elif name == "get_current_strain":
         result = await get_current_strain()
     elif name == "get_recent_cycles":
         limit = arguments.get("limit", 7)
         result = await get_recent_cycles(limit)
     elif name == "get_latest_sleep":
-        days_ago = arguments.get("days_ago", 0)
-        result = await get_latest_sleep(days_ago)
+        result = await get_latest_sleep(arguments.get("days_ago", 0))
     elif name == "get_recent_workouts":
         limit = arguments.get("limit", 10)
         result = await get_recent_workouts(limit)
@@ -172,10 +488,15 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         result = await get_body_measurements()
     elif name == "get_health_summary":
         result = await get_health_summary()
+    elif name == "get_metric_history":
+        result = await get_metric_history(
+            arguments.get("metric"), arguments.get("start"), arguments.get("end"), arguments.get("aggregate")
+        )
+    elif name == "get_server_stats":
+        result = get_server_stats()
     else:
         result = {"error": f"Unknown tool: {name}"}
-    
-    return [TextContent(type="text", text=json.dumps(result, indent=2))]
+    return result
 
 
 async def get_user_profile() -> dict[str, Any]:
@@ -183,40 +504,42 @@ async def get_user_profile() -> dict[str, Any]:
     
     Returns user ID, email, and basic profile data.
     """
-    return await make_api_request("/user/profile/basic")
+    return await get_document("profile", "/user/profile/basic")
 
 
-async def get_recovery_score(days_ago: int = 0) -> dict[str, Any]:
+async def get_recovery_score(days_ago: int | list[int] | str = 0) -> dict[str, Any]:
     """Get the recovery score.
     
     Args:
-        days_ago: Number of days back to retrieve (0=today, 1=yesterday, etc.)
+        days_ago: Number of days back to retrieve (0=today, 1=yesterday, etc.),
+            or a list ([0, 1, 7]) or inclusive range ("0-13") of them
     
     Recovery score indicates how ready your body is for strain.
-    Returns recovery percentage, HRV, RHR, and sleep performance.
+    Returns recovery percentage, HRV, RHR, and sleep performance; for
+    several days, one entry per day fetched with a single range sync.
+    Days are the user's local calendar days (their cycle's day).
     Note: Only available for completed sleep cycles.
     """
-    from datetime import datetime, timedelta, timezone
+    if not is_day_offset(days_ago) or days_ago < 0:
+        try:
+            days = parse_days(days_ago)
+        except ValueError as e:
+            return {"error": str(e)}
+        return await batch_by_day("recoveries", "recovery", days)
     
     if days_ago == 0:
         # Get most recent recovery
-        recovery_data = await make_api_request("/recovery?limit=1")
+        error = await sync_store("recoveries")
+        if error:
+            return error
+        records = store.latest("recoveries", 1)
     else:
-        # Get recovery for specific day using date range
-        # Calculate date range for the specific day
-        target_date = datetime.now(timezone.utc) - timedelta(days=days_ago)
-        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        
-        start_str = start_date.isoformat().replace('+00:00', 'Z')
-        end_str = end_date.isoformat().replace('+00:00', 'Z')
-        
-        recovery_data = await make_api_request(f"/recovery?start={start_str}&end={end_str}")
-    
-    if "error" in recovery_data or "message" in recovery_data:
-        return recovery_data
+        # Get recovery for a specific local day, backfilling the store if needed
+        error = await sync_days("recoveries", [days_ago])
+        if error:
+            return error
+        records = store.on_day("recoveries", local_date(days_ago))
     
-    records = recovery_data.get("records", [])
     if not records:
         day_desc = "today" if days_ago == 0 else f"{days_ago} day(s) ago"
         return {"message": f"No recovery data available for {day_desc}. Recovery is calculated after completing a sleep session."}
@@ -230,11 +553,11 @@ async def get_current_strain() -> dict[str, Any]:
     Strain measures cardiovascular load and workout intensity (0-21 scale).
     Returns strain score, kilojoules, and average heart rate.
     """
-    cycles_data = await make_api_request("/cycle")
-    if "error" in cycles_data:
-        return cycles_data
+    error = await sync_store("cycles")
+    if error:
+        return error
     
-    cycles = cycles_data.get("records", [])
+    cycles = store.latest("cycles", 1)
     if not cycles:
         return {"message": "No cycles found"}
     
@@ -259,18 +582,22 @@ async def get_recent_cycles(limit: int = 7) -> dict[str, Any]:
     Each cycle represents a 24-hour period from wake to wake.
     Returns cycle ID, start/end times, strain, recovery, and status.
     """
-    # Fetch cycles
-    cycles_data = await make_api_request(f"/cycle?limit={limit}")
-    if "error" in cycles_data:
-        return cycles_data
-    
-    # Fetch recoveries
-    recovery_data = await make_api_request(f"/recovery?limit={limit}")
+    error = check_limit(limit)
+    if error:
+        return error
+    
+    # Sync cycles and recoveries (backfilling older history if limit needs it)
+    cycles_error, recovery_error = await asyncio.gather(
+        sync_store("cycles", count=limit),
+        sync_store("recoveries", count=limit)
+    )
+    if cycles_error:
+        return cycles_error
     
     # Create a map of cycle_id -> recovery data
     recovery_map = {}
-    if "error" not in recovery_data and "message" not in recovery_data:
-        for r in recovery_data.get("records", []):
+    if not recovery_error:
+        for r in store.latest("recoveries", limit):
             cycle_id = r.get("cycle_id")
             if cycle_id:
                 recovery_map[cycle_id] = {
@@ -283,7 +610,7 @@ async def get_recent_cycles(limit: int = 7) -> dict[str, Any]:
                 }
     
     # Combine cycle and recovery data
-    cycles = cycles_data.get("records", [])
+    cycles = store.latest("cycles", limit)
     enriched_cycles = []
     for c in cycles:
         cycle_id = c["id"]
@@ -312,36 +639,39 @@ async def get_recent_cycles(limit: int = 7) -> dict[str, Any]:
     }
 
 
-async def get_latest_sleep(days_ago: int = 0) -> dict[str, Any]:
+async def get_latest_sleep(days_ago: int | list[int] | str = 0) -> dict[str, Any]:
     """Get sleep data.
     
     Args:
-        days_ago: Number of days back to retrieve (0=today, 1=yesterday, etc.)
+        days_ago: Number of days back to retrieve (0=today, 1=yesterday, etc.),
+            or a list ([0, 1, 7]) or inclusive range ("0-13") of them
     
     Returns sleep duration, quality score, efficiency, disturbances,
-    respiratory rate, and sleep stages breakdown.
+    respiratory rate, and sleep stages breakdown; for several days, one
+    entry per day fetched with a single range sync. A sleep belongs to the
+    local calendar day it ends on.
     Note: Only available for completed sleep sessions.
     """
-    from datetime import datetime, timedelta, timezone
+    if not is_day_offset(days_ago) or days_ago < 0:
+        try:
+            days = parse_days(days_ago)
+        except ValueError as e:
+            return {"error": str(e)}
+        return await batch_by_day("sleeps", "sleep", days)
     
     if days_ago == 0:
         # Get most recent sleep
-        sleep_data = await make_api_request("/activity/sleep?limit=1")
+        error = await sync_store("sleeps")
+        if error:
+            return error
+        records = store.latest("sleeps", 1)
     else:
-        # Get sleep for specific day using date range
-        target_date = datetime.now(timezone.utc) - timedelta(days=days_ago)
-        start_date = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_date + timedelta(days=1)
-        
-        start_str = start_date.isoformat().replace('+00:00', 'Z')
-        end_str = end_date.isoformat().replace('+00:00', 'Z')
-        
-        sleep_data = await make_api_request(f"/activity/sleep?start={start_str}&end={end_str}")
+        # Get the sleep that ended on a specific local day, backfilling the store if needed
+        error = await sync_days("sleeps", [days_ago])
+        if error:
+            return error
+        records = sorted(store.on_day("sleeps", local_date(days_ago)), key=lambda r: bool(r.get("nap")))
     
-    if "error" in sleep_data or "message" in sleep_data:
-        return sleep_data
-    
-    records = sleep_data.get("records", [])
     if not records:
         day_desc = "today" if days_ago == 0 else f"{days_ago} day(s) ago"
         return {"message": f"No sleep data available for {day_desc}. Sleep data is recorded after you complete a sleep session."}
@@ -357,11 +687,11 @@ async def get_recent_workouts(limit: int = 5) -> dict[str, Any]:
     
     Returns workout type, duration, strain, average HR, max HR, and calories.
     """
-    workouts_data = await make_api_request(f"/activity/workout?limit={limit}")
-    if "error" in workouts_data or "message" in workouts_data:
-        return workouts_data
+    error = check_limit(limit) or await sync_store("workouts", count=limit)
+    if error:
+        return error
     
-    workouts = workouts_data.get("records", [])
+    workouts = store.latest("workouts", limit)
     if not workouts:
         return {"message": "No workout data available yet."}
     
@@ -392,7 +722,7 @@ async def get_body_measurements() -> dict[str, Any]:
     
     Returns height, weight, and max heart rate if available.
     """
-    return await make_api_request("/user/measurement/body")
+    return await get_document("body", "/user/measurement/body")
 
 
 async def get_health_summary() -> dict[str, Any]:
@@ -419,11 +749,117 @@ async def get_health_summary() -> dict[str, Any]:
     }
 
 
+async def get_metric_history(
+    metric: str | list[str] | None,
+    start: str | None = None,
+    end: str | None = None,
+    aggregate: str | list[str] | None = None,
+) -> dict[str, Any]:
+    """Get summary statistics of metrics over a date range.
+    
+    Args:
+        metric: Metric name or list of names (see METRICS)
+        start: First user-local day, YYYY-MM-DD (default 30 days before end)
+        end: Last user-local day, inclusive (default today)
+        aggregate: Statistic or list of statistics to compute (default count/mean/median/min/max/std)
+    
+    The range is synced into the store in bulk (one paginated backfill per
+    resource), loaded into columnar series (see whoop_series.py) and
+    aggregated with NumPy, so a month costs one call instead of thirty.
+    Days are the store's local days (see whoop_store.py), as in the
+    day-by-day tools: daily metrics are per physiological cycle, on the day
+    its member wakes up; workout metrics are per workout, on the day it starts.
+    "Today" is taken in the timezone of the latest cycle.
+    """
+    metrics = [metric] if isinstance(metric, str) else metric
+    if not (isinstance(metrics, list) and metrics and all(isinstance(m, str) for m in metrics)):
+        return {"error": f"metric must be a metric name or a list of names. Available: {', '.join(METRICS)}"}
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        return {"error": f"Unknown metric(s): {', '.join(unknown)}. Available: {', '.join(METRICS)}"}
+    aggregates = [aggregate] if isinstance(aggregate, str) else aggregate or DEFAULT_AGGREGATES
+    if not (isinstance(aggregates, list) and all(isinstance(a, str) for a in aggregates)):
+        return {"error": f"aggregate must be a list of statistics: {', '.join(AGGREGATES)} or pN"}
+    unknown = [a for a in aggregates if a not in AGGREGATES and not is_percentile(a)]
+    if unknown:
+        return {"error": f"Unknown aggregate(s): {', '.join(unknown)}. Use {', '.join(AGGREGATES)} or pN"}
+    try:
+        end_day = parse_day(end) if end else None
+        start_day = parse_day(start) if start else None
+    except ValueError as e:
+        return {"error": f"Invalid date: {e}"}
+    if end_day is None:
+        # The latest cycle's timezone decides what "today" is
+        error = await sync_store("cycles")
+        if error:
+            return error
+        end_day = date.fromisoformat(store.local_today())
+    start_day = start_day or end_day - timedelta(days=HISTORY_DEFAULT_DAYS - 1)
+    if start_day > end_day:
+        return {"error": "start must not be after end"}
+    first, last = start_day.isoformat(), end_day.isoformat()
+    
+    # One bulk sync per resource, shared by all metrics read from it; daily
+    # metrics are indexed by cycle, so cycles are always needed for them
+    resources = list(dict.fromkeys(METRICS[m][0] for m in metrics))
+    if any(m in DAILY_METRICS for m in metrics) and "cycles" not in resources:
+        resources.insert(0, "cycles")
+    # Sync from two days early: a day's cycle starts the evening before, and
+    # a local day can begin up to 14 hours before the UTC one
+    window_start = datetime(start_day.year, start_day.month, start_day.day, tzinfo=timezone.utc).timestamp()
+    errors = await asyncio.gather(*(sync_store(r, start=window_start - 2 * 86400) for r in resources))
+    for error in errors:
+        if error:
+            return error
+    
+    records = {r: store.between_days(r, first, last) for r in resources}
+    daily = daily_series(records.get("cycles", ()), records.get("recoveries", ()), records.get("sleeps", ()))
+    workouts = workout_series(records.get("workouts", ()))
+    
+    summary = {}
+    for name in metrics:
+        series = workouts if name in WORKOUT_METRICS else daily
+        summary[name] = {"unit": METRICS[name][1], **series.aggregate(name, aggregates)}
+    
+    return {
+        "start": first,
+        "end": last,
+        "metrics": summary
+    }
+
+
+def get_server_stats() -> dict[str, Any]:
+    """Get latency, cache and quota diagnostics for this server process.
+    
+    Latencies are estimated from histogram buckets (see whoop_metrics.py);
+    upstream endpoints have record ids collapsed to {id}.
+    """
+    flights = flight_stats()
+    upstream = upstream_latency.summary("endpoint")
+    return {
+        "uptime_s": round(time.time() - PROCESS_START),
+        "tools": tool_latency.summary("tool"),
+        # Counts against WHOOP's per-app quota since this process started
+        "upstream_requests": sum(entry["calls"] for entry in upstream.values()),
+        "upstream": upstream,
+        "response_cache": response_cache.stats(),
+        "retries": retry_stats(),
+        "single_flight": {"in_flight": flights["in_flight"], "coalesced_total": flights["coalesced_total"]},
+        "store_records": {resource: store.count(resource) for resource in RESOURCES},
+        "prefetch": prefetcher.stats(),
+        "output": output_size_report()
+    }
+
+
 async def main():
     """Entry point for the MCP server."""
     from mcp.server.stdio import stdio_server
     
-    async with stdio_server() as (read_stream, write_stream):
+    if PREFETCH_ENABLED:
+        # The prefetcher re-syncs at least once per lease, so tools may serve that old
+        store.max_age = max(store.max_age, prefetcher.lease)
+    
+    async with lifespan(), prefetcher.running(PREFETCH_ENABLED), stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
             write_stream,
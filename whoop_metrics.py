@@ -0,0 +1,238 @@
+"""Latency histograms for tools, routes and upstream calls.
+
+Both servers record into the module-level histograms below:
+
+* ``tool_latency``      MCP ``call_tool`` dispatch, by tool and outcome
+* ``route_latency``     FastAPI requests (``MetricsMiddleware``), by route template,
+                        method and status
+* ``upstream_latency``  WHOOP API requests (``whoop_client``), by endpoint
+                        (ids replaced with ``{id}``) and status
+
+``render_prometheus`` writes them, plus the numeric fields of any stats
+dicts (cache, retries, prefetch, ...), in the Prometheus text format for
+the FastAPI ``/metrics`` route. ``Histogram.summary`` gives the same data as
+JSON with estimated percentiles for the ``get_server_stats`` MCP tool.
+
+Only the standard library is used, so the MCP server does not need the
+FastAPI stack to import this module.
+"""
+
+import bisect
+import re
+import time
+from collections import Counter
+from typing import Any
+
+# Upper bounds in seconds (Prometheus client defaults); +Inf is implicit
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROCESS_START = time.time()
+
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$")
+
+
+def endpoint_label(path: str) -> str:
+    """Collapse record ids in an API path so each endpoint is one label value."""
+    return "/".join("{id}" if _ID_SEGMENT.match(part) else part for part in path.split("?")[0].split("/"))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram with one series per label combination."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (last is +Inf), sum, count, max]
+        self._series: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, seconds: float, *label_values: Any):
+        key = tuple(str(v) for v in label_values)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+        series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+        series[2] += 1
+        series[3] = max(series[3], seconds)
+
+    def _quantile(self, q: float, counts: list[int], total: int, largest: float) -> float | None:
+        """Estimate a quantile by linear interpolation inside its bucket, capped at the largest value seen."""
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return largest
+                lower = self.buckets[i - 1] if i else 0.0
+                return min(largest, lower + (self.buckets[i] - lower) * (rank - seen) / count)
+            seen += count
+        return largest
+
+    def summary(self, by: str) -> dict[str, dict[str, Any]]:
+        """Per value of label ``by``: calls, mean, p50/p95/p99 and max in ms, and counts per other label."""
+        index = self.labels.index(by)
+        others = [(i, label) for i, label in enumerate(self.labels) if i != index]
+        groups: dict[str, list[Any]] = {}
+        for key, (counts, total_s, calls, largest) in self._series.items():
+            group = groups.setdefault(
+                key[index], [[0] * len(counts), 0.0, 0, 0.0, {label: Counter() for _, label in others}]
+            )
+            group[0] = [a + b for a, b in zip(group[0], counts)]
+            group[1] += total_s
+            group[2] += calls
+            group[3] = max(group[3], largest)
+            for i, label in others:
+                group[4][label][key[i]] += calls
+
+        result = {}
+        for value, (counts, total_s, calls, largest, breakdown) in sorted(groups.items()):
+            entry: dict[str, Any] = {"calls": calls, "avg_ms": round(total_s / calls * 1000, 1)}
+            for q in (0.5, 0.95, 0.99):
+                entry[f"p{round(q * 100)}_ms"] = round(self._quantile(q, counts, calls, largest) * 1000, 1)
+            entry["max_ms"] = round(largest * 1000, 1)
+            for label, counter in breakdown.items():
+                entry[f"by_{label}"] = dict(counter.most_common())
+            result[value] = entry
+        return result
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total_s, calls, _) in sorted(self._series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total_s:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {calls}")
+        return lines
+
+    def reset(self):
+        self._series.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _stats_samples(name: str, value: Any) -> list[tuple[str, str, Any]]:
+    """Flatten a stats value into (metric name, labels, value) samples.
+
+    Nested dicts extend the name; keys that are not identifiers (status codes,
+    paths, event types) become a ``key`` label instead. Strings are skipped.
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return [(name, "", value)]
+    if not isinstance(value, dict):
+        return []
+    samples = []
+    for key, item in value.items():
+        key = str(key)
+        if key.isidentifier():
+            samples.extend(_stats_samples(f"{name}_{key}", item))
+        elif isinstance(item, (int, float)) and not isinstance(item, bool):
+            samples.append((name, f'{{key="{_escape(key)}"}}', item))
+    return samples
+
+
+def _is_counter(name: str, counters: set[str]) -> bool:
+    return any(name == c or name.startswith(f"{c}_") for c in counters)
+
+
+def render_prometheus(
+    histograms: list[Histogram],
+    stats: dict[str, dict[str, Any]],
+    counters: set[str] | None = None,
+) -> str:
+    """Prometheus text exposition of ``histograms`` and the numeric fields of ``stats``.
+
+    ``stats`` maps a metric prefix (e.g. "whoop_cache") to a stats dict; each
+    numeric field becomes a gauge named ``<prefix>_<field>``. Fields that only
+    ever go up (hits, retries, runs, ...) are named in ``counters``, as a metric
+    name or the prefix of several, and are exposed as counters with a ``_total``
+    suffix, so ``rate()`` and ``increase()`` handle process restarts.
+    """
+    counters = counters or set()
+    lines = [
+        "# HELP process_start_time_seconds Start time of the process since the epoch",
+        "# TYPE process_start_time_seconds gauge",
+        f"process_start_time_seconds {PROCESS_START:.3f}",
+    ]
+    for histogram in histograms:
+        lines.extend(histogram.render())
+    for prefix, values in stats.items():
+        metrics: dict[str, list[str]] = {}
+        for name, labels, value in _stats_samples(prefix, values):
+            kind = "gauge"
+            if _is_counter(name, counters):
+                kind = "counter"
+                name = name if name.endswith("_total") else f"{name}_total"
+            metrics.setdefault(f"# TYPE {name} {kind}", []).append(f"{name}{labels} {value}")
+        for type_line, samples in metrics.items():
+            lines.append(type_line)
+            lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request into ``route_latency``.
+
+    The route label is the matched route's path template (``/cycle/{id}``
+    style), so ids and query strings do not create new series; files under a
+    mount are labelled ``/static/{path}`` and requests no route matched
+    ``unmatched``. Streamed responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            if not recorded:
+                recorded = True
+                route_latency.observe(time.perf_counter() - started, _route_label(scope), scope["method"], status)
+
+        async def send_timed(message: dict[str, Any]):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            record()
+
+
+def _route_label(scope: dict[str, Any]) -> str:
+    # The router writes the matched route (or, for a mount, its endpoint and
+    # extended root_path) into the request scope while handling it
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("endpoint") is not None:
+        return f"{scope.get('root_path', '')}/{{path}}"
+    return "unmatched"
+
+
+tool_latency = Histogram("whoop_mcp_tool_duration_seconds", "MCP tool call latency", ("tool", "outcome"))
+route_latency = Histogram("whoop_http_request_duration_seconds", "HTTP request latency", ("route", "method", "status"))
+upstream_latency = Histogram(
+    "whoop_upstream_request_duration_seconds", "WHOOP API request latency", ("endpoint", "status")
+)
@@ -0,0 +1,195 @@
+"""Background prefetch scheduler that keeps hot WHOOP data warm.
+
+A ``PrefetchScheduler`` runs a server-supplied refresh job in the background
+(the latest cycle, recovery, sleep and workouts) so user-facing requests are
+served from the response cache or the local store instead of paying
+upstream latency after an idle period.
+
+The cadence adapts to when new data actually lands. New recovery is scored
+shortly after the user wakes up, so around their typical wake-up time (the
+median end of recent, non-nap sleeps, in the user's own timezone) the job
+runs every ``wake_interval`` seconds until today's recovery is scored, and
+every ``interval`` seconds otherwise.
+
+Because the job refreshes everything at least once per interval, servers may
+serve prefetched data for up to ``lease`` seconds while the scheduler runs.
+
+Configuration:
+    WHOOP_PREFETCH_INTERVAL       Seconds between refreshes (default 300)
+    WHOOP_PREFETCH_WAKE_INTERVAL  Seconds between refreshes around wake-up (default 60)
+    WHOOP_PREFETCH_WAKE_BEFORE    Minutes before the typical wake-up to speed up (default 30)
+    WHOOP_PREFETCH_WAKE_AFTER     Minutes after the typical wake-up to keep it up (default 180)
+    WHOOP_PREFETCH_WAKE_TIME      Wake-up time (HH:MM, UTC) until sleeps are known (default 07:00)
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from whoop_time import parse_datetime, parse_offset
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def debug_log(message: str):
+    """Log scheduler messages to stderr (stdout is reserved for MCP)."""
+    print(f"[WHOOP-SCHEDULER] {message}", file=sys.stderr, flush=True)
+
+
+def typical_wake(sleeps: list[dict[str, Any]]) -> tuple[int, timezone] | None:
+    """Median wake-up minute of day and the user's timezone, from recent sleeps."""
+    minutes = []
+    tz = None
+    for sleep in sleeps:
+        if sleep.get("nap") or not sleep.get("end"):
+            continue
+        sleep_tz = parse_offset(sleep.get("timezone_offset"))
+        tz = tz or sleep_tz  # sleeps are newest first; use the current timezone
+        end = parse_datetime(sleep["end"]).astimezone(sleep_tz)
+        minutes.append(end.hour * 60 + end.minute)
+    if not minutes:
+        return None
+    return int(statistics.median(minutes)), tz
+
+
+class PrefetchResult:
+    """What a refresh job reports back to steer the cadence."""
+
+    __slots__ = ("sleeps", "recovery_ready")
+
+    def __init__(self, sleeps: list[dict[str, Any]], recovery_ready: bool):
+        self.sleeps = sleeps
+        self.recovery_ready = recovery_ready
+
+
+class PrefetchScheduler:
+    """Run ``job`` immediately and then on an adaptive cadence until stopped.
+
+    ``job`` returns a ``PrefetchResult`` (or None when there is nothing to do,
+    e.g. no token yet). Failures are logged and retried on the next tick.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[], Awaitable[PrefetchResult | None]],
+        name: str = "prefetch",
+        interval: float | None = None,
+        wake_interval: float | None = None,
+        wake_before: float | None = None,
+        wake_after: float | None = None,
+    ):
+        self.job = job
+        self.name = name
+        self.interval = interval or float(os.getenv("WHOOP_PREFETCH_INTERVAL", 300))
+        self.wake_interval = wake_interval or float(os.getenv("WHOOP_PREFETCH_WAKE_INTERVAL", 60))
+        self.wake_before = wake_before if wake_before is not None else float(os.getenv("WHOOP_PREFETCH_WAKE_BEFORE", 30))
+        self.wake_after = wake_after if wake_after is not None else float(os.getenv("WHOOP_PREFETCH_WAKE_AFTER", 180))
+        hours, _, minutes = os.getenv("WHOOP_PREFETCH_WAKE_TIME", "07:00").partition(":")
+        self.wake_minute = int(hours) * 60 + int(minutes or 0)
+        self.tz = timezone.utc
+        self.recovery_ready = False
+        self.runs = 0
+        self.failures = 0
+        self.last_run: float | None = None
+        self.last_duration: float | None = None
+        self.next_delay: float | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def lease(self) -> float:
+        """How long prefetched data stays servable: one interval plus 10% slack."""
+        return self.interval * 1.1
+
+    def _minutes_into_window(self, now: datetime) -> float:
+        """Minutes since the wake window last opened (0 up to a day)."""
+        local = now.astimezone(self.tz)
+        minute = local.hour * 60 + local.minute + local.second / 60
+        opens = self.wake_minute - self.wake_before
+        return (minute - opens) % MINUTES_PER_DAY
+
+    def in_wake_window(self, now: datetime | None = None) -> bool:
+        now = now or datetime.now(timezone.utc)
+        return self._minutes_into_window(now) < self.wake_before + self.wake_after
+
+    def delay(self, now: datetime | None = None) -> float:
+        """Seconds until the next run."""
+        now = now or datetime.now(timezone.utc)
+        if self.in_wake_window(now):
+            return self.interval if self.recovery_ready else self.wake_interval
+        # Never sleep through the start of the next wake window
+        until_window = (MINUTES_PER_DAY - self._minutes_into_window(now)) * 60
+        return max(1.0, min(self.interval, until_window))
+
+    async def run_once(self):
+        started = time.monotonic()
+        try:
+            result = await self.job()
+        except Exception as e:
+            self.failures += 1
+            debug_log(f"{self.name}: refresh failed: {e}")
+            return
+        finally:
+            self.last_run = time.time()
+            self.last_duration = time.monotonic() - started
+        self.runs += 1
+        if result is None:
+            return
+        wake = typical_wake(result.sleeps)
+        if wake is not None:
+            self.wake_minute, self.tz = wake
+        if result.recovery_ready != self.recovery_ready:
+            debug_log(f"{self.name}: today's recovery {'scored' if result.recovery_ready else 'pending'}")
+        # The latest cycle starts at sleep onset, so its recovery is pending
+        # until the user wakes: this flips back to False every night
+        self.recovery_ready = result.recovery_ready
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            self.next_delay = self.delay()
+            await asyncio.sleep(self.next_delay)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            debug_log(
+                f"{self.name}: every {self.interval:.0f}s, every {self.wake_interval:.0f}s "
+                f"around wake-up until recovery is scored"
+            )
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def running(self, enabled: bool = True) -> AsyncIterator["PrefetchScheduler"]:
+        """Run the scheduler for the duration of the ``async with`` block."""
+        if enabled:
+            self.start()
+        try:
+            yield self
+        finally:
+            await self.stop()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run,
+            "last_duration_s": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "next_delay_s": self.next_delay,
+            "wake_time": f"{self.wake_minute // 60:02d}:{self.wake_minute % 60:02d}",
+            "in_wake_window": self.in_wake_window(),
+            "recovery_ready": self.recovery_ready,
+        }
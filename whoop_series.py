@@ -0,0 +1,241 @@
+"""Columnar in-memory time series of WHOOP metrics.
+
+WHOOP records are nested dicts (``r["score"]["hrv_rmssd_milli"]``), which is
+fine for showing one record but costly for anything that scans many: every
+record is a few hundred bytes of dict objects and every value is a chain of
+lookups. A ``Series`` instead keeps one typed NumPy array per metric plus a
+sorted int64 timestamp index, so a year of daily metrics is a few tens of KB
+and a statistic over it is a single vectorized call.
+
+* ``daily_series`` builds one row per physiological cycle, indexed by cycle
+  start, joining the cycle's recovery and main (non-nap) sleep by cycle id.
+* ``workout_series`` builds one row per workout, indexed by workout start.
+* ``Row`` is a ``__slots__`` view onto one row for single-record access.
+* ``aggregate_values`` computes summary statistics of a column.
+
+Metric values are float32 (NaN = missing); statistics are computed in float64.
+"""
+
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+
+from whoop_time import asleep_milli, parse_time
+
+MS_PER_HOUR = 3_600_000
+
+
+def _score(field: str) -> Callable[[dict[str, Any]], Any]:
+    return lambda r: (r.get("score") or {}).get(field)
+
+
+def _sleep_hours(r: dict[str, Any]) -> float | None:
+    milli = asleep_milli(r)
+    return milli / MS_PER_HOUR if milli is not None else None
+
+
+def _workout_minutes(r: dict[str, Any]) -> float | None:
+    if not r.get("start") or not r.get("end"):
+        return None
+    return (parse_time(r["end"]) - parse_time(r["start"])) / 60
+
+
+# Metric name -> source resource, unit and value extractor
+DAILY_METRICS: dict[str, tuple[str, str, Callable[[dict[str, Any]], Any]]] = {
+    "recovery": ("recoveries", "%", _score("recovery_score")),
+    "hrv": ("recoveries", "ms", _score("hrv_rmssd_milli")),
+    "rhr": ("recoveries", "bpm", _score("resting_heart_rate")),
+    "spo2": ("recoveries", "%", _score("spo2_percentage")),
+    "skin_temp": ("recoveries", "°C", _score("skin_temp_celsius")),
+    "strain": ("cycles", "strain", _score("strain")),
+    "kilojoules": ("cycles", "kJ", _score("kilojoule")),
+    "average_heart_rate": ("cycles", "bpm", _score("average_heart_rate")),
+    "max_heart_rate": ("cycles", "bpm", _score("max_heart_rate")),
+    "sleep_performance": ("sleeps", "%", _score("sleep_performance_percentage")),
+    "sleep_efficiency": ("sleeps", "%", _score("sleep_efficiency_percentage")),
+    "sleep_hours": ("sleeps", "h", _sleep_hours),
+    "respiratory_rate": ("sleeps", "breaths/min", _score("respiratory_rate")),
+}
+WORKOUT_METRICS: dict[str, tuple[str, str, Callable[[dict[str, Any]], Any]]] = {
+    "workout_strain": ("workouts", "strain", _score("strain")),
+    "workout_kilojoules": ("workouts", "kJ", _score("kilojoule")),
+    "workout_average_heart_rate": ("workouts", "bpm", _score("average_heart_rate")),
+    "workout_max_heart_rate": ("workouts", "bpm", _score("max_heart_rate")),
+    "workout_minutes": ("workouts", "min", _workout_minutes),
+}
+METRICS = {**DAILY_METRICS, **WORKOUT_METRICS}
+
+AGGREGATES = ("count", "mean", "median", "min", "max", "std", "sum")
+DEFAULT_AGGREGATES = ["count", "mean", "median", "min", "max", "std"]
+
+
+def _column(records: list[dict[str, Any]], extract: Callable[[dict[str, Any]], Any]) -> np.ndarray:
+    # Missing values (None) become NaN
+    return np.array([extract(r) for r in records], dtype=np.float32)
+
+
+class Row:
+    """View of one row of a ``Series``; metric attributes are floats or None."""
+
+    __slots__ = ("_series", "_index")
+
+    def __init__(self, series: "Series", index: int):
+        self._series = series
+        self._index = index
+
+    @property
+    def id(self) -> Any:
+        return self._series.ids[self._index].item()
+
+    @property
+    def ts(self) -> int:
+        return int(self._series.ts[self._index])
+
+    def __getattr__(self, name: str) -> float | None:
+        try:
+            value = self._series.columns[name][self._index]
+        except KeyError:
+            raise AttributeError(name) from None
+        return None if np.isnan(value) else float(value)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "ts": self.ts, **{name: getattr(self, name) for name in self._series.columns}}
+
+    def __repr__(self) -> str:
+        return f"Row({self.as_dict()})"
+
+
+class Series:
+    """Rows sorted by ``ts`` (epoch seconds) with one float32 array per metric.
+
+    ``window`` slices by time without copying, so narrowing a multi-year
+    series to a month is two binary searches.
+    """
+
+    __slots__ = ("ts", "ids", "columns")
+
+    def __init__(self, ts: np.ndarray, ids: np.ndarray, columns: dict[str, np.ndarray]):
+        self.ts = ts
+        self.ids = ids
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, index: int) -> Row:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return Row(self, index % len(self))
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self, i) for i in range(len(self)))
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def window(self, start: float | None = None, end: float | None = None) -> "Series":
+        """Rows with ``start <= ts < end`` (either bound may be None)."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, start, side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.ts, end, side="left"))
+        return Series(self.ts[lo:hi], self.ids[lo:hi], {k: v[lo:hi] for k, v in self.columns.items()})
+
+    def aggregate(self, name: str, aggregates: list[str] | None = None) -> dict[str, float | int | None]:
+        return aggregate_values(self.columns[name], aggregates or DEFAULT_AGGREGATES)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.ids.nbytes + sum(c.nbytes for c in self.columns.values())
+
+
+def _sorted(records: Iterable[dict[str, Any]], time_field: str) -> tuple[list[dict[str, Any]], np.ndarray]:
+    records = [r for r in records if r.get(time_field)]
+    ts = np.array([parse_time(r[time_field]) for r in records], dtype=np.int64)
+    order = np.argsort(ts, kind="stable")
+    return [records[i] for i in order], ts[order]
+
+
+def daily_series(
+    cycles: Iterable[dict[str, Any]],
+    recoveries: Iterable[dict[str, Any]] = (),
+    sleeps: Iterable[dict[str, Any]] = (),
+) -> Series:
+    """One row per cycle (by start), with its recovery and main sleep joined on cycle id.
+
+    Sleeps without a ``cycle_id`` (v1 records) are matched through the
+    recovery's ``sleep_id``. Records whose cycle is not in ``cycles`` are dropped.
+    """
+    cycles, ts = _sorted(cycles, "start")
+    position = {c["id"]: i for i, c in enumerate(cycles)}
+    recoveries = list(recoveries)
+    cycle_of_sleep = {r.get("sleep_id"): r.get("cycle_id") for r in recoveries if r.get("sleep_id")}
+
+    joined = {"cycles": cycles}
+    for resource, records, cycle_id in (
+        ("recoveries", recoveries, lambda r: r.get("cycle_id")),
+        ("sleeps", [s for s in sleeps if not s.get("nap")],
+         lambda s: s.get("cycle_id") or cycle_of_sleep.get(s.get("id"))),
+    ):
+        rows = [None] * len(cycles)
+        for record in records:
+            i = position.get(cycle_id(record))
+            if i is not None and rows[i] is None:
+                rows[i] = record
+        joined[resource] = [r or {} for r in rows]
+
+    columns = {
+        name: _column(joined[resource], extract)
+        for name, (resource, _, extract) in DAILY_METRICS.items()
+    }
+    ids = np.array([c["id"] for c in cycles]) if cycles else np.array([], dtype=np.int64)
+    return Series(ts, ids, columns)
+
+
+def workout_series(workouts: Iterable[dict[str, Any]]) -> Series:
+    """One row per workout, by start."""
+    workouts, ts = _sorted(workouts, "start")
+    columns = {name: _column(workouts, extract) for name, (_, _, extract) in WORKOUT_METRICS.items()}
+    ids = np.array([w["id"] for w in workouts]) if workouts else np.array([], dtype=str)
+    return Series(ts, ids, columns)
+
+
+def is_percentile(name: str) -> bool:
+    """Whether an aggregate name is a percentile such as p10 or p97.5."""
+    try:
+        return name.startswith("p") and 0 <= float(name[1:]) <= 100
+    except ValueError:
+        return False
+
+
+def aggregate_values(values: np.ndarray, aggregates: list[str]) -> dict[str, float | int | None]:
+    """Vectorized summary statistics of ``values``; NaN marks missing values.
+
+    Aggregates: count, mean, median, min, max, std (population), sum and
+    pN for the N-th percentile (e.g. p10, p90).
+    """
+    values = values[~np.isnan(values)].astype(np.float64)
+    result: dict[str, float | int | None] = {}
+    percentiles = [a for a in aggregates if is_percentile(a)]
+    points = {}
+    if values.size and percentiles:
+        # All percentiles in one sort
+        points = dict(zip(percentiles, np.percentile(values, [float(p[1:]) for p in percentiles])))
+    for name in aggregates:
+        if name == "count":
+            result[name] = int(values.size)
+        elif name in percentiles:
+            result[name] = points.get(name)
+        elif not values.size:
+            result[name] = None
+        elif name == "mean":
+            result[name] = values.mean()
+        elif name == "median":
+            result[name] = np.median(values)
+        elif name == "min":
+            result[name] = values.min()
+        elif name == "max":
+            result[name] = values.max()
+        elif name == "std":
+            result[name] = values.std()
+        elif name == "sum":
+            result[name] = values.sum()
+    return {k: round(float(v), 2) if v is not None and k != "count" else v for k, v in result.items()}
@@ -5,13 +5,34 @@ Run this and follow the instructions
 import os
 import sys
 import json
-from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse, HTMLResponse
-import httpx
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from fastapi import BackgroundTasks, FastAPI, Request
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 import uvicorn
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import whoop_insights
+from whoop_insights import insight_cache
+from whoop_cache import response_cache
+from whoop_client import (
+    WhoopAPIError, api_get, flight_stats, get_client, iter_pages, iter_records, lifespan, retry_stats,
+    run_fetch_plan,
+)
+from whoop_http import CompressionMiddleware, ConditionalGetMiddleware, conditional_json, record_etag
+from whoop_metrics import MetricsMiddleware, render_prometheus, route_latency, upstream_latency
+from whoop_scheduler import PrefetchResult, PrefetchScheduler
+from whoop_store import RESOURCES as STORE_RESOURCES, WhoopStore
+from whoop_time import format_time
+from whoop_webhooks import WebhookProcessor
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -23,7 +44,11 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 USE_OLLAMA = os.getenv("USE_OLLAMA", "false").lower() == "true"
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+# Keep the dashboard's data warm in the background (see whoop_scheduler.py)
+PREFETCH_ENABLED = os.getenv("WHOOP_PREFETCH", "true").lower() == "true"
 TOKEN_CACHE_FILE = ".token_cache.json"
+# WHOOP API path prefix (relative to WHOOP_API_BASE, see whoop_client.py)
+API_BASE = "/developer/v1"
 
 # Validate required credentials
 if not CLIENT_ID or not CLIENT_SECRET:
@@ -33,7 +58,7 @@ if not CLIENT_ID or not CLIENT_SECRET:
 # Initialize AI client (Ollama or OpenAI)
 if USE_OLLAMA or not OPENAI_API_KEY:
     # Use Ollama (free local model)
-    ai_client = OpenAI(
+    ai_client = AsyncOpenAI(
         base_url=OLLAMA_BASE_URL,
         api_key="ollama"  # Ollama doesn't need a real API key
     )
@@ -41,7 +66,7 @@ if USE_OLLAMA or not OPENAI_API_KEY:
     print(f"🤖 Using Ollama with model: {ai_model}")
 elif OPENAI_API_KEY:
     # Use OpenAI
-    ai_client = OpenAI(api_key=OPENAI_API_KEY)
+    ai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     ai_model = "gpt-4o-mini"
     print("🤖 Using OpenAI")
 else:
@@ -49,7 +74,68 @@ else:
     ai_model = None
     print("⚠️ No AI client configured")
 
-app = FastAPI()
+@asynccontextmanager
+async def app_lifespan(app):
+    """Shared WHOOP client and background prefetcher for the app's lifetime"""
+    async with lifespan(app), prefetcher.running(PREFETCH_ENABLED):
+        yield
+
+app = FastAPI(lifespan=app_lifespan)
+# Outermost last: ETags are computed on the identity body, then compressed
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+# Times the whole request, compression included
+app.add_middleware(MetricsMiddleware)
+
+BASE_DIR = Path(__file__).resolve().parent
+STATIC_DIR = BASE_DIR / "static"
+
+class CachedStaticFiles(StaticFiles):
+    """Static files with a long browser cache lifetime
+    
+    Pages link assets through static_url(), which adds a content hash to the
+    URL, so a changed file gets a new URL and the old one can be cached forever.
+    """
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR), name="static")
+
+# Content hash per static file, computed once at startup
+static_versions = {
+    path.name: hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+    for path in STATIC_DIR.iterdir() if path.is_file()
+}
+
+def static_url(name):
+    """URL of a static asset, versioned by its content"""
+    return f"/static/{name}?v={static_versions.get(name, '0')}"
+
+def score_class(value, green, yellow):
+    """CSS class for a score shown as green/yellow/red"""
+    if value and value >= green:
+        return "recovery-green"
+    if value and value >= yellow:
+        return "recovery-yellow"
+    return "recovery-red"
+
+# Page templates are compiled once here rather than on each request
+templates = Environment(
+    loader=FileSystemLoader(BASE_DIR / "templates"),
+    autoescape=select_autoescape(["html"]),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    auto_reload=False,
+)
+templates.globals.update(static_url=static_url, score_class=score_class)
+for _name in templates.list_templates():
+    templates.get_template(_name)
+
+def render(name, **context):
+    """Render a page template into an HTML response"""
+    return HTMLResponse(templates.get_template(name).render(**context))
 
 # Simple in-memory storage
 tokens = {}
@@ -81,108 +167,175 @@ def load_token():
 # Load cached token on startup
 load_token()
 
+async def stream_records(request, path, start=None, end=None, limit=None):
+    """Stream every record of a collection endpoint as one JSON document.
+    
+    Pages are fetched one ahead of the response body (see iter_pages), so long
+    date ranges never sit in memory all at once. Without a range or limit only
+    the latest page is returned, matching the WHOOP default.
+    
+    A result that fits in one page is sent whole with an ETag built from its
+    records' versions, and If-None-Match is answered with 304.
+    """
+    params = {}
+    if start:
+        params["start"] = start
+    if end:
+        params["end"] = end
+    if limit is None and not params:
+        limit = 10
+    
+    pages = iter_pages(path, tokens['access_token'], params, limit=limit)
+    try:
+        first_page = await anext(pages)
+        second_page = await anext(pages, None)
+    except StopAsyncIteration:
+        first_page, second_page = [], None
+    except WhoopAPIError as e:
+        print(f"❌ {path}: {e.status_code}")
+        return {"error": e.text}
+    
+    if second_page is None:
+        print(f"✅ {path}: {len(first_page)} records")
+        return conditional_json(request, {"records": first_page}, record_etag(*first_page))
+    
+    async def body():
+        count = 0
+        queued = [first_page, second_page]
+        yield '{"records": ['
+        try:
+            while queued:
+                page = queued.pop(0)
+                for record in page:
+                    yield ("," if count else "") + json.dumps(record)
+                    count += 1
+                if not queued:
+                    page = await anext(pages, None)
+                    if page is not None:
+                        queued.append(page)
+            yield ']}'
+        except WhoopAPIError as e:
+            # Headers are already sent; report the failure inside the document
+            yield '], "error": ' + json.dumps(e.text) + '}'
+        print(f"✅ {path}: streamed {count} records")
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+def fetch_step(path, params=None):
+    """Fetch-plan step that GETs a WHOOP path with the current token"""
+    async def step():
+        return await api_get(f"{API_BASE}{path}", tokens['access_token'], params=params)
+    return step
+
+def records_step(path, params=None):
+    """Fetch-plan step that collects every page of a WHOOP collection (WhoopAPIError on failure)"""
+    async def step():
+        try:
+            return [r async for r in iter_records(f"{API_BASE}{path}", tokens['access_token'], params)]
+        except WhoopAPIError as e:
+            return e
+    return step
+
+def latest_cycle_of(cycles_resp):
+    """Latest cycle record from a /cycle response, or None"""
+    if cycles_resp.status_code != 200:
+        return None
+    records = cycles_resp.json().get("records", [])
+    return records[0] if records else None
+
+def refresh_step(path, params=None):
+    """Fetch-plan step that refetches a WHOOP path and re-caches it for one prefetch lease"""
+    async def step():
+        return await api_get(
+            f"{API_BASE}{path}", tokens['access_token'], params=params, refresh=True, ttl=prefetcher.lease
+        )
+    return step
+
+def cycle_child_step(child, refresh=False):
+    """Fetch-plan step for /cycle/{id}/<child> of the latest cycle (depends on "cycles")"""
+    async def step(cycles):
+        cycle = latest_cycle_of(cycles)
+        if not cycle or not cycle.get("id"):
+            return None
+        if refresh:
+            return await refresh_step(f"/cycle/{cycle['id']}/{child}")()
+        return await api_get(f"{API_BASE}/cycle/{cycle['id']}/{child}", tokens['access_token'])
+    return step
+
+async def prefetch_hot_data():
+    """Prefetch job: refresh what /dashboard and the views read first
+    
+    Scored recovery and sleep are cached for good and are not refetched.
+    With webhooks on, sleeps, workouts and recovery are invalidated when they
+    change, so only cycles (which have no webhooks) are refreshed.
+    """
+    if "access_token" not in tokens:
+        return None
+    pushed_step = fetch_step if store.webhooks else refresh_step
+    results = await run_fetch_plan({
+        "profile": ((), fetch_step("/user/profile/basic")),
+        "cycles": ((), refresh_step("/cycle", {"limit": "1"})),
+        "recent_cycles": ((), refresh_step("/cycle", {"limit": "7"})),
+        "sleeps": ((), pushed_step("/activity/sleep", {"limit": "7"})),
+        "workouts": ((), pushed_step("/workout", {"limit": "10"})),
+        "recovery": (("cycles",), cycle_child_step("recovery", refresh=not store.webhooks)),
+        "sleep": (("cycles",), cycle_child_step("sleep", refresh=not store.webhooks)),
+    })
+    recovery = results["recovery"]
+    recovery_ready = (
+        recovery is not None and recovery.status_code == 200
+        and recovery.json().get("score_state") == "SCORED"
+    )
+    sleeps = results["sleeps"].json().get("records", []) if results["sleeps"].status_code == 200 else []
+    return PrefetchResult(sleeps, recovery_ready)
+
+prefetcher = PrefetchScheduler(prefetch_hot_data, name="dashboard")
+
+# History store shared with the MCP server (same SQLite file); webhooks write
+# pushed records into it so the MCP tools don't have to poll for them, and
+# /daily reads whole local days from its day index
+store = WhoopStore(api_base="/developer/v2")
+webhooks = WebhookProcessor(store)
+
 @app.get("/")
 def home():
-    logged_in = "access_token" in tokens
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>WHOOP Dashboard</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-                max-width: 1200px;
-                margin: 0 auto;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-            }}
-            .container {{
-                background: white;
-                border-radius: 12px;
-                padding: 30px;
-                box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-            }}
-            h1 {{
-                color: #333;
-                margin-bottom: 10px;
-            }}
-            .subtitle {{
-                color: #666;
-                margin-bottom: 30px;
-            }}
-            .nav {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 15px;
-                margin-top: 30px;
-            }}
-            .nav-item {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 20px;
-                border-radius: 8px;
-                text-decoration: none;
-                text-align: center;
-                font-weight: 600;
-                transition: transform 0.2s, box-shadow 0.2s;
-            }}
-            .nav-item:hover {{
-                transform: translateY(-2px);
-                box-shadow: 0 5px 20px rgba(102, 126, 234, 0.4);
-            }}
-            .nav-item.ai {{
-                background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-            }}
-            .status {{
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-                background: #e8f5e9;
-                border-left: 4px solid #4caf50;
-            }}
-            .login-btn {{
-                background: #4caf50;
-                color: white;
-                padding: 15px 30px;
-                border-radius: 8px;
-                text-decoration: none;
-                display: inline-block;
-                font-weight: 600;
-                margin-top: 20px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>🏃 WHOOP Dashboard</h1>
-            <p class="subtitle">Your personal health and fitness insights powered by AI</p>
-            
-            {'<div class="status">✅ <strong>Logged in!</strong> Explore your data below.</div>' if logged_in else '<p>Please <a href="/login" class="login-btn">Login with WHOOP</a> to access your data.</p>'}
-            
-            {f'''<div class="nav">
-                <a href="/dashboard" class="nav-item">📊 Dashboard</a>
-                <a href="/cycles-view" class="nav-item">🔄 Cycles</a>
-                <a href="/workouts-view" class="nav-item">💪 Workouts</a>
-                <a href="/sleep-view" class="nav-item">😴 Sleep</a>
-                <a href="/recovery-view" class="nav-item">❤️ Recovery</a>
-                <a href="/ai-insights-view" class="nav-item ai">🤖 AI Insights</a>
-            </div>''' if logged_in else ''}
-            
-            <div style="margin-top: 30px; padding: 15px; background: #f5f5f5; border-radius: 8px; font-size: 0.9em; color: #666;">
-                <strong>Setup:</strong>
-                <ul style="margin: 10px 0;">
-                    <li>ngrok running: <code>ngrok http 3000</code></li>
-                    <li>Callback URL: <code>{NGROK_URL}/callback</code></li>
-    </ul>
-    """)
+    return render("home.html", logged_in="access_token" in tokens, callback_url=f"{NGROK_URL}/callback")
 
 @app.get("/test")
 def test():
     """Test if server is reachable"""
     return {"status": "Server is working!", "ngrok_url": NGROK_URL}
 
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics: route and upstream latency histograms, cache, retry and prefetch stats"""
+    flights = flight_stats()
+    body = render_prometheus(
+        [route_latency, upstream_latency],
+        {
+            "whoop_response_cache": response_cache.stats(),
+            "whoop_insight_cache": insight_cache.stats(),
+            # Per-reason counts are labelled by status code or exception name
+            "whoop_upstream": retry_stats(),
+            # Per-request coalescing counts would be one series per URL
+            "whoop_single_flight": {"in_flight": flights["in_flight"], "coalesced_total": flights["coalesced_total"]},
+            "whoop_prefetch": prefetcher.stats(),
+            "whoop_webhook_events": webhooks.stats(),
+            "whoop_store_records": {resource: store.count(resource) for resource in STORE_RESOURCES},
+        },
+        # Fields that only ever go up; the rest (entries, bytes, hit_ratio, ...) are levels
+        counters={
+            "whoop_response_cache_hits", "whoop_response_cache_misses", "whoop_response_cache_evictions",
+            "whoop_response_cache_expirations", "whoop_response_cache_permanent",
+            "whoop_insight_cache_hits", "whoop_insight_cache_misses",
+            "whoop_upstream_retries_total", "whoop_upstream_retries_by_reason",
+            "whoop_single_flight_coalesced_total",
+            "whoop_prefetch_runs", "whoop_prefetch_failures",
+            "whoop_webhook_events",
+        },
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 @app.get("/login")
 def login():
     print("\n🔵 LOGIN ENDPOINT HIT!")
@@ -215,189 +368,192 @@ async def callback(request: Request):
     print("Exchanging for token...")
     
     # Exchange code for token
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.prod.whoop.com/oauth/oauth2/token",
-            data={
-                "grant_type": "authorization_code",
-                "code": code,
-                "redirect_uri": f"{NGROK_URL}/callback",
-                "client_id": CLIENT_ID,
-                "client_secret": CLIENT_SECRET,
-            }
-        )
-        
-        print(f"Token response: {response.status_code}")
-        
-        if response.status_code == 200:
-            token_data = response.json()
-            tokens["access_token"] = token_data["access_token"]
-            save_token(token_data["access_token"])
-            print("✅ SUCCESS! Got access token!")
-            return RedirectResponse("/dashboard")
-        else:
-            print(f"❌ ERROR: {response.text}")
-            return {"error": "Token exchange failed", "details": response.text}
+    response = await get_client().post(
+        "https://api.prod.whoop.com/oauth/oauth2/token",
+        data={
+            "grant_type": "authorization_code",
+            "code": code,
+            "redirect_uri": f"{NGROK_URL}/callback",
+            "client_id": CLIENT_ID,
+            "client_secret": CLIENT_SECRET,
+        }
+    )
+    
+    print(f"Token response: {response.status_code}")
+    
+    if response.status_code == 200:
+        token_data = response.json()
+        tokens["access_token"] = token_data["access_token"]
+        save_token(token_data["access_token"])
+        response_cache.clear()
+        print("✅ SUCCESS! Got access token!")
+        return RedirectResponse("/dashboard")
+    else:
+        print(f"❌ ERROR: {response.text}")
+        return {"error": "Token exchange failed", "details": response.text}
+
+@app.post("/webhooks/whoop")
+async def whoop_webhook(request: Request, background_tasks: BackgroundTasks):
+    """WHOOP webhook receiver: verify, acknowledge, then apply the event in the background"""
+    body = await request.body()
+    reason = webhooks.verify(CLIENT_SECRET, request.headers, body)
+    if reason:
+        print(f"❌ Webhook rejected: {reason}")
+        return JSONResponse({"error": reason}, status_code=401)
+    try:
+        event = json.loads(body)
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON"}, status_code=400)
+    if not isinstance(event, dict):
+        return JSONResponse({"error": "Event must be a JSON object"}, status_code=400)
+    
+    # WHOOP expects a quick 2xx; fetching the record happens after the response
+    background_tasks.add_task(webhooks.handle, event, tokens.get("access_token"))
+    return {"received": event.get("type")}
 
 @app.get("/profile")
-async def profile():
+async def profile(request: Request):
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
     print("\n📊 Fetching WHOOP data...")
     
-    async with httpx.AsyncClient() as client:
-        # Use the correct developer API base URL
-        profile_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/user/profile/basic",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        
-        body_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/user/body_measurement",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        
-        cycles_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
+    results = await run_fetch_plan({
+        "profile": ((), fetch_step("/user/profile/basic")),
+        "body": ((), fetch_step("/user/body_measurement")),
+        "cycles": ((), fetch_step("/cycle")),
+    })
+    profile_response, body_response, cycles_response = results["profile"], results["body"], results["cycles"]
     
     print(f"✅ Profile: {profile_response.status_code}")
     print(f"✅ Body: {body_response.status_code}")
     print(f"✅ Cycles: {cycles_response.status_code}")
     
-    return {
+    payload = {
         "profile": profile_response.json() if profile_response.status_code == 200 else None,
         "body_measurement": body_response.json() if body_response.status_code == 200 else None,
         "cycles": cycles_response.json() if cycles_response.status_code == 200 else None,
     }
+    cycles = (payload["cycles"] or {}).get("records", [])
+    return conditional_json(request, payload, record_etag(payload["profile"], payload["body_measurement"], *cycles))
 
 @app.get("/cycles")
-async def get_cycles(start: str = None, end: str = None):
-    """Get cycle data with optional date range (YYYY-MM-DD format)"""
+async def get_cycles(request: Request, start: str = None, end: str = None, limit: int = None):
+    """Get cycle data with optional date range (YYYY-MM-DD format)
+    
+    Date ranges are followed across all pages and streamed back as they arrive.
+    """
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    print(f"\n📊 Fetching cycles data (start={start}, end={end})...")
-    
-    params = {}
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params=params
-        )
-    
-    print(f"✅ Cycles: {response.status_code}")
-    return response.json() if response.status_code == 200 else {"error": response.text}
+    print(f"\n📊 Fetching cycles data (start={start}, end={end}, limit={limit})...")
+    return await stream_records(request, f"{API_BASE}/cycle", start, end, limit)
 
 @app.get("/workouts")
-async def get_workouts(start: str = None, end: str = None):
-    """Get workout data with optional date range (YYYY-MM-DD format)"""
+async def get_workouts(request: Request, start: str = None, end: str = None, limit: int = None):
+    """Get workout data with optional date range (YYYY-MM-DD format)
+    
+    Date ranges are followed across all pages and streamed back as they arrive.
+    """
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    print(f"\n🏃 Fetching workouts data (start={start}, end={end})...")
-    
-    params = {}
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/workout",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params=params
-        )
-    
-    print(f"✅ Workouts: {response.status_code}")
-    return response.json() if response.status_code == 200 else {"error": response.text}
+    print(f"\n🏃 Fetching workouts data (start={start}, end={end}, limit={limit})...")
+    return await stream_records(request, f"{API_BASE}/workout", start, end, limit)
 
 @app.get("/sleep")
-async def get_sleep(start: str = None, end: str = None):
-    """Get sleep data with optional date range (YYYY-MM-DD format)"""
+async def get_sleep(request: Request, start: str = None, end: str = None, limit: int = None):
+    """Get sleep data with optional date range (YYYY-MM-DD format)
+    
+    Date ranges are followed across all pages and streamed back as they arrive.
+    """
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    print(f"\n😴 Fetching sleep data (start={start}, end={end})...")
-    
-    params = {}
-    if start:
-        params["start"] = start
-    if end:
-        params["end"] = end
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/activity/sleep",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params=params
-        )
-    
-    print(f"✅ Sleep: {response.status_code}")
-    return response.json() if response.status_code == 200 else {"error": response.text}
+    print(f"\n😴 Fetching sleep data (start={start}, end={end}, limit={limit})...")
+    return await stream_records(request, f"{API_BASE}/activity/sleep", start, end, limit)
 
 @app.get("/recovery")
-async def get_current_recovery():
+async def get_current_recovery(request: Request):
     """Get current recovery score for the latest cycle"""
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
     print("\n💪 Fetching current recovery...")
     
-    async with httpx.AsyncClient() as client:
-        # Step 1: Get the latest cycle (limit=1)
-        cycle_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "1"}
-        )
-        
-        print(f"✅ Latest Cycle: {cycle_response.status_code}")
-        
-        if cycle_response.status_code != 200:
-            return {"error": "Could not fetch cycle", "details": cycle_response.text}
-        
-        cycle_data = cycle_response.json()
-        
-        if not cycle_data.get("records") or len(cycle_data["records"]) == 0:
-            return {"message": "No cycles found yet"}
-        
-        latest_cycle = cycle_data["records"][0]
-        cycle_id = latest_cycle["id"]
-        
-        print(f"📋 Cycle ID: {cycle_id}")
-        
-        # Step 2: Get recovery for this cycle
-        recovery_response = await client.get(
-            f"https://api.prod.whoop.com/developer/v1/cycle/{cycle_id}/recovery",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        
-        print(f"✅ Recovery: {recovery_response.status_code}")
-        
-        if recovery_response.status_code == 200:
-            recovery_data = recovery_response.json()
-            return {
-                "cycle": latest_cycle,
-                "recovery": recovery_data
-            }
-        elif recovery_response.status_code == 404:
-            return {
-                "cycle": latest_cycle,
-                "recovery": None,
-                "message": "No recovery data for this cycle yet"
-            }
-        else:
-            return {"error": "Could not fetch recovery", "details": recovery_response.text}
+    # Step 1: Get the latest cycle (limit=1)
+    cycle_response = await api_get(f"{API_BASE}/cycle", tokens['access_token'], params={"limit": "1"})
+    
+    print(f"✅ Latest Cycle: {cycle_response.status_code}")
+    
+    if cycle_response.status_code != 200:
+        return {"error": "Could not fetch cycle", "details": cycle_response.text}
+    
+    cycle_data = cycle_response.json()
+    
+    if not cycle_data.get("records") or len(cycle_data["records"]) == 0:
+        return {"message": "No cycles found yet"}
+    
+    latest_cycle = cycle_data["records"][0]
+    cycle_id = latest_cycle["id"]
+    
+    print(f"📋 Cycle ID: {cycle_id}")
+    
+    # Step 2: Get recovery for this cycle
+    recovery_response = await api_get(f"{API_BASE}/cycle/{cycle_id}/recovery", tokens['access_token'])
+    
+    print(f"✅ Recovery: {recovery_response.status_code}")
+    
+    if recovery_response.status_code == 200:
+        recovery_data = recovery_response.json()
+        return conditional_json(request, {
+            "cycle": latest_cycle,
+            "recovery": recovery_data
+        }, record_etag(latest_cycle, recovery_data))
+    elif recovery_response.status_code == 404:
+        return conditional_json(request, {
+            "cycle": latest_cycle,
+            "recovery": None,
+            "message": "No recovery data for this cycle yet"
+        }, record_etag(latest_cycle, None))
+    else:
+        return {"error": "Could not fetch recovery", "details": recovery_response.text}
+
+@app.get("/daily")
+async def daily(request: Request, day: str = None):
+    """Cycle, recovery, sleeps and workouts of one local calendar day (default today)"""
+    if "access_token" not in tokens:
+        return RedirectResponse("/")
+    
+    try:
+        # Normalized, so other ISO forms (20261015) still match the stored YYYY-MM-DD days
+        day = date.fromisoformat(day or store.local_today()).isoformat()
+    except ValueError:
+        return {"error": "day must be YYYY-MM-DD"}
+    # Two days of margin: the day's cycle starts the evening before, and a
+    # local day can begin up to 14 hours before the UTC one
+    start = datetime.combine(date.fromisoformat(day), datetime.min.time(), timezone.utc).timestamp() - 2 * 86400
+    
+    # Make sure the store covers the day; the lookups below are local index hits
+    synced = await asyncio.gather(
+        *(store.ensure_range(resource, tokens['access_token'], start) for resource in STORE_RESOURCES),
+        return_exceptions=True,
+    )
+    for resource, result in zip(STORE_RESOURCES, synced):
+        if isinstance(result, Exception):
+            print(f"⚠️ Serving stored {resource} after sync failure: {result}")
+    
+    records = {resource: store.on_day(resource, day) for resource in STORE_RESOURCES}
+    cycle = records["cycles"][0] if records["cycles"] else None
+    recovery = records["recoveries"][0] if records["recoveries"] else None
+    print(f"📅 {day}: {', '.join(f'{len(v)} {k}' for k, v in records.items())}")
+    return conditional_json(request, {
+        "day": day,
+        "cycle": cycle,
+        "recovery": recovery,
+        "sleeps": records["sleeps"],
+        "workouts": records["workouts"]
+    }, record_etag(cycle, recovery, *records["sleeps"], *records["workouts"]))
 
 @app.get("/dashboard")
 async def dashboard():
@@ -405,20 +561,18 @@ async def dashboard():
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    async with httpx.AsyncClient() as client:
-        profile_resp = await client.get(
-            "https://api.prod.whoop.com/developer/v1/user/profile/basic",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-        cycles_resp = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "1"}
-        )
+    # profile ∥ cycle, then recovery ∥ sleep for the latest cycle id (~2 round trips)
+    results = await run_fetch_plan({
+        "profile": ((), fetch_step("/user/profile/basic")),
+        "cycles": ((), fetch_step("/cycle", {"limit": "1"})),
+        "recovery": (("cycles",), cycle_child_step("recovery")),
+        "sleep": (("cycles",), cycle_child_step("sleep")),
+    })
+    profile_resp, cycles_resp = results["profile"], results["cycles"]
+    recovery_resp, sleep_resp = results["recovery"], results["sleep"]
     
     profile = profile_resp.json() if profile_resp.status_code == 200 else {}
-    cycles = cycles_resp.json() if cycles_resp.status_code == 200 else {"records": []}
-    latest_cycle = cycles.get("records", [])[0] if cycles.get("records") else None
+    latest_cycle = latest_cycle_of(cycles_resp)
     
     print(f"\n📊 Dashboard - Latest Cycle Data: {latest_cycle}")
     
@@ -431,153 +585,31 @@ async def dashboard():
         score = latest_cycle.get("score", {})
         strain_score = score.get("strain")
         
-        cycle_id = latest_cycle.get("id")
-        
-        # Fetch recovery and sleep data separately
-        if cycle_id:
-            async with httpx.AsyncClient() as client:
-                # Fetch recovery
-                recovery_resp = await client.get(
-                    f"https://api.prod.whoop.com/developer/v1/cycle/{cycle_id}/recovery",
-                    headers={"Authorization": f"Bearer {tokens['access_token']}"}
-                )
-                if recovery_resp.status_code == 200:
-                    recovery_data = recovery_resp.json()
-                    recovery_score = recovery_data.get("score", {}).get("recovery_score")
-                    print(f"✅ Recovery: {recovery_score}")
-                else:
-                    print(f"⚠️ Recovery: {recovery_resp.status_code} - {recovery_resp.text[:100]}")
-                
-                # Fetch sleep
-                sleep_resp = await client.get(
-                    f"https://api.prod.whoop.com/developer/v1/cycle/{cycle_id}/sleep",
-                    headers={"Authorization": f"Bearer {tokens['access_token']}"}
-                )
-                if sleep_resp.status_code == 200:
-                    sleep_data = sleep_resp.json()
-                    sleep_performance = sleep_data.get("score", {}).get("sleep_performance_percentage")
-                    print(f"✅ Sleep: {sleep_performance}%")
-                else:
-                    print(f"⚠️ Sleep: {sleep_resp.status_code} - {sleep_resp.text[:100]}")
+        # Recovery and sleep were fetched for this cycle by the plan above
+        if recovery_resp is not None and sleep_resp is not None:
+            if recovery_resp.status_code == 200:
+                recovery_data = recovery_resp.json()
+                recovery_score = recovery_data.get("score", {}).get("recovery_score")
+                print(f"✅ Recovery: {recovery_score}")
+            else:
+                print(f"⚠️ Recovery: {recovery_resp.status_code} - {recovery_resp.text[:100]}")
+            
+            if sleep_resp.status_code == 200:
+                sleep_data = sleep_resp.json()
+                sleep_performance = sleep_data.get("score", {}).get("sleep_performance_percentage")
+                print(f"✅ Sleep: {sleep_performance}%")
+            else:
+                print(f"⚠️ Sleep: {sleep_resp.status_code} - {sleep_resp.text[:100]}")
         
         print(f"Dashboard metrics - Recovery: {recovery_score}, Strain: {strain_score}, Sleep: {sleep_performance}")
     
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Dashboard - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                margin-bottom: 30px;
-            }}
-            .metrics {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-                margin-bottom: 30px;
-            }}
-            .metric-card {{
-                background: white;
-                padding: 25px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .metric-label {{
-                color: #666;
-                font-size: 0.9em;
-                margin-bottom: 8px;
-            }}
-            .metric-value {{
-                font-size: 2.5em;
-                font-weight: bold;
-                color: #333;
-            }}
-            .metric-icon {{
-                font-size: 2em;
-                margin-bottom: 10px;
-            }}
-            .recovery-green {{ color: #4caf50; }}
-            .recovery-yellow {{ color: #ff9800; }}
-            .recovery-red {{ color: #f44336; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-                display: flex;
-                gap: 15px;
-                flex-wrap: wrap;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-                transition: background 0.2s;
-            }}
-            .nav-bar a:hover {{
-                background: #f0f0f0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/cycles-view">🔄 Cycles</a>
-                <a href="/ai-insights-view">🤖 AI Insights</a>
-            </div>
-            
-            <div class="header">
-                <h1>👋 Welcome, {profile.get('first_name', 'User')}!</h1>
-                <p>Here's your health overview</p>
-            </div>
-            
-            <div class="metrics">
-                <div class="metric-card">
-                    <div class="metric-icon">❤️</div>
-                    <div class="metric-label">Recovery</div>
-                    <div class="metric-value {'recovery-green' if recovery_score and recovery_score >= 67 else 'recovery-yellow' if recovery_score and recovery_score >= 34 else 'recovery-red'}">
-                        {f'{recovery_score}%' if recovery_score else 'N/A'}
-                    </div>
-                    {'' if recovery_score else '<div style="font-size: 0.7em; color: #999; margin-top: 10px;">Available after sleep</div>'}
-                </div>
-                
-                <div class="metric-card">
-                    <div class="metric-icon">💪</div>
-                    <div class="metric-label">Strain</div>
-                    <div class="metric-value">
-                        {f'{strain_score:.1f}' if strain_score else 'N/A'}
-                    </div>
-                </div>
-                
-                <div class="metric-card">
-                    <div class="metric-icon">😴</div>
-                    <div class="metric-label">Sleep Performance</div>
-                    <div class="metric-value">
-                        {f'{sleep_performance}%' if sleep_performance else 'N/A'}
-                    </div>
-                    {'' if sleep_performance else '<div style="font-size: 0.7em; color: #999; margin-top: 10px;">Available after sleep</div>'}
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """)
+    return render(
+        "dashboard.html",
+        first_name=profile.get("first_name", "User"),
+        recovery_score=recovery_score,
+        strain_score=strain_score,
+        sleep_performance=sleep_performance,
+    )
 
 @app.get("/ai-insights-view")
 async def ai_insights_view():
@@ -585,114 +617,12 @@ async def ai_insights_view():
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    # Get the insights from the API
-    insights_data = await ai_insights()
-    
-    if isinstance(insights_data, dict) and "error" in insights_data:
-        error_msg = insights_data["error"]
-        return HTMLResponse(f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>AI Insights - Error</title>
-            <style>
-                body {{
-                    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                    margin: 0;
-                    padding: 20px;
-                    background: #f5f7fa;
-                }}
-                .container {{ max-width: 800px; margin: 0 auto; }}
-                .error {{
-                    background: white;
-                    padding: 30px;
-                    border-radius: 12px;
-                    border-left: 4px solid #f44336;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="error">
-                    <h2>❌ Error</h2>
-                    <p>{error_msg}</p>
-                    <a href="/dashboard">← Back to Dashboard</a>
-                </div>
-            </div>
-        </body>
-        </html>
-        """)
-    
-    insights_text = insights_data.get("insights", "").replace("\n", "<br>")
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>AI Insights - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 900px; margin: 0 auto; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                margin-right: 10px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-            }}
-            .insights-card {{
-                background: white;
-                padding: 30px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                line-height: 1.8;
-            }}
-            .insights-header {{
-                background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                color: white;
-                padding: 20px 30px;
-                border-radius: 12px;
-                margin-bottom: 20px;
-            }}
-            .loading {{
-                text-align: center;
-                padding: 40px;
-                color: #666;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/ai-insights-view">🤖 AI Insights</a>
-            </div>
-            
-            <div class="insights-header">
-                <h1>🤖 AI Health Coach</h1>
-                <p>Personalized insights powered by {ai_model}</p>
-            </div>
-            
-            <div class="insights-card">
-                {insights_text}
-            </div>
-        </div>
-    </body>
-    </html>
-    """)
+    # Insights stream in from /ai-insights/stream; only a missing AI client is reported up front
+    if not ai_client:
+        error_msg = "No AI client configured. Install Ollama or add OPENAI_API_KEY to .env file"
+        return render("error.html", title="AI Insights", message=error_msg)
+    
+    return render("ai_insights.html", ai_model=ai_model)
 
 @app.get("/ai-insights")
 async def ai_insights():
@@ -705,72 +635,22 @@ async def ai_insights():
     
     print(f"\n🤖 Generating AI insights using {ai_model}...")
     
-    async with httpx.AsyncClient() as client:
-        # Fetch latest recovery
-        recovery_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "3"}  # Get last 3 cycles for trend analysis
-        )
-        
-        # Fetch latest sleep
-        sleep_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/activity/sleep",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "3"}
-        )
-        
-        # Fetch latest workouts
-        workout_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/workout",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "5"}
-        )
-    
-    if recovery_response.status_code != 200:
-        return {"error": "Could not fetch cycle data", "details": recovery_response.text}
+    data = await load_insight_data()
+    if "error" in data:
+        return data
     
-    cycles_data = recovery_response.json()
-    sleep_data = sleep_response.json() if sleep_response.status_code == 200 else {"records": []}
-    workout_data = workout_response.json() if workout_response.status_code == 200 else {"records": []}
-    
-    # Prepare data summary for AI
-    data_summary = f"""
-WHOOP Data Summary:
-
-Recent Cycles (last 3):
-{cycles_data}
-
-Recent Sleep (last 3):
-{sleep_data}
-
-Recent Workouts (last 5):
-{workout_data}
-"""
+    messages = build_insight_messages(data)
+    key = whoop_insights.insight_key(ai_model, messages)
+    cached = insight_cache.get(key)
+    if cached:
+        print("✅ AI insights served from cache (data unchanged)")
+        return {"insights": cached["insights"], "data_summary": cached["data_summary"], "cached": True}
     
     try:
-        # Call AI API (Ollama or OpenAI)
-        response = ai_client.chat.completions.create(
+        # Call AI API (Ollama or OpenAI) without blocking the event loop
+        response = await ai_client.chat.completions.create(
             model=ai_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a professional health and fitness coach analyzing WHOOP biometric data. 
-                    Provide personalized, actionable insights based on the user's recovery, sleep, and workout data.
-                    Focus on:
-                    1. Current recovery status and what it means
-                    2. Sleep quality and patterns
-                    3. Workout recommendations (should they train hard, take it easy, or rest?)
-                    4. Trends and patterns over the last few days
-                    5. Specific actionable advice
-                    
-                    Be concise, encouraging, and data-driven. Use bullet points for clarity."""
-                },
-                {
-                    "role": "user",
-                    "content": f"Analyze my WHOOP data and provide insights:\n\n{data_summary}"
-                }
-            ],
+            messages=messages,
             temperature=0.7,
             max_tokens=800
         )
@@ -778,162 +658,135 @@ Recent Workouts (last 5):
         ai_insights = response.choices[0].message.content
         print("✅ AI insights generated!")
         
+        data_summary = insight_data_counts(data)
+        insight_cache.put(key, ai_model, ai_insights, data_summary)
         return {
             "insights": ai_insights,
-            "data_summary": {
-                "cycles_count": len(cycles_data.get("records", [])),
-                "sleep_count": len(sleep_data.get("records", [])),
-                "workout_count": len(workout_data.get("records", []))
-            }
+            "data_summary": data_summary,
+            "cached": False
         }
     
     except Exception as e:
         print(f"❌ Error generating insights: {e}")
         return {"error": f"Failed to generate insights: {str(e)}"}
 
+@app.get("/ai-insights/stream")
+async def ai_insights_stream():
+    """Stream AI insights as server-sent events while the model generates them
+    
+    Events: "token" ({"text": ...}) per generated chunk, then "done" with the
+    data summary, or "insights-error" ({"error": ...}) if anything fails.
+    Insights cached for unchanged data are sent as a single "token" event.
+    """
+    if "access_token" not in tokens:
+        return RedirectResponse("/")
+    
+    if not ai_client:
+        return {"error": "No AI client configured. Install Ollama or add OPENAI_API_KEY to .env file"}
+    
+    async def events():
+        print(f"\n🤖 Streaming AI insights using {ai_model}...")
+        data = await load_insight_data()
+        if "error" in data:
+            yield sse_event("insights-error", data)
+            return
+        
+        messages = build_insight_messages(data)
+        key = whoop_insights.insight_key(ai_model, messages)
+        cached = insight_cache.get(key)
+        if cached:
+            print("✅ AI insights served from cache (data unchanged)")
+            yield sse_event("token", {"text": cached["insights"]})
+            yield sse_event("done", {"data_summary": cached["data_summary"], "cached": True})
+            return
+        
+        try:
+            stream = await ai_client.chat.completions.create(
+                model=ai_model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                stream=True
+            )
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield sse_event("token", {"text": parts[-1]})
+            print("✅ AI insights streamed!")
+            data_summary = insight_data_counts(data)
+            insight_cache.put(key, ai_model, "".join(parts), data_summary)
+            yield sse_event("done", {"data_summary": data_summary, "cached": False})
+        except Exception as e:
+            print(f"❌ Error generating insights: {e}")
+            yield sse_event("insights-error", {"error": f"Failed to generate insights: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse_event(event, payload):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+async def load_insight_data():
+    """Fetch the recent WHOOP data AI insights are based on
+    
+    WHOOP returns at most 25 records per page, so each collection is paged
+    through from the start of the history window (plus a day, as cycles start
+    the evening before) rather than asked for AI_HISTORY_DAYS records at once.
+    """
+    days = whoop_insights.history_days()
+    window = {"start": format_time(time.time() - (days + 1) * 86400)}
+    # Fetch cycles, recoveries, sleep and workouts for the history window concurrently
+    results = await run_fetch_plan({
+        "cycles": ((), records_step("/cycle", window)),
+        "recovery": ((), records_step("/recovery", window)),
+        "sleep": ((), records_step("/activity/sleep", window)),
+        "workouts": ((), records_step("/workout", window)),
+    })
+    
+    if isinstance(results["cycles"], WhoopAPIError):
+        return {"error": "Could not fetch cycle data", "details": results["cycles"].text}
+    
+    def records(result):
+        return [] if isinstance(result, WhoopAPIError) else result
+    
+    return {
+        "cycles": results["cycles"],
+        "recovery": records(results["recovery"]),
+        "sleep": records(results["sleep"]),
+        "workouts": records(results["workouts"]),
+    }
+
+def insight_data_counts(data):
+    """Record counts reported alongside generated insights"""
+    return {
+        "cycles_count": len(data["cycles"]),
+        "recovery_count": len(data["recovery"]),
+        "sleep_count": len(data["sleep"]),
+        "workout_count": len(data["workouts"])
+    }
+
+def build_insight_messages(data):
+    """Chat messages asking the model for insights on the fetched data"""
+    return whoop_insights.build_messages(data["cycles"], data["recovery"], data["sleep"], data["workouts"])
+
 @app.get("/cycles-view")
 async def cycles_view():
     """HTML view for cycles data"""
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "7"}
-        )
+    response = await api_get(f"{API_BASE}/cycle", tokens['access_token'], params={"limit": "7"})
     
     if response.status_code != 200:
         return HTMLResponse("<h1>Error fetching cycles</h1>")
     
-    data = response.json()
-    cycles = data.get("records", [])
-    
-    cycles_html = ""
-    for cycle in cycles:
-        cycle_id = cycle.get("id")
-        strain = cycle.get("score", {}).get("strain")
-        is_complete = cycle.get("end") is not None
-        
-        # Display note for current/incomplete cycles
-        status_note = "" if is_complete else " (Current - in progress)"
-        
-        cycles_html += f"""
-        <div class="cycle-card">
-            <div class="cycle-date">📅 {cycle.get('start', '')[:10]}{status_note}</div>
-            <div class="cycle-metrics">
-                <div class="mini-metric">
-                    <span class="mini-label">Strain</span>
-                    <span class="mini-value">{f'{strain:.1f}' if strain else 'N/A'}</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">Status</span>
-                    <span class="mini-value" style="font-size: 0.9em;">{'Complete' if is_complete else 'Active'}</span>
-                </div>
-            </div>
-            <div style="margin-top: 10px; font-size: 0.85em; color: #666;">
-                {'Recovery & sleep data available after cycle completes' if not is_complete else 'View recovery-view for recovery data'}
-            </div>
-        </div>
-        """
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Cycles - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                margin-right: 10px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                margin-bottom: 30px;
-            }}
-            .cycles-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-                gap: 20px;
-            }}
-            .cycle-card {{
-                background: white;
-                padding: 20px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            }}
-            .cycle-date {{
-                font-size: 1.1em;
-                font-weight: 600;
-                margin-bottom: 15px;
-                color: #333;
-            }}
-            .cycle-metrics {{
-                display: flex;
-                gap: 15px;
-            }}
-            .mini-metric {{
-                flex: 1;
-                text-align: center;
-            }}
-            .mini-label {{
-                display: block;
-                font-size: 0.8em;
-                color: #666;
-                margin-bottom: 5px;
-            }}
-            .mini-value {{
-                display: block;
-                font-size: 1.5em;
-                font-weight: bold;
-            }}
-            .recovery-green {{ color: #4caf50; }}
-            .recovery-yellow {{ color: #ff9800; }}
-            .recovery-red {{ color: #f44336; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/cycles-view">🔄 Cycles</a>
-                <a href="/ai-insights-view">🤖 AI Insights</a>
-            </div>
-            
-            <div class="header">
-                <h1>🔄 Your Cycles</h1>
-                <p>Last 7 days of recovery, strain, and sleep</p>
-            </div>
-            
-            <div class="cycles-grid">
-                {cycles_html}
-            </div>
-        </div>
-    </body>
-    </html>
-    """)
+    cycles = response.json().get("records", [])
+    return render("cycles.html", cycles=cycles)
 
 @app.get("/recovery-view")
 async def recovery_view():
@@ -941,30 +794,19 @@ async def recovery_view():
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    async with httpx.AsyncClient() as client:
-        cycle_response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/cycle",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "1"}
-        )
+    # cycle, then recovery for its id
+    results = await run_fetch_plan({
+        "cycles": ((), fetch_step("/cycle", {"limit": "1"})),
+        "recovery": (("cycles",), cycle_child_step("recovery")),
+    })
+    cycle_response, recovery_response = results["cycles"], results["recovery"]
     
     if cycle_response.status_code != 200:
         return HTMLResponse("<h1>Error fetching cycle data</h1>")
     
-    cycle_data = cycle_response.json()
-    
-    if not cycle_data.get("records") or len(cycle_data["records"]) == 0:
+    if recovery_response is None:
         return HTMLResponse("<h1>No cycle data available</h1>")
     
-    latest_cycle = cycle_data["records"][0]
-    cycle_id = latest_cycle["id"]
-    
-    async with httpx.AsyncClient() as client:
-        recovery_response = await client.get(
-            f"https://api.prod.whoop.com/developer/v1/cycle/{cycle_id}/recovery",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"}
-        )
-    
     if recovery_response.status_code == 404:
         message = "No recovery data available for your current cycle yet. Check back after you've slept!"
         recovery = None
@@ -978,129 +820,7 @@ async def recovery_view():
     hrv = recovery.get("score", {}).get("hrv_rmssd_milli") if recovery else None
     rhr = recovery.get("score", {}).get("resting_heart_rate") if recovery else None
     
-    recovery_class = "recovery-green" if recovery_score and recovery_score >= 67 else "recovery-yellow" if recovery_score and recovery_score >= 34 else "recovery-red"
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Recovery - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 800px; margin: 0 auto; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                margin-right: 10px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                margin-bottom: 30px;
-            }}
-            .recovery-main {{
-                background: white;
-                padding: 40px;
-                border-radius: 12px;
-                text-align: center;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                margin-bottom: 20px;
-            }}
-            .recovery-score {{
-                font-size: 5em;
-                font-weight: bold;
-                margin: 20px 0;
-            }}
-            .metrics-grid {{
-                display: grid;
-                grid-template-columns: repeat(2, 1fr);
-                gap: 20px;
-            }}
-            .metric-card {{
-                background: white;
-                padding: 25px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                text-align: center;
-            }}
-            .metric-label {{
-                color: #666;
-                font-size: 0.9em;
-                margin-bottom: 10px;
-            }}
-            .metric-value {{
-                font-size: 2.5em;
-                font-weight: bold;
-                color: #333;
-            }}
-            .recovery-green {{ color: #4caf50; }}
-            .recovery-yellow {{ color: #ff9800; }}
-            .recovery-red {{ color: #f44336; }}
-            .message {{
-                background: #fff3cd;
-                padding: 20px;
-                border-radius: 8px;
-                border-left: 4px solid #ffc107;
-                margin-bottom: 20px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/recovery-view">❤️ Recovery</a>
-            </div>
-            
-            <div class="header">
-                <h1>❤️ Recovery Status</h1>
-                <p>Your body's readiness to perform</p>
-            </div>
-            
-            {f'<div class="message">{message}</div>' if message else ''}
-            
-            <div class="recovery-main">
-                <div class="recovery-score {recovery_class}">
-                    {f'{recovery_score}%' if recovery_score else 'N/A'}
-                </div>
-                <div style="color: #666; font-size: 1.2em;">
-                    Recovery Score
-                </div>
-            </div>
-            
-            {f'''<div class="metrics-grid">
-                <div class="metric-card">
-                    <div class="metric-label">❤️ Resting Heart Rate</div>
-                    <div class="metric-value">{rhr if rhr else 'N/A'}</div>
-                    <div style="color: #666; font-size: 0.9em;">bpm</div>
-                </div>
-                <div class="metric-card">
-                    <div class="metric-label">📊 HRV</div>
-                    <div class="metric-value">{hrv if hrv else 'N/A'}</div>
-                    <div style="color: #666; font-size: 0.9em;">ms</div>
-                </div>
-            </div>''' if recovery else ''}
-        </div>
-    </body>
-    </html>
-    """)
+    return render("recovery.html", message=message, recovery=recovery, recovery_score=recovery_score, hrv=hrv, rhr=rhr)
 
 @app.get("/workouts-view")
 async def workouts_view():
@@ -1108,164 +828,15 @@ async def workouts_view():
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/workout",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "10"}
-        )
+    response = await api_get(f"{API_BASE}/workout", tokens['access_token'], params={"limit": "10"})
     
     print(f"\n💪 Workouts API Response: {response.status_code}")
     if response.status_code != 200:
         print(f"Error: {response.text}")
         return HTMLResponse(f"<h1>Error fetching workouts</h1><p>Status: {response.status_code}</p><p>{response.text}</p>")
     
-    data = response.json()
-    workouts = data.get("records", [])
-    
-    workouts_html = ""
-    for workout in workouts:
-        sport_name = workout.get("sport_name", "Unknown")
-        strain = workout.get("score", {}).get("strain")
-        avg_hr = workout.get("score", {}).get("average_heart_rate")
-        max_hr = workout.get("score", {}).get("max_heart_rate")
-        calories = workout.get("score", {}).get("kilojoule")
-        start_time = workout.get("start", "")[:10]
-        
-        workouts_html += f"""
-        <div class="workout-card">
-            <div class="workout-header">
-                <div class="workout-sport">💪 {sport_name}</div>
-                <div class="workout-date">{start_time}</div>
-            </div>
-            <div class="workout-metrics">
-                <div class="mini-metric">
-                    <span class="mini-label">Strain</span>
-                    <span class="mini-value">{f'{strain:.1f}' if strain else 'N/A'}</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">Avg HR</span>
-                    <span class="mini-value">{avg_hr if avg_hr else 'N/A'}</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">Max HR</span>
-                    <span class="mini-value">{max_hr if max_hr else 'N/A'}</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">kJ</span>
-                    <span class="mini-value">{int(calories) if calories else 'N/A'}</span>
-                </div>
-            </div>
-        </div>
-        """
-    
-    if not workouts_html:
-        workouts_html = '<div class="message">No workouts found. Start tracking your activities!</div>'
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Workouts - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                margin-right: 10px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                margin-bottom: 30px;
-            }}
-            .workout-card {{
-                background: white;
-                padding: 20px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                margin-bottom: 15px;
-            }}
-            .workout-header {{
-                display: flex;
-                justify-content: space-between;
-                margin-bottom: 15px;
-            }}
-            .workout-sport {{
-                font-size: 1.2em;
-                font-weight: 600;
-                color: #333;
-            }}
-            .workout-date {{
-                color: #666;
-            }}
-            .workout-metrics {{
-                display: flex;
-                gap: 20px;
-            }}
-            .mini-metric {{
-                flex: 1;
-                text-align: center;
-                padding: 10px;
-                background: #f5f7fa;
-                border-radius: 8px;
-            }}
-            .mini-label {{
-                display: block;
-                font-size: 0.8em;
-                color: #666;
-                margin-bottom: 5px;
-            }}
-            .mini-value {{
-                display: block;
-                font-size: 1.3em;
-                font-weight: bold;
-                color: #667eea;
-            }}
-            .message {{
-                background: white;
-                padding: 30px;
-                border-radius: 12px;
-                text-align: center;
-                color: #666;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/workouts-view">💪 Workouts</a>
-            </div>
-            
-            <div class="header">
-                <h1>💪 Your Workouts</h1>
-                <p>Recent training activities</p>
-            </div>
-            
-            {workouts_html}
-        </div>
-    </body>
-    </html>
-    """)
+    workouts = response.json().get("records", [])
+    return render("workouts.html", workouts=workouts)
 
 @app.get("/sleep-view")
 async def sleep_view():
@@ -1273,154 +844,15 @@ async def sleep_view():
     if "access_token" not in tokens:
         return RedirectResponse("/")
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.prod.whoop.com/developer/v1/activity/sleep",
-            headers={"Authorization": f"Bearer {tokens['access_token']}"},
-            params={"limit": "7"}
-        )
+    response = await api_get(f"{API_BASE}/activity/sleep", tokens['access_token'], params={"limit": "7"})
     
     print(f"\n😴 Sleep API Response: {response.status_code}")
     if response.status_code != 200:
         print(f"Error: {response.text}")
         return HTMLResponse(f"<h1>Error fetching sleep data</h1><p>Status: {response.status_code}</p><p>{response.text}</p>")
     
-    data = response.json()
-    sleeps = data.get("records", [])
-    
-    sleep_html = ""
-    for sleep in sleeps:
-        score = sleep.get("score", {})
-        sleep_perf = score.get("sleep_performance_percentage")
-        duration_ms = sleep.get("score", {}).get("total_sleep_time_milli", 0)
-        duration_hours = duration_ms / (1000 * 60 * 60) if duration_ms else 0
-        efficiency = score.get("sleep_efficiency_percentage")
-        start_time = sleep.get("start", "")[:10]
-        
-        perf_class = "recovery-green" if sleep_perf and sleep_perf >= 85 else "recovery-yellow" if sleep_perf and sleep_perf >= 70 else "recovery-red"
-        
-        sleep_html += f"""
-        <div class="sleep-card">
-            <div class="sleep-date">😴 {start_time}</div>
-            <div class="sleep-metrics">
-                <div class="mini-metric">
-                    <span class="mini-label">Performance</span>
-                    <span class="mini-value {perf_class}">{sleep_perf}%</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">Duration</span>
-                    <span class="mini-value">{duration_hours:.1f}h</span>
-                </div>
-                <div class="mini-metric">
-                    <span class="mini-label">Efficiency</span>
-                    <span class="mini-value">{efficiency}%</span>
-                </div>
-            </div>
-        </div>
-        """
-    
-    if not sleep_html:
-        sleep_html = '<div class="message">No sleep data found.</div>'
-    
-    return HTMLResponse(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Sleep - WHOOP</title>
-        <style>
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: #f5f7fa;
-            }}
-            .container {{ max-width: 1000px; margin: 0 auto; }}
-            .nav-bar {{
-                background: white;
-                padding: 15px;
-                border-radius: 8px;
-                margin-bottom: 20px;
-            }}
-            .nav-bar a {{
-                padding: 10px 20px;
-                margin-right: 10px;
-                border-radius: 6px;
-                text-decoration: none;
-                color: #667eea;
-                font-weight: 600;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                border-radius: 12px;
-                margin-bottom: 30px;
-            }}
-            .sleep-card {{
-                background: white;
-                padding: 20px;
-                border-radius: 12px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                margin-bottom: 15px;
-            }}
-            .sleep-date {{
-                font-size: 1.1em;
-                font-weight: 600;
-                margin-bottom: 15px;
-                color: #333;
-            }}
-            .sleep-metrics {{
-                display: flex;
-                gap: 15px;
-            }}
-            .mini-metric {{
-                flex: 1;
-                text-align: center;
-                padding: 15px;
-                background: #f5f7fa;
-                border-radius: 8px;
-            }}
-            .mini-label {{
-                display: block;
-                font-size: 0.8em;
-                color: #666;
-                margin-bottom: 5px;
-            }}
-            .mini-value {{
-                display: block;
-                font-size: 1.5em;
-                font-weight: bold;
-            }}
-            .recovery-green {{ color: #4caf50; }}
-            .recovery-yellow {{ color: #ff9800; }}
-            .recovery-red {{ color: #f44336; }}
-            .message {{
-                background: white;
-                padding: 30px;
-                border-radius: 12px;
-                text-align: center;
-                color: #666;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="nav-bar">
-                <a href="/">🏠 Home</a>
-                <a href="/dashboard">📊 Dashboard</a>
-                <a href="/sleep-view">😴 Sleep</a>
-            </div>
-            
-            <div class="header">
-                <h1>😴 Your Sleep</h1>
-                <p>Last 7 nights of sleep data</p>
-            </div>
-            
-            {sleep_html}
-        </div>
-    </body>
-    </html>
-    """)
+    sleeps = response.json().get("records", [])
+    return render("sleep.html", sleeps=sleeps)
 
 if __name__ == "__main__":
     print("="*60)
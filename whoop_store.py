@@ -0,0 +1,453 @@
+"""Local SQLite history store for WHOOP records.
+
+Cycles, recoveries, sleeps and workouts are kept in one WAL-mode SQLite file,
+keyed by resource and record id, together with the profile and body
+measurement documents. Reads are plain indexed queries; the upstream API is
+only asked for the gap since the last sync:
+
+* ``ensure_fresh`` re-fetches records starting at the resource watermark:
+  the oldest stored record that can still change (pending score or an active
+  cycle), or the newest record when everything stored is final. Scored,
+  completed records are treated as permanent and never fetched again.
+* ``ensure_range`` / ``ensure_count`` backfill older history on demand.
+* ``load`` stores records from elsewhere (an export, a synthetic dataset)
+  as already-synced history.
+
+Every record is also indexed by the user-local calendar day it belongs to
+(``local_day``, from the record's own ``timezone_offset``). A cycle starts
+at sleep onset, so it belongs to the day its member wakes up on (see
+``whoop_time.cycle_day``); its recovery, night's sleep and naps take the
+cycle's day, so one day never pairs a recovery with another night's sleep.
+Workouts belong to the day they start on. The index is kept up to date on
+every upsert, so day lookups (``on_day`` / ``on_days`` / ``between_days``)
+are a single indexed query.
+
+When WHOOP webhooks are registered (see whoop_webhooks.py), recoveries,
+sleeps and workouts are pushed into the store as they change, so those
+resources only re-sync every ``WHOOP_WEBHOOK_RESYNC`` seconds as a safety net.
+
+Configuration:
+    WHOOP_STORE_PATH            Database file (default .whoop_store.sqlite3 next to this file)
+    WHOOP_STORE_MAX_AGE         Seconds before a resource is delta-synced again (default 120)
+    WHOOP_STORE_MUTABLE_DAYS    Non-final records older than this no longer hold
+                                the watermark back (default 7)
+    WHOOP_STORE_BACKFILL_DAYS   History fetched on the first sync (default 90)
+    WHOOP_WEBHOOKS              Webhooks keep pushed resources current (default false)
+    WHOOP_WEBHOOK_RESYNC        Seconds before a pushed resource is delta-synced again (default 21600)
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from whoop_cache import is_final
+from whoop_client import iter_pages
+from whoop_time import cycle_day, format_time, local_day, parse_time
+
+DEFAULT_STORE_PATH = Path(__file__).parent / ".whoop_store.sqlite3"
+
+# resource -> collection endpoint (relative to /developer/v2), id field, time field,
+# and how the record's local day is found: "wake" (the cycle's wake-up day),
+# "cycle" (its cycle's day) or "start" (the day it starts on)
+RESOURCES = {
+    "cycles": {"endpoint": "/cycle", "key": "id", "time": "start", "day": "wake"},
+    "recoveries": {"endpoint": "/recovery", "key": "cycle_id", "time": "created_at", "day": "cycle"},
+    "sleeps": {"endpoint": "/activity/sleep", "key": "id", "time": "start", "day": "cycle"},
+    "workouts": {"endpoint": "/activity/workout", "key": "id", "time": "start", "day": "start"},
+}
+# Bump when the day rules change; older stores are re-indexed when opened
+DAY_INDEX_VERSION = 1
+# Resources WHOOP sends webhooks for (there are no cycle events)
+PUSHED_RESOURCES = frozenset({"recoveries", "sleeps", "workouts"})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    resource    TEXT NOT NULL,
+    id          TEXT NOT NULL,
+    start_ts    REAL NOT NULL,
+    updated_at  TEXT,
+    score_state TEXT,
+    final       INTEGER NOT NULL DEFAULT 0,
+    local_day   TEXT,
+    data        TEXT NOT NULL,
+    PRIMARY KEY (resource, id)
+);
+CREATE INDEX IF NOT EXISTS records_by_start ON records (resource, start_ts);
+CREATE TABLE IF NOT EXISTS documents (
+    name       TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource     TEXT PRIMARY KEY,
+    covered_from REAL NOT NULL,
+    watermark    REAL NOT NULL,
+    synced_at    REAL NOT NULL,
+    exhausted    INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def debug_log(message: str):
+    """Log store messages to stderr (stdout is reserved for MCP)."""
+    print(f"[WHOOP-STORE] {message}", file=sys.stderr, flush=True)
+
+
+class WhoopStore:
+    """SQLite-backed record store with incremental delta sync."""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        api_base: str = "/developer/v2",
+        max_age: float | None = None,
+        mutable_days: float | None = None,
+        backfill_days: float | None = None,
+        webhooks: bool | None = None,
+        webhook_resync: float | None = None,
+    ):
+        self.path = Path(path or os.getenv("WHOOP_STORE_PATH", DEFAULT_STORE_PATH))
+        self.api_base = api_base
+        self.max_age = max_age if max_age is not None else float(os.getenv("WHOOP_STORE_MAX_AGE", 120))
+        self.mutable_window = 86400 * (mutable_days if mutable_days is not None
+                                       else float(os.getenv("WHOOP_STORE_MUTABLE_DAYS", 7)))
+        self.backfill = 86400 * (backfill_days if backfill_days is not None
+                                 else float(os.getenv("WHOOP_STORE_BACKFILL_DAYS", 90)))
+        if webhooks is None:
+            webhooks = os.getenv("WHOOP_WEBHOOKS", "false").lower() == "true"
+        self.webhooks = webhooks
+        self.webhook_resync = (webhook_resync if webhook_resync is not None
+                               else float(os.getenv("WHOOP_WEBHOOK_RESYNC", 21600)))
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(records)")}
+        if "final" not in columns:
+            # Stores created before finality tracking; rows re-sync as non-final
+            self.db.execute("ALTER TABLE records ADD COLUMN final INTEGER NOT NULL DEFAULT 0")
+        if "local_day" not in columns:
+            self.db.execute("ALTER TABLE records ADD COLUMN local_day TEXT")
+        self.db.execute("CREATE INDEX IF NOT EXISTS records_by_day ON records (resource, local_day)")
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS sleeps_by_cycle ON records (json_extract(data, '$.cycle_id')) "
+            "WHERE resource = 'sleeps'"
+        )
+        with self._transaction():
+            if self.db.execute("PRAGMA user_version").fetchone()[0] < DAY_INDEX_VERSION:
+                self.db.execute("UPDATE records SET local_day = NULL")
+            self._index_days()
+            self.db.execute(f"PRAGMA user_version = {DAY_INDEX_VERSION}")
+        self._locks = {resource: asyncio.Lock() for resource in RESOURCES}
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Apply the writes in the block atomically; nested blocks join the outer transaction.
+
+        The connection runs in autocommit mode (``isolation_level=None``), so
+        ``with self.db`` would not open a transaction; this issues BEGIN/COMMIT.
+        """
+        if self.db.in_transaction:
+            yield
+            return
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    # -- reads ---------------------------------------------------------------
+
+    def latest(self, resource: str, limit: int = 1) -> list[dict[str, Any]]:
+        """Return the newest ``limit`` records, newest first."""
+        # A negative LIMIT means "no limit" to SQLite
+        rows = self.db.execute(
+            "SELECT data FROM records WHERE resource = ? ORDER BY start_ts DESC LIMIT ?",
+            (resource, max(limit, 0)),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def between(self, resource: str, start: float, end: float) -> list[dict[str, Any]]:
+        """Return records whose time falls in [start, end), newest first."""
+        rows = self.db.execute(
+            "SELECT data FROM records WHERE resource = ? AND start_ts >= ? AND start_ts < ? "
+            "ORDER BY start_ts DESC",
+            (resource, start, end),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def on_day(self, resource: str, day: str) -> list[dict[str, Any]]:
+        """Return the records of a user-local day (YYYY-MM-DD), newest first."""
+        return self.on_days(resource, [day])[day]
+
+    def on_days(self, resource: str, days: list[str]) -> dict[str, list[dict[str, Any]]]:
+        """Return the records of each of ``days``, newest first, with one query."""
+        result: dict[str, list[dict[str, Any]]] = {day: [] for day in days}
+        rows = self.db.execute(
+            f"SELECT local_day, data FROM records WHERE resource = ? AND local_day IN ({', '.join('?' * len(days))}) "
+            "ORDER BY start_ts DESC",
+            (resource, *days),
+        )
+        for day, data in rows:
+            result[day].append(json.loads(data))
+        return result
+
+    def between_days(self, resource: str, first: str, last: str) -> list[dict[str, Any]]:
+        """Return the records of the user-local days ``first`` to ``last`` (inclusive), newest first."""
+        rows = self.db.execute(
+            "SELECT data FROM records WHERE resource = ? AND local_day >= ? AND local_day <= ? "
+            "ORDER BY start_ts DESC",
+            (resource, first, last),
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def local_today(self) -> str:
+        """Today's date in the user's current timezone (that of the latest cycle)."""
+        latest = self.latest("cycles", 1)
+        return local_day(format_time(time.time()), latest[0].get("timezone_offset") if latest else None)
+
+    def get(self, resource: str, record_id: Any) -> dict[str, Any] | None:
+        row = self.db.execute(
+            "SELECT data FROM records WHERE resource = ? AND id = ?", (resource, str(record_id))
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pushed(self, resource: str) -> bool:
+        """Whether webhooks keep ``resource`` current, so polling is only a safety net."""
+        return self.webhooks and resource in PUSHED_RESOURCES
+
+    def count(self, resource: str) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM records WHERE resource = ?", (resource,)).fetchone()[0]
+
+    def get_document(self, name: str, max_age: float | None = None) -> dict[str, Any] | None:
+        """Return a stored document (profile, body), or None if missing or older than max_age."""
+        row = self.db.execute("SELECT data, fetched_at FROM documents WHERE name = ?", (name,)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    # -- writes --------------------------------------------------------------
+
+    def _local_days(self, resource: str, records: list[dict[str, Any]]) -> list[str | None]:
+        rule = RESOURCES[resource]["day"]
+        if rule == "wake":
+            return [cycle_day(r.get("start"), r.get("timezone_offset")) for r in records]
+        if rule == "start":
+            return [local_day(r.get("start"), r.get("timezone_offset")) for r in records]
+        # The cycle's day; until the cycle is stored (or for v1 sleeps without one),
+        # the day the record ends on (recoveries carry no timezone: created_at in UTC)
+        cycle_ids = [str(r["cycle_id"]) for r in records if r.get("cycle_id") is not None]
+        cycle_days = dict(self.db.execute(
+            f"SELECT id, local_day FROM records WHERE resource = 'cycles' AND id IN ({', '.join('?' * len(cycle_ids))})",
+            cycle_ids,
+        ))
+        return [
+            cycle_days.get(str(r.get("cycle_id"))) or local_day(r.get("end") or r.get("created_at"),
+                                                               r.get("timezone_offset"))
+            for r in records
+        ]
+
+    def upsert(self, resource: str, records: list[dict[str, Any]]) -> int:
+        """Insert or update records; an older ``updated_at`` never overwrites a newer one."""
+        if not records:
+            return 0
+        spec = RESOURCES[resource]
+        rows = [
+            (resource, str(r[spec["key"]]), parse_time(r[spec["time"]]),
+             r.get("updated_at"), r.get("score_state"), int(is_final(r)), day, json.dumps(r))
+            for r, day in zip(records, self._local_days(resource, records))
+        ]
+        with self._transaction():
+            self.db.executemany(
+                "INSERT INTO records (resource, id, start_ts, updated_at, score_state, final, local_day, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (resource, id) DO UPDATE SET start_ts = excluded.start_ts, "
+                "updated_at = excluded.updated_at, score_state = excluded.score_state, "
+                "final = excluded.final, local_day = excluded.local_day, data = excluded.data "
+                "WHERE records.updated_at IS NULL OR excluded.updated_at >= records.updated_at",
+                rows,
+            )
+            if resource == "cycles":
+                # Recoveries and sleeps stored before their cycle move to the cycle's day
+                self.db.executemany(
+                    "UPDATE records SET local_day = ? WHERE resource = 'recoveries' AND id = ?",
+                    [(row[6], row[1]) for row in rows],
+                )
+                self.db.executemany(
+                    "UPDATE records SET local_day = ? WHERE resource = 'sleeps' "
+                    "AND json_extract(data, '$.cycle_id') = ?",
+                    [(row[6], r["id"]) for row, r in zip(rows, records)],
+                )
+        return len(rows)
+
+    def _index_days(self):
+        """Fill in ``local_day`` for records stored before the day index (or its current rules) existed."""
+        for resource in RESOURCES:  # cycles first, recoveries take their day
+            rows = self.db.execute(
+                "SELECT data FROM records WHERE resource = ? AND local_day IS NULL", (resource,)
+            ).fetchall()
+            for i in range(0, len(rows), 500):
+                self.upsert(resource, [json.loads(data) for (data,) in rows[i:i + 500]])
+
+    def delete(self, resource: str, record_id: Any):
+        with self._transaction():
+            self.db.execute("DELETE FROM records WHERE resource = ? AND id = ?", (resource, str(record_id)))
+
+    def set_document(self, name: str, data: dict[str, Any]):
+        with self._transaction():
+            self.db.execute(
+                "INSERT OR REPLACE INTO documents (name, data, fetched_at) VALUES (?, ?, ?)",
+                (name, json.dumps(data), time.time()),
+            )
+
+    # -- sync ----------------------------------------------------------------
+
+    def _state(self, resource: str) -> dict[str, Any] | None:
+        row = self.db.execute(
+            "SELECT covered_from, watermark, synced_at, exhausted FROM sync_state WHERE resource = ?",
+            (resource,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"covered_from": row[0], "watermark": row[1], "synced_at": row[2], "exhausted": bool(row[3])}
+
+    def _save_state(self, resource: str, **state: Any):
+        with self._transaction():
+            self.db.execute(
+                "INSERT OR REPLACE INTO sync_state (resource, covered_from, watermark, synced_at, exhausted) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (resource, state["covered_from"], state["watermark"], state["synced_at"], int(state["exhausted"])),
+            )
+
+    def mark_stale(self, resource: str):
+        """Force the next ``ensure_fresh`` of ``resource`` to delta-sync."""
+        with self._transaction():
+            self.db.execute("UPDATE sync_state SET synced_at = 0 WHERE resource = ?", (resource,))
+
+    def load(self, resource: str, records: list[dict[str, Any]], complete: bool = True) -> int:
+        """Store records that did not come from a sync (an export, a synthetic dataset) and mark them synced.
+
+        History is covered from the oldest loaded record; with ``complete`` it
+        is also marked as having no older records, so backfills do not go
+        upstream. The next delta sync starts at the usual watermark.
+        """
+        spec = RESOURCES[resource]
+        with self._transaction():
+            for i in range(0, len(records), 500):
+                self.upsert(resource, records[i:i + 500])
+            state = self._state(resource) or {"covered_from": time.time(), "exhausted": False}
+            times = [parse_time(r[spec["time"]]) for r in records]
+            self._save_state(
+                resource,
+                covered_from=min([state["covered_from"], *times]),
+                watermark=self._next_watermark(resource),
+                synced_at=time.time(),
+                exhausted=complete or state["exhausted"],
+            )
+        debug_log(f"Store load {resource}: {len(records)} record(s)")
+        return len(records)
+
+    def _next_watermark(self, resource: str) -> float:
+        """Start of the next delta sync.
+
+        The oldest record that may still change (within the mutable window),
+        otherwise the newest stored record so that only new records and the
+        latest one are re-fetched.
+        """
+        row = self.db.execute(
+            "SELECT MIN(start_ts) FROM records WHERE resource = ? AND final = 0 AND start_ts >= ?",
+            (resource, time.time() - self.mutable_window),
+        ).fetchone()
+        if row[0] is not None:
+            return row[0]
+        row = self.db.execute("SELECT MAX(start_ts) FROM records WHERE resource = ?", (resource,)).fetchone()
+        return row[0] if row[0] is not None else time.time()
+
+    async def _fetch(self, resource: str, token: str, params: dict[str, Any], limit: int | None = None) -> list[float]:
+        """Page through the upstream collection into the store; returns fetched record times.
+
+        Pages bypass the response cache: the store decides when to sync, and a
+        cached page could hide a record scored since it was cached. Each page
+        is committed as it arrives and callers save the sync state only after
+        the last one, so the watermark never moves past records not stored.
+        """
+        spec = RESOURCES[resource]
+        times = []
+        endpoint = f"{self.api_base}{spec['endpoint']}"
+        async for page in iter_pages(endpoint, token, params, limit=limit, cache=False):
+            self.upsert(resource, page)
+            times.extend(parse_time(r[spec["time"]]) for r in page)
+        return times
+
+    async def ensure_fresh(self, resource: str, token: str, max_age: float | None = None) -> int:
+        """Delta-sync ``resource`` unless it was synced within ``max_age`` seconds.
+
+        ``max_age`` defaults to ``max_age`` or, for resources kept current by
+        webhooks, ``webhook_resync``. Returns the number of records fetched
+        from upstream (0 when fresh).
+        """
+        if max_age is None:
+            max_age = self.webhook_resync if self.pushed(resource) else self.max_age
+        async with self._locks[resource]:
+            state = self._state(resource)
+            now = time.time()
+            if state and now - state["synced_at"] < max_age:
+                return 0
+            if state is None:
+                since = now - self.backfill
+                state = {"covered_from": since, "exhausted": False}
+            else:
+                since = state["watermark"]
+            times = await self._fetch(resource, token, {"start": format_time(since)})
+            self._save_state(
+                resource,
+                covered_from=state["covered_from"],
+                watermark=self._next_watermark(resource),
+                synced_at=now,
+                exhausted=state["exhausted"],
+            )
+            debug_log(f"Store sync {resource}: {len(times)} record(s) since {format_time(since)}")
+            return len(times)
+
+    async def ensure_range(self, resource: str, token: str, start: float) -> int:
+        """Backfill ``resource`` so that history from ``start`` onwards is stored."""
+        await self.ensure_fresh(resource, token)
+        async with self._locks[resource]:
+            state = self._state(resource)
+            if state["exhausted"] or start >= state["covered_from"]:
+                return 0
+            params = {"start": format_time(start), "end": format_time(state["covered_from"])}
+            times = await self._fetch(resource, token, params)
+            state["covered_from"] = start
+            self._save_state(resource, **state)
+            debug_log(f"Store backfill {resource}: {len(times)} record(s) from {format_time(start)}")
+            return len(times)
+
+    async def ensure_count(self, resource: str, token: str, count: int) -> int:
+        """Backfill ``resource`` until at least ``count`` records are stored (or history ends)."""
+        await self.ensure_fresh(resource, token)
+        async with self._locks[resource]:
+            state = self._state(resource)
+            missing = count - self.count(resource)
+            if missing <= 0 or state["exhausted"]:
+                return 0
+            params = {"end": format_time(state["covered_from"])}
+            times = await self._fetch(resource, token, params, limit=missing)
+            if len(times) < missing:
+                state["exhausted"] = True
+            if times:
+                state["covered_from"] = min(times)
+            self._save_state(resource, **state)
+            debug_log(f"Store backfill {resource}: {len(times)} older record(s)")
+            return len(times)
@@ -0,0 +1,71 @@
+"""Timestamp and timezone helpers shared by the WHOOP modules.
+
+WHOOP timestamps are ISO-8601 in UTC ("2026-10-16T06:13:33.739Z") and
+records carry the member's timezone separately as ``timezone_offset``
+("-05:00"). These helpers parse and format timestamps, turn the offset into
+a tzinfo and find the user-local calendar day of a timestamp, so the store,
+the series, the prompt builder and the prefetch scheduler agree on what a
+"day" (and a night's sleep) is.
+
+A cycle starts at sleep onset, usually the evening before the day it
+covers, so its day is the day its member wakes up on (``cycle_day``), not
+the day it starts on. Its recovery and sleeps belong to the same day.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+# A cycle's day is taken as the local day this long after its start, so
+# onsets from noon on count for the next day
+CYCLE_DAY_SHIFT = timedelta(hours=12)
+
+# Stage totals that count as sleep (awake and no-data time do not)
+ASLEEP_STAGES = ("total_light_sleep_time_milli", "total_slow_wave_sleep_time_milli", "total_rem_sleep_time_milli")
+
+
+def parse_offset(offset: str | None) -> timezone:
+    """Turn a WHOOP timezone_offset ("-05:00") into a tzinfo (UTC if missing)."""
+    if not offset:
+        return timezone.utc
+    sign = -1 if offset.startswith("-") else 1
+    hours, _, minutes = offset.lstrip("+-").partition(":")
+    return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes or 0)))
+
+
+def parse_datetime(value: str) -> datetime:
+    """Aware datetime of a WHOOP ISO-8601 timestamp (UTC unless it says otherwise)."""
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def parse_time(value: str) -> float:
+    """Convert a WHOOP ISO-8601 timestamp to epoch seconds."""
+    return parse_datetime(value).timestamp()
+
+
+def format_time(ts: float) -> str:
+    """Convert epoch seconds to the ISO-8601 form WHOOP expects."""
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def local_day(timestamp: str | None, offset: str | None) -> str | None:
+    """Calendar day (YYYY-MM-DD) of a WHOOP timestamp in the record's own timezone."""
+    if not timestamp:
+        return None
+    return parse_datetime(timestamp).astimezone(parse_offset(offset)).date().isoformat()
+
+
+def cycle_day(start: str | None, offset: str | None) -> str | None:
+    """Calendar day (YYYY-MM-DD) of a cycle: the local day its member wakes up on."""
+    if not start:
+        return None
+    return (parse_datetime(start).astimezone(parse_offset(offset)) + CYCLE_DAY_SHIFT).date().isoformat()
+
+
+def asleep_milli(sleep: dict[str, Any]) -> float | None:
+    """Time asleep (light + slow-wave + REM) of a sleep record in ms, or None without stage data."""
+    stages = (sleep.get("score") or {}).get("stage_summary") or {}
+    parts = [stages.get(k) for k in ASLEEP_STAGES]
+    if all(p is None for p in parts):
+        return None
+    return sum(p or 0 for p in parts)
@@ -0,0 +1,177 @@
+"""WHOOP webhook verification and processing.
+
+WHOOP pushes a small event (``{"user_id", "id", "type", "trace_id"}``) when
+a recovery, sleep or workout is created, re-scored or deleted. Instead of
+polling for those changes, the FastAPI server verifies each event, fetches
+just the affected record from the v2 API, writes it into the shared
+``WhoopStore`` and drops the response-cache entries that could now be stale.
+
+Signatures: ``X-WHOOP-Signature`` is base64(HMAC-SHA256(client secret,
+``X-WHOOP-Signature-Timestamp`` + raw body)). Events older than the
+tolerance are rejected to limit replays.
+
+Cycles have no webhooks, so they are still polled.
+
+Configuration:
+    WHOOP_WEBHOOKS              Webhooks are registered; pushed resources poll rarely (default false)
+    WHOOP_WEBHOOK_RESYNC        Safety-net re-sync of pushed resources, in seconds (default 21600)
+    WHOOP_WEBHOOK_TOLERANCE     Maximum event age in seconds (default 300)
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import sys
+import time
+from collections import Counter
+from typing import Any, Mapping
+
+from whoop_cache import response_cache
+from whoop_client import api_get
+from whoop_store import WhoopStore
+
+SIGNATURE_HEADER = "X-WHOOP-Signature"
+TIMESTAMP_HEADER = "X-WHOOP-Signature-Timestamp"
+
+# Event type prefix -> store resource
+EVENT_RESOURCES = {"recovery": "recoveries", "sleep": "sleeps", "workout": "workouts"}
+# Store resource -> unversioned response-cache prefixes holding its records
+CACHE_PREFIXES = {
+    "recoveries": ("/recovery",),
+    "sleeps": ("/activity/sleep",),
+    "workouts": ("/activity/workout", "/workout"),
+}
+
+
+def debug_log(message: str):
+    """Log webhook messages to stderr."""
+    print(f"[WHOOP-WEBHOOK] {message}", file=sys.stderr, flush=True)
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """Compute the X-WHOOP-Signature value for a raw request body."""
+    digest = hmac.new(secret.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+class WebhookProcessor:
+    """Verify WHOOP webhook events and apply them to the store and cache."""
+
+    def __init__(self, store: WhoopStore, api_base: str = "/developer/v2", tolerance: float | None = None):
+        self.store = store
+        self.api_base = api_base
+        self.tolerance = tolerance if tolerance is not None else float(os.getenv("WHOOP_WEBHOOK_TOLERANCE", 300))
+        self.counts: Counter[str] = Counter()
+
+    def verify(self, secret: str, headers: Mapping[str, str], body: bytes) -> str | None:
+        """Return why a delivery must be rejected, or None if it is authentic."""
+        signature = headers.get(SIGNATURE_HEADER)
+        timestamp = headers.get(TIMESTAMP_HEADER)
+        if not signature or not timestamp:
+            reason = "missing signature headers"
+        elif not hmac.compare_digest(sign(secret, timestamp, body), signature):
+            reason = "bad signature"
+        elif abs(time.time() - _epoch_seconds(timestamp)) > self.tolerance:
+            reason = "stale timestamp"
+        else:
+            return None
+        self.counts["rejected"] += 1
+        return reason
+
+    async def handle(self, event: dict[str, Any], token: str | None) -> str:
+        """Apply one verified event; returns what was done (for logs and stats)."""
+        event_type = str(event.get("type", ""))
+        kind, _, action = event_type.partition(".")
+        resource = EVENT_RESOURCES.get(kind)
+        record_id = event.get("id")
+        if resource is None or record_id is None:
+            self.counts["ignored"] += 1
+            return f"ignored {event_type or 'event without type'}"
+
+        try:
+            if action == "deleted":
+                outcome = self._delete(resource, record_id)
+            elif token is None:
+                # Can't fetch without a session; make the next read re-sync instead
+                self.store.mark_stale(resource)
+                self._invalidate(resource)
+                outcome = f"{resource} marked stale (no token)"
+            else:
+                outcome = await self._update(resource, record_id, token)
+        except Exception as e:
+            self.counts["failed"] += 1
+            self.store.mark_stale(resource)
+            self._invalidate(resource)
+            debug_log(f"{event_type} {record_id} failed: {e}")
+            return f"failed: {e}"
+        self.counts[event_type] += 1
+        debug_log(f"{event_type} {record_id}: {outcome}")
+        return outcome
+
+    async def _get(self, path: str, token: str) -> dict[str, Any] | None:
+        response = await api_get(f"{self.api_base}{path}", token, cache=False)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def _update(self, resource: str, record_id: Any, token: str) -> str:
+        if resource == "workouts":
+            workout = await self._get(f"/activity/workout/{record_id}", token)
+            return self._apply("workouts", workout, record_id)
+
+        # Sleep and recovery events both carry the sleep id; recovery is keyed by cycle
+        sleep = await self._get(f"/activity/sleep/{record_id}", token)
+        outcome = self._apply("sleeps", sleep, record_id)
+        cycle_id = sleep.get("cycle_id") if sleep else None
+        if cycle_id is not None:
+            response_cache.invalidate(f"/cycle/{cycle_id}/sleep")
+            # A new sleep usually means a new cycle started
+            response_cache.invalidate("/cycle?")
+        if resource == "sleeps":
+            return outcome
+        if cycle_id is None:
+            self.store.mark_stale("recoveries")
+            self._invalidate("recoveries")
+            return "recoveries marked stale (sleep has no cycle)"
+        recovery = await self._get(f"/cycle/{cycle_id}/recovery", token)
+        response_cache.invalidate(f"/cycle/{cycle_id}/recovery")
+        return self._apply("recoveries", recovery, cycle_id)
+
+    def _apply(self, resource: str, record: dict[str, Any] | None, record_id: Any) -> str:
+        self._invalidate(resource)
+        if record is None:
+            return f"{resource} {record_id} not found upstream"
+        self.store.upsert(resource, [record])
+        return f"{resource} {record_id} stored"
+
+    def _delete(self, resource: str, record_id: Any) -> str:
+        if resource == "recoveries":
+            sleep = self.store.get("sleeps", record_id)
+            if sleep is None or sleep.get("cycle_id") is None:
+                self.store.mark_stale("recoveries")
+                self._invalidate("recoveries")
+                return "recoveries marked stale (unknown sleep)"
+            record_id = sleep["cycle_id"]
+            response_cache.invalidate(f"/cycle/{record_id}/recovery")
+        elif resource == "sleeps":
+            sleep = self.store.get("sleeps", record_id)
+            if sleep and sleep.get("cycle_id") is not None:
+                response_cache.invalidate(f"/cycle/{sleep['cycle_id']}/sleep")
+        self.store.delete(resource, record_id)
+        self._invalidate(resource)
+        return f"{resource} {record_id} deleted"
+
+    def _invalidate(self, resource: str):
+        for prefix in CACHE_PREFIXES[resource]:
+            response_cache.invalidate(prefix)
+
+    def stats(self) -> dict[str, Any]:
+        return dict(self.counts)
+
+
+def _epoch_seconds(timestamp: str) -> float:
+    """WHOOP sends epoch milliseconds; accept seconds too."""
+    value = float(timestamp)
+    return value / 1000 if value > 1e11 else value